@@ -1,13 +1,17 @@
 import os
 import json
-from flask import Flask, render_template, session, g
+from flask import Flask, render_template, request, session, g
 from auth.blueprints.auth import bp as auth_bp
 from decorators.auth import login_required
 from queries.blueprints.queries import bp as queries_bp
 from report.blueprint.report import bp as reports_bp
 from redis import Redis
 from interviews.blueprints.interviews import bp as interviews_bp
+from metrics.blueprints.metrics import bp as metrics_bp
 from database.sql_provider import SQLProvider
+from database import pool as db_pool
+from database import metrics as sql_metrics
+from database import request_memo
 from cache.redis_cache import RedisCache
 
 
@@ -27,7 +31,11 @@ def create_app():
     sql_dir = os.path.join(base_dir, 'sql')  # <─ только 'sql', НЕ 'queries/sql'
     if not os.path.isdir(sql_dir):
         raise RuntimeError(f'SQL dir not found: {sql_dir}')
-    app.config['SQL_PROVIDER'] = SQLProvider(sql_dir)
+    # скрипты разбираются один раз; reload_seconds > 0 — подхватывать изменённые файлы по mtime
+    app.config['SQL'] = _load_json(os.path.join(data_dir, 'sql.json'), {})
+    app.config['SQL_PROVIDER'] = SQLProvider(sql_dir, app.config['SQL'].get('reload_seconds', 0))
+    for name, problems in app.config['SQL_PROVIDER'].problems().items():
+        app.logger.warning("SQL-скрипт %s: %s", name, "; ".join(problems))
 
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
     if not app.config['SECRET_KEY']:
@@ -39,13 +47,20 @@ def create_app():
     app.config['DB_CONFIG'] = _load_json(db_cfg_path, {})
     app.config['db_config'] = app.config['DB_CONFIG']  # рабочий ключ (нижний регистр)
 
+    # пул соединений: параметры общие, сам пул — отдельный на каждый db_config
+    app.config['DB_POOL'] = _load_json(os.path.join(data_dir, 'db_pool.json'), {})
+    db_pool.configure(app.config['DB_POOL'])
+
+    # метрики SQL: порог медленных запросов и границы гистограммы
+    app.config['METRICS'] = _load_json(os.path.join(data_dir, 'metrics.json'), {})
+    sql_metrics.configure(app.config['METRICS'])
+
+    # фоновое построение отчётов: размер пула воркеров и срок хранения задач
+    app.config['REPORT_JOBS'] = _load_json(os.path.join(data_dir, 'report_jobs.json'), {})
+
     access_path = os.path.join(base_dir, 'access.json')
     app.config['db_access'] = _load_json(access_path, {})
 
-    if not os.path.isdir(sql_dir):
-        raise RuntimeError(f'SQL dir not found: {sql_dir}')
-    app.config['SQL_PROVIDER'] = SQLProvider(sql_dir)
-
     app.config['JSON_AS_ASCII'] = False
     app.config['TEMPLATES_AUTO_RELOAD'] = True
     # REDIS
@@ -71,6 +86,7 @@ def create_app():
     app.register_blueprint(queries_bp, url_prefix='/queries')
     app.register_blueprint(reports_bp, url_prefix='/reports')
     app.register_blueprint(interviews_bp, url_prefix='/interviews')
+    app.register_blueprint(metrics_bp, url_prefix='/metrics')
 
 
 
@@ -84,6 +100,19 @@ def create_app():
         app.config['db_config'] = cfg
         g.db_config = cfg
 
+    @app.after_request
+    def memo_debug(response):
+        # в debug: сколько повторных чтений за запрос взято из request_memo
+        if app.debug:
+            st = request_memo.stats()
+            response.headers['X-Request-Memo'] = (f"hits={st['hits']}; misses={st['misses']}; "
+                                                  f"sql_hits={st['sql_hits']}")
+            if st['hits'] or st['misses']:
+                app.logger.debug("request memo %s: hits=%d misses=%d sql_hits=%d entries=%d",
+                                 request.path, st['hits'], st['misses'], st['sql_hits'],
+                                 st['entries'])
+        return response
+
     @app.route('/')
     @login_required
     def menu():
@@ -0,0 +1,96 @@
+"""
+ASGI-вариант приложения для большого числа одновременных медленных запросов.
+
+    hypercorn asgi:application      (или uvicorn asgi:application)
+
+Формы и просмотр результатов «Запросов» и «Отчётов» (/queries/run, /reports/run)
+обслуживают асинхронные представления на Quart: MySQL через aiomysql, Redis через
+redis.asyncio, поэтому ожидание сокета не занимает поток. Остальные разделы
+(вход, собеседования, выгрузки, история, метрики) — прежнее WSGI-приложение
+из app.create_app(), подключённое через asgiref. Сессия и flash общие: обе части
+подписывают cookie одним SECRET_KEY.
+
+Нужны пакеты quart, aiomysql и asgiref (синхронному app.py они не нужны).
+"""
+from asgiref.wsgi import WsgiToAsgi
+from quart import Quart, session, g
+from werkzeug.routing import BuildError
+
+from app import create_app
+from cache.aio_redis_cache import AsyncRedisCache
+from database import aio as aio_db
+from queries.blueprints.queries_aio import bp as queries_aio_bp
+from report.blueprint.report_aio import bp as reports_aio_bp
+
+# пути, которые обслуживает асинхронная часть (и всё под ними)
+ASYNC_PATHS = ("/queries/run", "/reports/run")
+
+# общие с WSGI-приложением настройки
+_SHARED_CONFIG = ('SECRET_KEY', 'SQL_PROVIDER', 'DB_CONFIG', 'db_config', 'DB_POOL',
+                  'REDIS_CONFIG', 'CACHE_CONFIG', 'db_access', 'JSON_AS_ASCII')
+
+
+def create_asgi_app(flask_app=None) -> Quart:
+    flask_app = flask_app or create_app()
+    app = Quart(__name__, template_folder='templates', static_folder='static')
+    for key in _SHARED_CONFIG:
+        app.config[key] = flask_app.config.get(key)
+
+    aio_db.configure(app.config['DB_POOL'])
+    app.extensions['redis_cache_aio'] = AsyncRedisCache(app.config['REDIS_CONFIG'])
+    app.extensions['wsgi_app'] = flask_app  # построение отчётов идёт через report.jobs
+
+    app.register_blueprint(queries_aio_bp, url_prefix='/queries')
+    app.register_blueprint(reports_aio_bp, url_prefix='/reports')
+
+    @app.before_request
+    async def inject_db():
+        cfg = session.get('db_config')
+        if not isinstance(cfg, dict) or not cfg:
+            cfg = dict(app.config.get('db_config') or app.config.get('DB_CONFIG') or {})
+        for k in ('host', 'user', 'password', 'database'):
+            cfg.setdefault(k, app.config['DB_CONFIG'].get(k))
+        g.db_config = cfg
+
+    # ссылки на разделы WSGI-части (auth.login, menu, выгрузки...) строим по её url_map
+    urls = flask_app.url_map.bind('')
+
+    def wsgi_url(error, endpoint, values):
+        try:
+            return urls.build(endpoint, {k: v for k, v in values.items() if not k.startswith('_')})
+        except BuildError:
+            return None
+
+    app.url_build_error_handlers.append(wsgi_url)
+
+    @app.after_serving
+    async def close_connections():
+        await aio_db.close_all()
+        await app.extensions['redis_cache_aio'].close()
+
+    return app
+
+
+class PathDispatcher:
+    """ASGI: пути из ASYNC_PATHS и lifespan — в Quart, остальное — в WSGI-приложение."""
+
+    def __init__(self, async_app, wsgi_app, prefixes=ASYNC_PATHS):
+        self.async_app = async_app
+        self.wsgi_app = WsgiToAsgi(wsgi_app)
+        self.prefixes = prefixes
+
+    def _is_async(self, path: str) -> bool:
+        return any(path == p or path.startswith(p + "/") for p in self.prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan" or self._is_async(scope.get("path", "")):
+            return await self.async_app(scope, receive, send)
+        return await self.wsgi_app(scope, receive, send)
+
+
+def create_application():
+    flask_app = create_app()
+    return PathDispatcher(create_asgi_app(flask_app), flask_app)
+
+
+application = create_application()
@@ -0,0 +1,274 @@
+"""
+Генератор синтетических данных для нагрузочных замеров.
+
+    python -m bench.generate_data --candidates 1000000
+    python -m bench.generate_data --candidates 100000 --jobs 2000 --seed 7
+
+Дописывает строки к тому, что уже есть в БД (после db/schema.sql + db/seed.sql):
+schedule_ -> employee -> vacancy -> candidate -> interview -> calls.
+Размеры остальных таблиц по умолчанию выводятся из --candidates, распределения
+приближены к реальным: офисы и должности неравномерны (Зипф), возраст и зарплаты —
+колокол, вакансии живут экспоненциально долго, собеседований на вакансию — Пуассон.
+Память — O(должностей + вакансий), строки уходят в БД пачками.
+"""
+import argparse
+import datetime as dt
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+
+import pymysql
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_CONFIG_PATH = os.path.join(BASE_DIR, 'data', 'db_config.json')
+
+MALE_NAMES = ["Александр", "Дмитрий", "Сергей", "Андрей", "Алексей", "Иван", "Михаил",
+              "Павел", "Николай", "Владимир", "Артём", "Егор", "Кирилл", "Максим"]
+FEMALE_NAMES = ["Мария", "Анна", "Елена", "Ольга", "Наталья", "Татьяна", "Ирина", "Юлия",
+                "Екатерина", "Светлана", "Ксения", "Дарья", "Полина", "Алина"]
+LAST_NAMES = ["Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов",
+              "Михайлов", "Новиков", "Фёдоров", "Морозов", "Волков", "Алексеев", "Лебедев",
+              "Семёнов", "Егоров", "Павлов", "Козлов", "Степанов", "Николаев", "Орлов", "Андреев"]
+CITIES = ["Москва", "Санкт-Петербург", "Казань", "Новосибирск", "Екатеринбург", "Самара"]
+STREETS = ["Ленина", "Мира", "Садовая", "Гагарина", "Советская", "Пушкина", "Лесная", "Школьная"]
+EDUCATION = ["высшее", "среднее специальное", "неоконченное высшее", "среднее"]
+CALL_STATUSES = [None, None, None, "Принят", "Не принят", "Не принят"]
+
+
+def _zipf_weights(n: int, s: float = 1.1) -> list:
+    return [1.0 / (k ** s) for k in range(1, n + 1)]
+
+
+def _cum(weights: list) -> list:
+    # накопленные веса считаются один раз: choices() с weights= делает это на каждый вызов
+    return list(itertools.accumulate(weights))
+
+
+def _poisson(rnd: random.Random, lam: float) -> int:
+    # Кнут: для небольших lam достаточно
+    limit, k, p = math.exp(-lam), 0, 1.0
+    while True:
+        p *= rnd.random()
+        if p <= limit:
+            return k
+        k += 1
+
+
+def _full_name(rnd: random.Random, female: bool) -> str:
+    first = rnd.choice(FEMALE_NAMES if female else MALE_NAMES)
+    return f"{first} {rnd.choice(LAST_NAMES)}{'а' if female else ''}"
+
+
+def _address(rnd: random.Random) -> str:
+    return f"{rnd.choice(CITIES)}, ул. {rnd.choice(STREETS)}, {rnd.randint(1, 150)}"
+
+
+def _rand_date(rnd: random.Random, start: dt.date, end: dt.date) -> dt.date:
+    return start + dt.timedelta(days=rnd.randrange(max(1, (end - start).days)))
+
+
+class Loader:
+    """Вставка пачками по batch строк в одной транзакции на пачку."""
+
+    def __init__(self, conn, batch: int):
+        self.conn = conn
+        self.batch = batch
+        self.counts = {}
+
+    def insert(self, table: str, columns: tuple, rows):
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+        buf = []
+        with self.conn.cursor() as cur:
+            for row in rows:
+                buf.append(row)
+                if len(buf) >= self.batch:
+                    cur.executemany(sql, buf)
+                    self.conn.commit()
+                    self.counts[table] = self.counts.get(table, 0) + len(buf)
+                    buf.clear()
+            if buf:
+                cur.executemany(sql, buf)
+                self.conn.commit()
+                self.counts[table] = self.counts.get(table, 0) + len(buf)
+
+    def max_id(self, table: str, column: str) -> int:
+        with self.conn.cursor() as cur:
+            cur.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")
+            return int(cur.fetchone()[0])
+
+
+def generate(conn, *, candidates: int, jobs: int, offices: int, employees: int,
+             vacancies: int, interviews_per_vacancy: float, calls_per_interview: float,
+             seed: int, batch: int, years: int = 3, progress=print) -> dict:
+    rnd = random.Random(seed)
+    load = Loader(conn, batch)
+    today = dt.date.today()
+    start = today - dt.timedelta(days=365 * years)
+
+    with conn.cursor() as cur:
+        # загрузка пачками: проверки ключей отключаем, данные заведомо согласованы
+        cur.execute("SET SESSION foreign_key_checks = 0")
+        cur.execute("SET SESSION unique_checks = 0")
+
+    started = time.monotonic()
+
+    # --- schedule_ (должности): офисы по Зипфу ---
+    job0 = load.max_id("schedule_", "job_id")
+    office_ids = list(range(1, offices + 1))
+    office_cum = _cum(_zipf_weights(offices))
+    job_ids = list(range(job0 + 1, job0 + jobs + 1))
+
+    def schedule_rows():
+        for job_id in job_ids:
+            base = round(rnd.lognormvariate(11.0, 0.4), -3)
+            yield (job_id, base, round(base * rnd.uniform(1.2, 1.8), -3),
+                   rnd.choices(office_ids, cum_weights=office_cum)[0])
+    load.insert("schedule_", ("job_id", "min_salary", "max_salary", "office_id"), schedule_rows())
+    progress(f"schedule_: {jobs}")
+
+    job_w = _zipf_weights(jobs, 0.9)
+    job_cum = _cum(job_w)
+
+    # --- employee ---
+    emp0 = load.max_id("employee", "emp_id")
+    emp_ids = range(emp0 + 1, emp0 + employees + 1)
+
+    def employee_rows():
+        for emp_id in emp_ids:
+            female = rnd.random() < 0.5
+            enrolled = _rand_date(rnd, start, today)
+            born = enrolled - dt.timedelta(days=int(rnd.gauss(35, 9) * 365))
+            dismissed = (enrolled + dt.timedelta(days=int(rnd.expovariate(1 / 700)))
+                         if rnd.random() < 0.25 else None)
+            if dismissed and dismissed > today:
+                dismissed = None
+            yield (emp_id, _full_name(rnd, female), born,
+                   _address(rnd),
+                   rnd.choice(EDUCATION), enrolled,
+                   round(rnd.lognormvariate(11.2, 0.35), 2), dismissed,
+                   rnd.choices(job_ids, cum_weights=job_cum)[0])
+    load.insert("employee", ("emp_id", "full_name", "birthday", "address", "education",
+                             "enrollment", "salary", "dismissal", "job_id"), employee_rows())
+    progress(f"employee: {employees}")
+
+    # --- vacancy: 30% открыты, остальные закрыты через ~exp(45 дней) ---
+    vac0 = load.max_id("vacancy", "vac_id")
+    vac_info = []  # (vac_id, job_id, date_open, date_close) — нужны для собеседований
+
+    def vacancy_rows():
+        for i in range(vacancies):
+            vac_id = vac0 + 1 + i
+            job_id = rnd.choices(job_ids, cum_weights=job_cum)[0]
+            opened = _rand_date(rnd, start, today)
+            closed = None
+            if rnd.random() > 0.3:
+                closed = opened + dt.timedelta(days=1 + int(rnd.expovariate(1 / 45)))
+                if closed > today:
+                    closed = None
+            # enrollment — выход принятого кандидата, через несколько дней после закрытия
+            enrolled = closed + dt.timedelta(days=rnd.randint(1, 14)) if closed else None
+            vac_info.append((vac_id, job_id, opened, closed))
+            yield (vac_id, job_id, opened, closed, enrolled)
+    load.insert("vacancy", ("vac_id", "job_id", "date_open", "date_close", "enrollment"),
+                vacancy_rows())
+    progress(f"vacancy: {vacancies}")
+
+    # --- candidate: по должностям, id каждой должности идут подряд ---
+    cand0 = load.max_id("candidate", "cand_id")
+    total_w = sum(job_w)
+    cand_ranges = {}
+    next_id = cand0 + 1
+    for job_id, w in zip(job_ids, job_w):
+        n = max(1, round(candidates * w / total_w))
+        cand_ranges[job_id] = (next_id, n)
+        next_id += n
+
+    def candidate_rows():
+        for job_id, (first, n) in cand_ranges.items():
+            for cand_id in range(first, first + n):
+                female = rnd.random() < 0.5
+                age = min(65, max(18, int(rnd.gauss(32, 8))))
+                yield (cand_id, _full_name(rnd, female),
+                       _address(rnd),
+                       age, "Ж" if female else "М", job_id)
+    load.insert("candidate", ("cand_id", "full_name", "address", "age", "gender", "job_id"),
+                candidate_rows())
+    progress(f"candidate: {next_id - cand0 - 1}")
+
+    # --- interview + calls: потоком по вакансиям ---
+    event_id = load.max_id("interview", "event_id")
+    call_id = load.max_id("calls", "call_id")
+    calls_buf = []
+
+    def interview_rows():
+        nonlocal event_id, call_id
+        for vac_id, job_id, opened, closed in vac_info:
+            until = closed or today
+            first, n = cand_ranges[job_id]
+            for _ in range(_poisson(rnd, interviews_per_vacancy)):
+                event_id += 1
+                emp_id = rnd.choice(emp_ids)
+                yield (event_id, _rand_date(rnd, opened, until + dt.timedelta(days=1)), emp_id, vac_id)
+                for _ in range(max(1, _poisson(rnd, calls_per_interview))):
+                    call_id += 1
+                    calls_buf.append((call_id, event_id, emp_id,
+                                      first + rnd.randrange(n), rnd.choice(CALL_STATUSES)))
+                if len(calls_buf) >= batch:
+                    load.insert("calls", ("call_id", "event_id", "emp_id", "cand_id", "status_"),
+                                calls_buf)
+                    calls_buf.clear()
+    load.insert("interview", ("event_id", "date_", "emp_id", "vac_id"), interview_rows())
+    load.insert("calls", ("call_id", "event_id", "emp_id", "cand_id", "status_"), calls_buf)
+    progress(f"interview: {load.counts.get('interview', 0)}, calls: {load.counts.get('calls', 0)}")
+
+    with conn.cursor() as cur:
+        cur.execute("SET SESSION foreign_key_checks = 1")
+        cur.execute("SET SESSION unique_checks = 1")
+        for table in ("schedule_", "employee", "vacancy", "candidate", "interview", "calls"):
+            cur.execute(f"ANALYZE TABLE {table}")
+            cur.fetchall()
+
+    return {"rows": load.counts, "seconds": round(time.monotonic() - started, 1), "seed": seed}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Синтетические данные для нагрузочных замеров")
+    ap.add_argument("--db-config", default=DB_CONFIG_PATH)
+    ap.add_argument("--candidates", type=int, default=10_000, help="кандидатов (10^4–10^7)")
+    ap.add_argument("--jobs", type=int, help="должностей (по умолчанию candidates/200)")
+    ap.add_argument("--offices", type=int, default=20)
+    ap.add_argument("--employees", type=int, help="сотрудников (по умолчанию candidates/20)")
+    ap.add_argument("--vacancies", type=int, help="вакансий (по умолчанию candidates/50)")
+    ap.add_argument("--interviews-per-vacancy", type=float, default=4.0)
+    ap.add_argument("--calls-per-interview", type=float, default=3.0)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--batch", type=int, default=5000)
+    args = ap.parse_args(argv)
+
+    n = args.candidates
+    with open(args.db_config, encoding="utf-8") as f:
+        db_cfg = json.load(f)
+    conn = pymysql.connect(**db_cfg, autocommit=False)
+    try:
+        result = generate(
+            conn, candidates=n,
+            jobs=args.jobs or max(10, n // 200),
+            offices=args.offices,
+            employees=args.employees or max(10, n // 20),
+            vacancies=args.vacancies or max(10, n // 50),
+            interviews_per_vacancy=args.interviews_per_vacancy,
+            calls_per_interview=args.calls_per_interview,
+            seed=args.seed, batch=args.batch,
+        )
+    finally:
+        conn.close()
+    print(json.dumps(result, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
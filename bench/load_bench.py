@@ -0,0 +1,293 @@
+"""
+Нагрузочный прогон основных сценариев приложения.
+
+    python -m bench.load_bench --users 8 --iterations 50 --save baseline
+    python -m bench.load_bench --users 8 --iterations 50 --compare bench/baselines/baseline.json
+    python -m bench.load_bench --base-url http://127.0.0.1:5000 --users 16 --duration 60
+
+По умолчанию приложение поднимается в процессе (create_app + test_client) против
+настоящих MySQL/Redis из data/; с --base-url запросы идут по HTTP к запущенному
+серверу. Каждый виртуальный пользователь логинится и по кругу проходит:
+кандидаты по вакансии -> add_ajax -> confirm -> queries.query_run -> просмотр отчёта.
+По каждому endpoint печатаются p50/p95/p99 (мс), ошибки и пропускная способность.
+"""
+import argparse
+import datetime as dt
+import http.cookiejar
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(BASE_DIR, 'bench', 'baselines')
+
+
+# --------- транспорт ---------
+
+class _TestClient:
+    """Flask test_client: свой на каждого пользователя (свои cookie/сессия)."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    @staticmethod
+    def _status(resp):
+        resp.get_data()  # потоковые страницы рендерятся только при чтении тела
+        resp.close()
+        return resp.status_code
+
+    def get(self, path, params=None):
+        return self._status(self.client.get(path, query_string=params))
+
+    def post(self, path, form=None, json_body=None):
+        if json_body is not None:
+            return self._status(self.client.post(path, json=json_body))
+        return self._status(self.client.post(path, data=form))
+
+
+class _HttpClient:
+    """HTTP к запущенному серверу; редиректы не разворачиваются (меряем сам endpoint)."""
+
+    class _NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *a, **k):
+            return None
+
+    def __init__(self, base_url: str):
+        self.base = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), self._NoRedirect())
+
+    def _open(self, req):
+        try:
+            with self.opener.open(req, timeout=30) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+    def get(self, path, params=None):
+        url = self.base + path + ('?' + urllib.parse.urlencode(params) if params else '')
+        return self._open(urllib.request.Request(url))
+
+    def post(self, path, form=None, json_body=None):
+        if json_body is not None:
+            data, ctype = json.dumps(json_body).encode(), 'application/json'
+        else:
+            data, ctype = urllib.parse.urlencode(form or {}).encode(), 'application/x-www-form-urlencoded'
+        return self._open(urllib.request.Request(self.base + path, data=data,
+                                                 headers={'Content-Type': ctype}))
+
+
+# --------- замеры ---------
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def timed(self, endpoint: str, call):
+        started = time.perf_counter()
+        try:
+            status = call()
+        except Exception:
+            status = 599
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(elapsed)
+            if status >= 400:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        return status
+
+
+def percentile(values: list, q: float) -> float:
+    """Перцентиль методом ближайшего ранга."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), int(round(q / 100 * len(ordered) + 0.5))))
+    return ordered[rank - 1]
+
+
+def summarize(rec: Recorder, wall: float) -> dict:
+    out = {}
+    for endpoint, values in sorted(rec.samples.items()):
+        out[endpoint] = {
+            "count": len(values),
+            "errors": rec.errors.get(endpoint, 0),
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+            "rps": round(len(values) / wall, 2) if wall else 0.0,
+        }
+    return out
+
+
+# --------- сценарий ---------
+
+def load_fixtures(app, sample: int = 50) -> dict:
+    """Открытые вакансии, интервьюеры и кандидаты для запросов (читаются один раз)."""
+    from flask import g
+    from model_route import run_sql, run_sql_page
+
+    with app.app_context():
+        g.db_config = app.config['db_config']
+        vacancies = run_sql('interview_vacancies_open.sql', {})[:sample]
+        employees = [e['emp_id'] for e in run_sql('interview_employees.sql', {})[:sample]]
+        candidates = {}
+        for v in vacancies:
+            rows, _ = run_sql_page('interview_candidates_by_vacancy.sql', {"vac_id": v['vac_id']},
+                                   key=["full_name", "cand_id"], limit=20)
+            if rows:
+                candidates[v['vac_id']] = [r['cand_id'] for r in rows]
+    if not candidates or not employees:
+        raise SystemExit("Нет открытых вакансий с кандидатами — сначала python -m bench.generate_data")
+    return {"candidates": candidates, "employees": employees}
+
+
+def user_loop(client, rec: Recorder, fx: dict, args, stop: threading.Event, seed: int):
+    rnd = random.Random(seed)
+    rec.timed("auth.login", lambda: client.post('/auth/login', form={
+        "login": args.login, "pass": args.password}))
+
+    done = 0
+    while not stop.is_set() and (args.duration or done < args.iterations):
+        vac_id = rnd.choice(list(fx["candidates"]))
+        emp_id = rnd.choice(fx["employees"])
+        date = (dt.date.today() + dt.timedelta(days=rnd.randint(1, 60))).isoformat()
+
+        rec.timed("interviews.candidates", lambda: client.get(
+            '/interviews/candidates', {"vac_id": vac_id, "date": date, "emp_id": emp_id}))
+        for cand_id in rnd.sample(fx["candidates"][vac_id], min(3, len(fx["candidates"][vac_id]))):
+            rec.timed("interviews.add_ajax", lambda: client.post('/interviews/add_ajax', json_body={
+                "vac_id": vac_id, "date": date, "emp_id": emp_id, "cand_id": cand_id}))
+        if not args.no_writes:
+            rec.timed("interviews.confirm", lambda: client.post('/interviews/confirm', form={
+                "vac_id": vac_id, "date": date, "emp_id": emp_id}))
+
+        year = rnd.randint(dt.date.today().year - 2, dt.date.today().year)
+        rec.timed("queries.query_run", lambda: client.post('/queries/run', form={
+            "qid": "new_employees", "start_date": f"{year}-01-01", "end_date": f"{year}-12-31"}))
+        rec.timed("queries.query_run", lambda: client.post('/queries/run', form={
+            "qid": "open_vacancies_by_month", "year": year}))
+        rec.timed("reports.report_run[view]", lambda: client.post('/reports/run', form={
+            "report_id": "interviews_monthly", "action": "view",
+            "p_month": rnd.randint(1, 12), "p_year": year}))
+        done += 1
+
+
+def run(args) -> dict:
+    sys.path.insert(0, BASE_DIR)
+    os.chdir(BASE_DIR)  # create_app читает data/ относительно корня
+    from app import create_app
+    # приложение нужно и в HTTP-режиме: через него читаются id для запросов
+    app = create_app()
+    fx = load_fixtures(app)
+
+    rec, stop = Recorder(), threading.Event()
+    threads = []
+    for i in range(args.users):
+        client = _HttpClient(args.base_url) if args.base_url else _TestClient(app)
+        threads.append(threading.Thread(target=user_loop, name=f"bench-user-{i}",
+                                        args=(client, rec, fx, args, stop, args.seed + i)))
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    if args.duration:
+        stop.wait(args.duration)
+        stop.set()
+    for t in threads:
+        t.join()
+    wall = time.monotonic() - started
+
+    return {
+        "commit": _git_commit(),
+        "created_at": dt.datetime.now().isoformat(timespec="seconds"),
+        "config": {"users": args.users, "iterations": args.iterations, "duration": args.duration,
+                   "mode": "http" if args.base_url else "test_client", "no_writes": args.no_writes},
+        "wall_seconds": round(wall, 2),
+        "endpoints": summarize(rec, wall),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# --------- вывод и сравнение ---------
+
+def print_table(result: dict, baseline: dict | None = None):
+    print(f"commit {result['commit']}, {result['wall_seconds']} с, "
+          f"{result['config']['users']} польз., режим {result['config']['mode']}")
+    print(f"{'endpoint':32} {'n':>6} {'err':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'rps':>8}")
+    for endpoint, st in result["endpoints"].items():
+        line = (f"{endpoint:32} {st['count']:>6} {st['errors']:>5} {st['p50_ms']:>9.1f} "
+                f"{st['p95_ms']:>9.1f} {st['p99_ms']:>9.1f} {st['rps']:>8.1f}")
+        base = (baseline or {}).get("endpoints", {}).get(endpoint)
+        if base and base["p95_ms"]:
+            line += f"   p95 {100 * (st['p95_ms'] - base['p95_ms']) / base['p95_ms']:+.0f}%"
+        print(line)
+
+
+def regressions(result: dict, baseline: dict, tolerance: float) -> list:
+    """Endpoint'ы, у которых p95 вырос больше чем на tolerance (доля)."""
+    out = []
+    for endpoint, st in result["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(endpoint)
+        if base and base["p95_ms"] and st["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            out.append(endpoint)
+    return out
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Нагрузочный прогон сценариев приложения")
+    ap.add_argument("--base-url", help="HTTP вместо test_client, например http://127.0.0.1:5000")
+    ap.add_argument("--users", type=int, default=4, help="одновременных пользователей")
+    ap.add_argument("--iterations", type=int, default=20, help="кругов сценария на пользователя")
+    ap.add_argument("--duration", type=float, help="вместо --iterations: секунд работы")
+    ap.add_argument("--login", default="admin1")
+    ap.add_argument("--password", default="admin_pass")
+    ap.add_argument("--no-writes", action="store_true", help="не вызывать confirm (без записи в БД)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--save", metavar="NAME", help="сохранить результат в bench/baselines/NAME.json")
+    ap.add_argument("--compare", metavar="PATH", help="сравнить с сохранённым результатом")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="допустимый рост p95 при --compare")
+    args = ap.parse_args(argv)
+
+    result = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_table(result, baseline)
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"сохранено: {path}")
+
+    if baseline is not None:
+        worse = regressions(result, baseline, args.tolerance)
+        if worse:
+            print(f"p95 вырос больше чем на {args.tolerance:.0%}: {', '.join(worse)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
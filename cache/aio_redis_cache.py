@@ -0,0 +1,153 @@
+# cache/aio_redis_cache.py
+from __future__ import annotations
+
+import uuid
+from typing import Any, Dict
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, ConnectionError
+
+from cache.codecs import Codec
+from cache.circuit_breaker import CircuitBreaker
+from cache.redis_cache import INVALIDATE_CHANNEL, RedisCache, _INVALIDATE_LUA, _TAG_LUA
+
+
+class AsyncRedisCache:
+    """
+    Асинхронный (redis.asyncio) вариант RedisCache для ASGI-приложения.
+    Тот же конфиг, формат значений (Codec) и схема ключей/тегов, поэтому кэш
+    общий с синхронными воркерами. L1 нет; об изменённых ключах сообщается
+    в тот же канал инвалидации, чтобы синхронные воркеры сбросили свой L1.
+    """
+
+    def __init__(self, cfg: Dict[str, Any]):
+        self.ttl_minutes = cfg.get("ttl_minutes", 15)
+        redis_cfg = {k: v for k, v in cfg.items() if k not in RedisCache._OWN_KEYS}
+        redis_cfg["decode_responses"] = False
+        for k, v in RedisCache._DEFAULT_SOCKET.items():
+            redis_cfg.setdefault(k, v)
+        self.codec = Codec.from_config(cfg)
+        self.breaker = CircuitBreaker(**(cfg.get("breaker") or {}))
+        self._conn = Redis(**redis_cfg)
+        self._instance_id = uuid.uuid4().hex
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def conn(self) -> Redis | None:
+        """Клиент или None, пока предохранитель разомкнут (соединения redis.asyncio ленивые)."""
+        return self._conn if self.breaker.allow() else None
+
+    def _ok(self):
+        if self.breaker.half_open:
+            self.breaker.record_success()
+
+    def _fail(self, op: str, e: Exception):
+        print(f"[AsyncRedisCache] fallback({op}): {e}")
+        if isinstance(e, RedisError):
+            self.breaker.record_failure()
+
+    async def _publish_invalidate(self, names):
+        conn = self.conn
+        if conn is None or not names:
+            return
+        try:
+            async with conn.pipeline(transaction=False) as pipe:
+                for name in names:
+                    pipe.publish(INVALIDATE_CHANNEL, f"{self._instance_id}|{name}")
+                await pipe.execute()
+        except (RedisError, ConnectionError) as e:
+            self._fail("publish", e)
+
+    # --------- базовые операции ---------
+
+    async def get_value(self, name: str):
+        conn = self.conn
+        if conn is None:
+            return None
+        try:
+            raw = await conn.get(name)
+            self._ok()
+        except (RedisError, ConnectionError) as e:
+            self._fail("get", e)
+            return None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            return self.codec.loads(raw)
+        except ValueError as e:
+            self._fail("get", e)
+            return None
+
+    async def set_value(self, name: str, value, ttl: int | None = None):
+        conn = self.conn
+        if conn is None:
+            return
+        try:
+            ex_seconds = ttl if ttl is not None else self.ttl_minutes * 60
+            await conn.set(name, self.codec.dumps(value), ex=ex_seconds)
+            self._ok()
+        except (RedisError, ConnectionError, TypeError) as e:
+            self._fail("set", e)
+            return
+        await self._publish_invalidate([name])
+
+    async def delete_many(self, names):
+        names = list(dict.fromkeys(names))
+        conn = self.conn
+        if not names or conn is None:
+            return
+        try:
+            await conn.delete(*names)
+            self._ok()
+        except (RedisError, ConnectionError) as e:
+            self._fail("delete_many", e)
+            return
+        await self._publish_invalidate(names)
+
+    async def incr(self, name: str) -> int | None:
+        conn = self.conn
+        if conn is None:
+            return None
+        try:
+            value = int(await conn.incr(name))
+            self._ok()
+            return value
+        except (RedisError, ConnectionError) as e:
+            self._fail("incr", e)
+            return None
+
+    # --------- теги ---------
+
+    async def tag_keys(self, name, tags, ttl: int | None = None):
+        tags = [t for t in (tags or []) if t]
+        names = [name] if isinstance(name, str) else list(name)
+        conn = self.conn
+        if not tags or not names or conn is None:
+            return
+        ex_seconds = ttl if ttl is not None else self.ttl_minutes * 60
+        try:
+            await conn.eval(_TAG_LUA, len(tags), *[f"tag:{t}" for t in tags], ex_seconds, *names)
+            self._ok()
+        except (RedisError, ConnectionError) as e:
+            self._fail("tag", e)
+
+    async def invalidate_tags(self, tags) -> int:
+        tags = [t for t in (tags or []) if t]
+        conn = self.conn
+        if not tags or conn is None:
+            return 0
+        try:
+            members = await conn.eval(_INVALIDATE_LUA, len(tags), *[f"tag:{t}" for t in tags]) or []
+            self._ok()
+        except (RedisError, ConnectionError) as e:
+            self._fail("invalidate", e)
+            return 0
+        await self._publish_invalidate([m.decode("utf-8") if isinstance(m, bytes) else m
+                                        for m in members])
+        return len(members)
+
+    async def close(self):
+        await self._conn.aclose() if hasattr(self._conn, "aclose") else await self._conn.close()
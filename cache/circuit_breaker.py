@@ -0,0 +1,84 @@
+# cache/circuit_breaker.py
+from __future__ import annotations
+
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для внешнего сервиса (Redis).
+
+    closed    — всё работает; failure_threshold ошибок за window секунд → open;
+    open      — обращения не делаются вовсе, пока не пройдёт reset_timeout;
+    half_open — пропускается одна пробная попытка: успех → closed, ошибка → open.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 10.0,
+                 window: float = 30.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self.window = window
+        self.state = self.CLOSED
+        self._failures: list[float] = []
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.opened_count = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Можно ли сейчас обращаться к сервису."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # half_open: одна пробная попытка за раз
+            if self._probe_in_flight:
+                self.rejected += 1
+                return False
+            self._probe_in_flight = True
+            return True
+
+    @property
+    def half_open(self) -> bool:
+        return self.state == self.HALF_OPEN
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures.clear()
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        now = time.monotonic()
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._open(now)
+                return
+            self._failures = [t for t in self._failures if now - t < self.window]
+            self._failures.append(now)
+            if len(self._failures) >= self.failure_threshold:
+                self._open(now)
+
+    def _open(self, now: float):
+        self.state = self.OPEN
+        self._opened_at = now
+        self._failures.clear()
+        self._probe_in_flight = False
+        self.opened_count += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "opened_count": self.opened_count,
+                "rejected": self.rejected,
+            }
@@ -0,0 +1,170 @@
+# cache/codecs.py
+from __future__ import annotations
+
+import datetime as dt
+import json
+import zlib
+from decimal import Decimal
+from typing import Any, Dict
+
+try:  # необязательные зависимости: без них работают json + zlib
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover
+    lz4_frame = None
+
+# Формат значения: MAGIC + <codec> + <compression> + payload.
+# Значения без MAGIC — старые записи (json.dumps), читаются как JSON.
+MAGIC = b"\x01"
+
+_EXT_DATE = 1
+_EXT_DATETIME = 2
+_EXT_DECIMAL = 3
+_EXT_TIMEDELTA = 4
+
+
+# --------- JSON с поддержкой date/Decimal ---------
+
+def _json_default(o):
+    if isinstance(o, dt.datetime):
+        return {"__dt__": o.isoformat()}
+    if isinstance(o, dt.date):
+        return {"__d__": o.isoformat()}
+    if isinstance(o, Decimal):
+        return {"__dec__": str(o)}
+    if isinstance(o, dt.timedelta):
+        return {"__td__": o.total_seconds()}
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _json_hook(d):
+    if len(d) == 1:
+        if "__dt__" in d:
+            return dt.datetime.fromisoformat(d["__dt__"])
+        if "__d__" in d:
+            return dt.date.fromisoformat(d["__d__"])
+        if "__dec__" in d:
+            return Decimal(d["__dec__"])
+        if "__td__" in d:
+            return dt.timedelta(seconds=d["__td__"])
+    return d
+
+
+def _json_dumps(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, default=_json_default,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def _json_loads(raw: bytes):
+    return json.loads(raw, object_hook=_json_hook)
+
+
+# --------- msgpack с ext-типами ---------
+
+def _msgpack_default(o):
+    if isinstance(o, dt.datetime):
+        return msgpack.ExtType(_EXT_DATETIME, o.isoformat().encode())
+    if isinstance(o, dt.date):
+        return msgpack.ExtType(_EXT_DATE, o.isoformat().encode())
+    if isinstance(o, Decimal):
+        return msgpack.ExtType(_EXT_DECIMAL, str(o).encode())
+    if isinstance(o, dt.timedelta):
+        return msgpack.ExtType(_EXT_TIMEDELTA, str(o.total_seconds()).encode())
+    raise TypeError(f"Object of type {type(o).__name__} is not msgpack serializable")
+
+
+def _msgpack_ext_hook(code, data):
+    text = data.decode()
+    if code == _EXT_DATETIME:
+        return dt.datetime.fromisoformat(text)
+    if code == _EXT_DATE:
+        return dt.date.fromisoformat(text)
+    if code == _EXT_DECIMAL:
+        return Decimal(text)
+    if code == _EXT_TIMEDELTA:
+        return dt.timedelta(seconds=float(text))
+    return msgpack.ExtType(code, data)
+
+
+def _msgpack_dumps(value) -> bytes:
+    return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+
+
+def _msgpack_loads(raw: bytes):
+    return msgpack.unpackb(raw, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+
+
+_SERIALIZERS = {
+    b"j": (_json_dumps, _json_loads),
+    b"m": (_msgpack_dumps, _msgpack_loads),
+}
+
+_COMPRESSORS = {
+    b"n": (lambda b: b, lambda b: b),
+    b"z": (lambda b: zlib.compress(b, 6), zlib.decompress),
+    b"4": ((lambda b: lz4_frame.compress(b)) if lz4_frame else None,
+           (lambda b: lz4_frame.decompress(b)) if lz4_frame else None),
+}
+
+_CODEC_IDS = {"json": b"j", "msgpack": b"m"}
+_COMPRESSION_IDS = {"none": b"n", "zlib": b"z", "lz4": b"4"}
+
+
+class Codec:
+    """
+    Сериализация значений кэша: json | msgpack, плюс сжатие zlib | lz4
+    для значений больше compress_threshold байт. Маркер формата пишется
+    в начало значения, поэтому разные форматы могут жить рядом.
+    """
+
+    def __init__(self, codec: str = "json", compression: str = "zlib",
+                 compress_threshold: int = 1024):
+        if codec == "msgpack" and msgpack is None:
+            print("[RedisCache] msgpack не установлен — используется json")
+            codec = "json"
+        if compression == "lz4" and lz4_frame is None:
+            print("[RedisCache] lz4 не установлен — используется zlib")
+            compression = "zlib"
+        self.codec_id = _CODEC_IDS.get(codec, b"j")
+        self.compression_id = _COMPRESSION_IDS.get(compression, b"z")
+        self.compress_threshold = compress_threshold
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any] | None) -> "Codec":
+        cfg = cfg or {}
+        return cls(
+            codec=cfg.get("codec", "json"),
+            compression=cfg.get("compression", "zlib"),
+            compress_threshold=cfg.get("compress_threshold", 1024),
+        )
+
+    def dumps(self, value) -> bytes:
+        payload = _SERIALIZERS[self.codec_id][0](value)
+        comp = b"n"
+        if self.compression_id != b"n" and len(payload) > self.compress_threshold:
+            comp = self.compression_id
+            payload = _COMPRESSORS[comp][0](payload)
+        return MAGIC + self.codec_id + comp + payload
+
+    def loads(self, raw):
+        """ValueError — если значение не удаётся разобрать."""
+        if isinstance(raw, str):
+            raw = raw.encode("utf-8")
+        if not raw.startswith(MAGIC):
+            return json.loads(raw)  # запись старого формата
+        codec_id, comp, payload = raw[1:2], raw[2:3], raw[3:]
+        try:
+            loads = _SERIALIZERS[codec_id][1]
+            decompress = _COMPRESSORS[comp][1]
+        except KeyError:
+            raise ValueError(f"Неизвестный формат значения кэша: {raw[:3]!r}")
+        if decompress is None or (codec_id == b"m" and msgpack is None):
+            raise ValueError(f"Формат {raw[:3]!r} не поддерживается в этом окружении")
+        try:
+            return loads(decompress(payload))
+        except Exception as e:
+            raise ValueError(f"Повреждённое значение кэша: {e}") from e
@@ -0,0 +1,75 @@
+# cache/invalidation.py
+from __future__ import annotations
+
+import re
+
+from flask import current_app
+
+# Какие теги кэша сбрасывает запись в таблицу. Теги ставит fetch_from_cache(tags=...).
+TAGS_BY_TABLE = {
+    "candidate": ["candidate"],
+    "employee":  ["employee"],
+    "vacancy":   ["vacancy"],
+    "schedule_": ["candidate", "vacancy"],
+}
+
+# Запись в эти группы увеличивает версию справочников (interviews/services/reference.py):
+# по ней воркеры понимают, что их снимок в памяти устарел.
+REFDATA_TAGS = {"vacancy", "employee"}
+REFDATA_VERSION_KEY = "refdata:version"
+
+# Явные правила для скриптов и процедур (дополняют правила по таблицам).
+# Значения — шаблоны тегов, форматируются параметрами запроса: "vacancy:{vac_id}".
+# Теги по одной записи ставят читатели: кандидаты по вакансии — "vacancy:{vac_id}",
+# карточка кандидата — "candidate:{cand_id}" (interviews/services/candidates.py).
+# Процедуры отчётов здесь не нужны: готовые строки сбрасывает report.result_cache.forget.
+TAGS_BY_SCRIPT: dict[str, list[str]] = {
+    "interview_event_insert.sql":     ["vacancy:{vac_id}"],
+    "interview_event_update_emp.sql": ["interview:{event_id}"],
+    "interview_call_insert.sql":      ["candidate:{cand_id}"],
+}
+
+_WRITE_TABLE_RE = re.compile(
+    r"^\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM)\s+`?(\w+)`?",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def written_tables(sql: str) -> set[str]:
+    """Таблицы, в которые пишет скрипт (по INSERT/UPDATE/DELETE/REPLACE)."""
+    text = "\n".join(line for line in (sql or "").splitlines()
+                     if not line.lstrip().startswith("--"))
+    return {m.group(1).lower() for m in _WRITE_TABLE_RE.finditer(text)}
+
+
+def tags_for(sql_name: str, sql: str | None, params=None) -> set[str]:
+    tags = set()
+    for table in written_tables(sql or ""):
+        tags.update(TAGS_BY_TABLE.get(table, ()))
+
+    args = params if isinstance(params, dict) else {}
+    for pattern in TAGS_BY_SCRIPT.get(sql_name, ()):
+        try:
+            tags.add(pattern.format(**args))
+        except (KeyError, IndexError):
+            # параметра нет — сбрасываем всю группу по префиксу шаблона
+            tags.add(pattern.split(":", 1)[0])
+    return tags
+
+
+def invalidate(tags) -> int:
+    """Сбросить ключи по тегам в кэше приложения (если он есть)."""
+    tags = set(tags or ())
+    if not tags:
+        return 0
+    cache = current_app.extensions.get("redis_cache")
+    if cache is None:
+        return 0
+    if tags & REFDATA_TAGS:
+        cache.incr(REFDATA_VERSION_KEY)
+    return cache.invalidate_tags(tags)
+
+
+def invalidate_after_write(sql_name: str, sql: str | None, params=None) -> int:
+    """Вызывается model_route после COMMIT пишущего скрипта/процедуры."""
+    return invalidate(tags_for(sql_name, sql, params))
@@ -0,0 +1,75 @@
+# cache/local_cache.py
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """
+    Внутрипроцессный LRU-кэш (L1) перед Redis: ограничен по размеру
+    и по времени жизни записи. Значения отдаются копией, чтобы вызывающий
+    код не мог испортить общую запись.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl_seconds: float = 5.0):
+        self.max_size = max(1, int(max_size))
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, name: str, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(name, _MISSING)
+            if entry is _MISSING or entry[0] < now:
+                if entry is not _MISSING:
+                    del self._data[name]
+                self.misses += 1
+                return default
+            self._data.move_to_end(name)
+            self.hits += 1
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def set(self, name: str, value, ttl: float | None = None):
+        ttl = self.ttl_seconds if ttl is None else min(ttl, self.ttl_seconds)
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._data[name] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(name)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, name: str):
+        with self._lock:
+            if self._data.pop(name, _MISSING) is not _MISSING:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -1,61 +1,537 @@
 # cache/redis_cache.py
 from __future__ import annotations
 
-import json
+import threading
+import time
+import uuid
 from typing import Any, Dict
 
-from redis import Redis
+from redis import ConnectionPool, Redis
 from redis.exceptions import RedisError, ConnectionError
 
+from cache.local_cache import LocalLRU
+from cache.codecs import Codec
+from cache.circuit_breaker import CircuitBreaker
+
+# канал, через который воркеры сообщают друг другу об изменённых ключах
+INVALIDATE_CHANNEL = "cache:invalidate"
+
+# удалить ключ, только если в нём всё ещё ожидаемое значение (снять свою блокировку)
+_UNLOCK_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# заменить значение, только если в ключе всё ещё ожидаемое (compare-and-set)
+_SWAP_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    redis.call('set', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+# SADD и продление TTL множества тегов; без EXPIRE GT/NX, которых нет до Redis 7
+_TAG_LUA = """
+local ex = tonumber(ARGV[1])
+for _, tag in ipairs(KEYS) do
+    for i = 2, #ARGV, 1000 do
+        redis.call('sadd', tag, unpack(ARGV, i, math.min(i + 999, #ARGV)))
+    end
+    if redis.call('ttl', tag) < ex then
+        redis.call('expire', tag, ex)
+    end
+end
+return 0
+"""
+
+# прочитать множества тегов и удалить их ключи одной атомарной операцией;
+# возвращает имена удалённых ключей (для сброса L1 в других воркерах)
+_INVALIDATE_LUA = """
+local seen, names = {}, {}
+for _, tag in ipairs(KEYS) do
+    for _, name in ipairs(redis.call('smembers', tag)) do
+        if not seen[name] then
+            seen[name] = true
+            names[#names + 1] = name
+        end
+    end
+end
+for i = 1, #names, 1000 do
+    redis.call('del', unpack(names, i, math.min(i + 999, #names)))
+end
+redis.call('del', unpack(KEYS))
+return names
+"""
+
 
 class RedisCache:
+    # ключи конфигурации самого кэша (остальные уходят в Redis(**cfg))
+    _OWN_KEYS = ("ttl_minutes", "l1", "codec", "compression", "compress_threshold", "breaker")
+
+    # короткие таймауты: при недоступном Redis запрос не должен ждать секундами
+    _DEFAULT_SOCKET = {"socket_timeout": 0.25, "socket_connect_timeout": 0.25,
+                       "max_connections": 50}
+
     def __init__(self, cfg: Dict[str, Any]):
         self.ttl_minutes = cfg.get("ttl_minutes", 15)
-        self._cfg = {k: v for k, v in cfg.items() if k != "ttl_minutes"}
+        l1_cfg = cfg.get("l1")
+        self._cfg = {k: v for k, v in cfg.items() if k not in self._OWN_KEYS}
+        # значения — байты (маркер формата + payload), поэтому ответы не декодируем
+        self._cfg["decode_responses"] = False
+        for k, v in self._DEFAULT_SOCKET.items():
+            self._cfg.setdefault(k, v)
+        self.codec = Codec.from_config(cfg)
+        self.breaker = CircuitBreaker(**(cfg.get("breaker") or {}))
+        self._pool: ConnectionPool | None = None
         self._conn: Redis | None = None
 
+        # L1: необязательный LRU в памяти процесса ({"max_size": ..., "ttl_seconds": ...})
+        self.l1: LocalLRU | None = LocalLRU(**l1_cfg) if l1_cfg else None
+        self._listener = None
+        self._instance_id = uuid.uuid4().hex  # свои сообщения об инвалидации пропускаем
+        self._listener_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
     @property
     def conn(self) -> Redis | None:
-        if self._conn is None:
+        """
+        Клиент Redis или None, если предохранитель разомкнут. Пока Redis
+        недоступен, обращения к нему не делаются до истечения reset_timeout,
+        затем одна пробная команда PING решает, замыкать ли цепь.
+        """
+        if not self.breaker.allow():
+            return None
+        if self._conn is None or self.breaker.half_open:
             try:
-                self._conn = Redis(**self._cfg)
+                if self._conn is None:
+                    self._pool = ConnectionPool(**self._cfg)
+                    self._conn = Redis(connection_pool=self._pool)
                 self._conn.ping()
+                self.breaker.record_success()
             except (RedisError, ConnectionError) as e:
-                print(f"[RedisCache] connection error: {e}")
-                self._conn = None
+                self._fail("connect", e)
+                return None
+        if self.l1 is not None and (self._listener is None or not self._listener.is_alive()):
+            self._listener = None
+            self._start_listener()
         return self._conn
 
+    def _fail(self, op: str, e: Exception):
+        """Ошибка операции: лог и, для ошибок Redis, учёт в предохранителе."""
+        print(f"[RedisCache] fallback({op}): {e}")
+        if isinstance(e, RedisError):
+            self.breaker.record_failure()
+
+    # --------- L1 и инвалидация между воркерами ---------
+
+    def _start_listener(self):
+        """Подписка на канал инвалидации: чужие изменения ключей сбрасывают L1."""
+        with self._listener_lock:
+            if self._listener is not None:
+                return
+            try:
+                pubsub = self._conn.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{INVALIDATE_CHANNEL: self._on_invalidate})
+                self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+            except (RedisError, ConnectionError) as e:
+                self._fail("pubsub", e)
+
+    def _on_invalidate(self, message):
+        data = message.get("data")
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        sender, _, name = (data or "").partition("|")
+        if self.l1 is not None and name and sender != self._instance_id:
+            self.l1.delete(name)
+
+    def _publish_invalidate(self, name: str):
+        self._publish_invalidate_many([name])
+
+    def _publish_invalidate_many(self, names):
+        if self.l1 is None or not names:
+            return
+        for name in names:
+            self.l1.delete(name)
+        conn = self.conn
+        if conn is None:
+            return
+        try:
+            pipe = conn.pipeline(transaction=False)
+            for name in names:
+                pipe.publish(INVALIDATE_CHANNEL, f"{self._instance_id}|{name}")
+            pipe.execute()
+        except (RedisError, ConnectionError) as e:
+            self._fail("publish", e)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "redis": {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            },
+            "l1": self.l1.stats() if self.l1 is not None else None,
+            "breaker": self.breaker.stats(),
+        }
+
     # --------- базовые операции ---------
 
-    def get_value(self, name: str):
-        """Получить значение по ключу (JSON -> Python)"""
-        if self.conn is None:
+    def get_value(self, name: str, *, local: bool = True):
+        """
+        Получить значение по ключу (L1 -> Redis -> codec -> Python).
+        local=False — только из Redis, мимо L1 (для состояния, общего между воркерами).
+        """
+        if local and self.l1 is not None:
+            value = self.l1.get(name)
+            if value is not None:
+                return value
+        conn = self.conn
+        if conn is None:
             return None
         try:
-            raw = self.conn.get(name)
+            raw = conn.get(name)
             if raw is None:
+                self.misses += 1
                 return None
-            return json.loads(raw)
-        except (RedisError, ConnectionError, json.JSONDecodeError) as e:
-            print(f"[RedisCache] fallback(get): {e}")
+            self.hits += 1
+            value = self.codec.loads(raw)
+            if local and self.l1 is not None:
+                self.l1.set(name, value)
+            return value
+        except (RedisError, ConnectionError, ValueError) as e:
+            self._fail("get", e)
             return None
 
     def set_value(self, name: str, value, ttl: int | None = None):
-        if self.conn is None:
+        conn = self.conn
+        if conn is None:
             return
         try:
-            raw = json.dumps(value, ensure_ascii=False)
+            raw = self.codec.dumps(value)
             ex_seconds = ttl if ttl is not None else self.ttl_minutes * 60
-            self.conn.set(name, raw, ex=ex_seconds)
-        except (RedisError, ConnectionError) as e:
-            print(f"[RedisCache] fallback(set): {e}")
+            conn.set(name, raw, ex=ex_seconds)
+        except (RedisError, ConnectionError, TypeError) as e:
+            self._fail("set", e)
             return
+        # старые копии в L1 других воркеров больше не актуальны
+        self._publish_invalidate(name)
+        if self.l1 is not None:
+            self.l1.set(name, value, ex_seconds)
+
+    def add_value(self, name: str, value, ttl: int | None = None) -> bool | None:
+        """
+        SET NX: записать, только если ключа ещё нет. True — записали,
+        False — ключ уже есть, None — Redis недоступен.
+        """
+        conn = self.conn
+        if conn is None:
+            return None
+        try:
+            ex_seconds = ttl if ttl is not None else self.ttl_minutes * 60
+            return bool(conn.set(name, self.codec.dumps(value), ex=ex_seconds, nx=True))
+        except (RedisError, ConnectionError, TypeError) as e:
+            self._fail("add", e)
+            return None
+
+    def swap_value(self, name: str, expected, value, ttl: int | None = None) -> bool | None:
+        """
+        Атомарно заменить значение, только если в ключе всё ещё expected.
+        True — заменили, False — ключ уже другой (или его нет), None — Redis недоступен.
+        """
+        conn = self.conn
+        if conn is None:
+            return None
+        try:
+            ex_seconds = ttl if ttl is not None else self.ttl_minutes * 60
+            swapped = conn.eval(_SWAP_LUA, 1, name, self.codec.dumps(expected),
+                                self.codec.dumps(value), ex_seconds)
+        except (RedisError, ConnectionError, TypeError) as e:
+            self._fail("swap", e)
+            return None
+        if swapped:
+            self._publish_invalidate(name)
+        return bool(swapped)
+
+    def delete_if(self, name: str, expected) -> bool | None:
+        """Атомарно удалить ключ, только если в нём всё ещё expected (compare-and-delete)."""
+        if self.l1 is not None:
+            self.l1.delete(name)
+        conn = self.conn
+        if conn is None:
+            return None
+        try:
+            deleted = conn.eval(_UNLOCK_LUA, 1, name, self.codec.dumps(expected))
+        except (RedisError, ConnectionError, TypeError) as e:
+            self._fail("delete_if", e)
+            return None
+        if deleted:
+            self._publish_invalidate(name)
+        return bool(deleted)
+
     def delete(self, name: str):
-        """Удалить ключ"""
-        if self.conn is None:
+        """Удалить ключ (и его L1-копии во всех воркерах)"""
+        # своя L1-копия сбрасывается, даже если Redis недоступен
+        if self.l1 is not None:
+            self.l1.delete(name)
+        conn = self.conn
+        if conn is None:
+            return
+        try:
+            conn.delete(name)
+        except (RedisError, ConnectionError) as e:
+            self._fail("delete", e)
             return
+        self._publish_invalidate(name)
+
+    # --------- пакетные операции ---------
+
+    def get_many(self, names) -> Dict[str, Any]:
+        """Значения для списка ключей: L1, затем один MGET. Промахи в результат не попадают."""
+        names = list(dict.fromkeys(names))
+        found: Dict[str, Any] = {}
+        rest = names
+        if self.l1 is not None:
+            rest = []
+            for name in names:
+                value = self.l1.get(name)
+                if value is None:
+                    rest.append(name)
+                else:
+                    found[name] = value
+        conn = self.conn
+        if not rest or conn is None:
+            return found
         try:
-            self.conn.delete(name)
+            raws = conn.mget(rest)
         except (RedisError, ConnectionError) as e:
-            print(f"[RedisCache] fallback(delete): {e}")
+            self._fail("mget", e)
+            return found
+        for name, raw in zip(rest, raws):
+            if raw is None:
+                self.misses += 1
+                continue
+            try:
+                value = self.codec.loads(raw)
+            except ValueError:
+                self.misses += 1
+                continue
+            self.hits += 1
+            found[name] = value
+            if self.l1 is not None:
+                self.l1.set(name, value)
+        return found
+
+    def set_many(self, items: Dict[str, Any], ttl: int | None = None):
+        """Записать несколько ключей одним pipeline (SET ... EX для каждого)."""
+        conn = self.conn
+        if not items or conn is None:
+            return
+        ex_seconds = ttl if ttl is not None else self.ttl_minutes * 60
+        try:
+            pipe = conn.pipeline(transaction=False)
+            for name, value in items.items():
+                pipe.set(name, self.codec.dumps(value), ex=ex_seconds)
+            pipe.execute()
+        except (RedisError, ConnectionError, TypeError) as e:
+            self._fail("set_many", e)
             return
+        self._publish_invalidate_many(list(items))
+        if self.l1 is not None:
+            for name, value in items.items():
+                self.l1.set(name, value, ex_seconds)
+
+    def delete_many(self, names):
+        names = list(dict.fromkeys(names))
+        if self.l1 is not None:
+            for name in names:
+                self.l1.delete(name)
+        conn = self.conn
+        if not names or conn is None:
+            return
+        try:
+            conn.delete(*names)
+        except (RedisError, ConnectionError) as e:
+            self._fail("delete_many", e)
+            return
+        self._publish_invalidate_many(names)
+
+    # --------- счётчики (целые без кодека) ---------
+
+    def incr(self, name: str) -> int | None:
+        """INCR; None — Redis недоступен."""
+        conn = self.conn
+        if conn is None:
+            return None
+        try:
+            return int(conn.incr(name))
+        except (RedisError, ConnectionError) as e:
+            self._fail("incr", e)
+            return None
+
+    def get_int(self, name: str) -> int | None:
+        """Значение счётчика: 0 — ключа нет, None — Redis недоступен."""
+        conn = self.conn
+        if conn is None:
+            return None
+        try:
+            raw = conn.get(name)
+            return int(raw) if raw is not None else 0
+        except (RedisError, ConnectionError, ValueError) as e:
+            self._fail("get_int", e)
+            return None
+
+    # --------- хэши (небольшие изменяемые структуры без кодека) ---------
+
+    @staticmethod
+    def _text(v):
+        return v.decode("utf-8") if isinstance(v, bytes) else v
+
+    def hash_get_all(self, name: str) -> Dict[str, str] | None:
+        """Все поля хэша строками; {} — хэша нет, None — Redis недоступен."""
+        conn = self.conn
+        if conn is None:
+            return None
+        try:
+            raw = conn.hgetall(name) or {}
+        except (RedisError, ConnectionError) as e:
+            self._fail("hgetall", e)
+            return None
+        return {self._text(k): self._text(v) for k, v in raw.items()}
+
+    def hash_set(self, name: str, mapping: Dict[str, Any], ttl: int | None = None) -> bool:
+        """HSET нескольких полей и продление TTL одним round trip. False — Redis недоступен."""
+        conn = self.conn
+        if conn is None:
+            return False
+        try:
+            pipe = conn.pipeline(transaction=False)
+            pipe.hset(name, mapping={k: str(v) for k, v in mapping.items()})
+            pipe.expire(name, ttl if ttl is not None else self.ttl_minutes * 60)
+            pipe.execute()
+        except (RedisError, ConnectionError) as e:
+            self._fail("hset", e)
+            return False
+        return True
+
+    def hash_delete(self, name: str, *fields, ttl: int | None = None) -> bool:
+        """HDEL полей (и продление TTL оставшегося хэша). False — Redis недоступен."""
+        conn = self.conn
+        if conn is None:
+            return False
+        if not fields:
+            return True
+        try:
+            pipe = conn.pipeline(transaction=False)
+            pipe.hdel(name, *fields)
+            pipe.expire(name, ttl if ttl is not None else self.ttl_minutes * 60)
+            pipe.execute()
+        except (RedisError, ConnectionError) as e:
+            self._fail("hdel", e)
+            return False
+        return True
+
+    # --------- single-flight ---------
+
+    def get_with_ttl(self, name: str):
+        """
+        Значение и оставшийся TTL в секундах одним round trip (GET + PTTL).
+        При попадании в L1 TTL неизвестен — возвращается None.
+        """
+        if self.l1 is not None:
+            value = self.l1.get(name)
+            if value is not None:
+                return value, None
+        conn = self.conn
+        if conn is None:
+            return None, None
+        try:
+            pipe = conn.pipeline(transaction=False)
+            pipe.get(name)
+            pipe.pttl(name)
+            raw, pttl = pipe.execute()
+            if raw is None:
+                self.misses += 1
+                return None, None
+            self.hits += 1
+            value = self.codec.loads(raw)
+            if self.l1 is not None:
+                self.l1.set(name, value)
+            return value, (pttl / 1000.0 if pttl and pttl > 0 else None)
+        except (RedisError, ConnectionError, ValueError) as e:
+            self._fail("get_with_ttl", e)
+            return None, None
+
+    def acquire_lock(self, name: str, ttl_ms: int) -> str | None:
+        """Короткая блокировка SET NX PX. Возвращает токен или None, если занято/нет Redis."""
+        conn = self.conn
+        if conn is None:
+            return None
+        token = uuid.uuid4().hex
+        try:
+            if conn.set(f"lock:{name}", token, nx=True, px=ttl_ms):
+                return token
+        except (RedisError, ConnectionError) as e:
+            self._fail("lock", e)
+        return None
+
+    def release_lock(self, name: str, token: str):
+        conn = self.conn
+        if conn is None or not token:
+            return
+        try:
+            conn.eval(_UNLOCK_LUA, 1, f"lock:{name}", token)
+        except (RedisError, ConnectionError) as e:
+            self._fail("unlock", e)
+
+    def wait_value(self, name: str, timeout: float, interval: float = 0.05):
+        """Подождать, пока другой воркер положит значение в ключ (опрос)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(interval)
+            value = self.get_value(name)
+            if value is not None:
+                return value
+        return None
+
+    # --------- теги (группы ключей для инвалидации) ---------
+
+    def tag_keys(self, name, tags, ttl: int | None = None):
+        """Записать ключ (или список ключей) в множества tag:<tag>, чтобы потом сбросить группу без KEYS."""
+        tags = [t for t in (tags or []) if t]
+        names = [name] if isinstance(name, str) else list(name)
+        conn = self.conn
+        if not tags or not names or conn is None:
+            return
+        ex_seconds = ttl if ttl is not None else self.ttl_minutes * 60
+        try:
+            # множество живёт не меньше самого долгого ключа в нём
+            conn.eval(_TAG_LUA, len(tags), *[f"tag:{t}" for t in tags], ex_seconds, *names)
+        except (RedisError, ConnectionError) as e:
+            self._fail("tag", e)
+
+    def invalidate_tags(self, tags) -> int:
+        """Удалить все ключи, помеченные любым из тегов. Возвращает число ключей."""
+        tags = [t for t in (tags or []) if t]
+        if not tags:
+            return 0
+        conn = self.conn
+        if conn is None:
+            # какие ключи под тегами, без Redis не узнать — сбрасываем свой L1 целиком
+            if self.l1 is not None:
+                self.l1.clear()
+            return 0
+        try:
+            members = conn.eval(_INVALIDATE_LUA, len(tags), *[f"tag:{t}" for t in tags]) or []
+        except (RedisError, ConnectionError) as e:
+            self._fail("invalidate", e)
+            if self.l1 is not None:
+                self.l1.clear()
+            return 0
+        self._publish_invalidate_many([m.decode("utf-8") if isinstance(m, bytes) else m
+                                       for m in members])
+        return len(members)
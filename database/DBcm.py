@@ -1,28 +1,46 @@
+import time
 
 import pymysql
+from database.pool import get_pool
+from database import metrics
 
 class DBContextManager:
-    def __init__(self, db_config: dict):
+    def __init__(self, db_config: dict, cursorclass=None):
         self.db_config = db_config
+        self.cursorclass = cursorclass
+        self.pool = None
+        self.item = None
         self.conn = None
         self.cur = None
 
     def __enter__(self):
-        self.conn = pymysql.connect(
-            host=self.db_config['host'],
-            user=self.db_config['user'],
-            password=self.db_config['password'],
-            database=self.db_config['database'],
-            cursorclass=pymysql.cursors.DictCursor,
-            autocommit=False
-        )
-        self.cur = self.conn.cursor()
+        # соединение берётся из пула для данного db_config, а не открывается заново
+        self.pool = get_pool(self.db_config)
+        started = time.perf_counter()
+        self.item = self.pool.acquire()
+        metrics.note_acquire(time.perf_counter() - started)
+        self.conn = self.item.conn
+        self.cur = self.conn.cursor(self.cursorclass) if self.cursorclass else self.conn.cursor()
         return self.cur
 
     def __exit__(self, exc_type, exc, tb):
+        # при сетевых ошибках соединение в пул не возвращаем
+        discard = bool(exc_type) and issubclass(
+            exc_type, (pymysql.err.OperationalError, pymysql.err.InterfaceError))
+        if exc_type is GeneratorExit and self.cursorclass:
+            # потоковое чтение прервано: дочитывать остаток результата дороже,
+            # чем закрыть соединение
+            self.pool.release(self.item, discard=True)
+            self.item = self.conn = self.cur = None
+            return
         try:
             if self.cur: self.cur.close()
             if self.conn:
                 self.conn.rollback() if exc_type else self.conn.commit()
+        except Exception:
+            discard = True
+            raise
         finally:
-            if self.conn: self.conn.close()
+            if self.item:
+                self.pool.release(self.item, discard=discard)
+            self.item = self.conn = self.cur = None
@@ -0,0 +1,91 @@
+"""
+Асинхронный доступ к MySQL (aiomysql) для ASGI-варианта приложения.
+Пулы — по одному на db_config и event loop; параметры — те же, что у
+синхронного пула (data/db_pool.json).
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import pymysql
+
+from database.pool import _pool_key
+
+try:  # необязательная зависимость: нужна только ASGI-варианту
+    import aiomysql
+except ImportError:  # pragma: no cover
+    aiomysql = None
+
+_settings = {"min_size": 0, "max_size": 10, "max_lifetime": 3600, "acquire_timeout": 10}
+_pools = {}
+_pool_locks = {}  # id(loop) -> asyncio.Lock: пул создаётся одной корутиной
+
+
+def configure(settings: dict | None):
+    for k, v in (settings or {}).items():
+        if k in _settings:
+            _settings[k] = v
+
+
+async def get_pool(db_config: dict):
+    if aiomysql is None:
+        raise RuntimeError("Для асинхронного доступа к БД нужен пакет aiomysql")
+    loop = asyncio.get_running_loop()
+    key = (id(loop),) + _pool_key(db_config)
+    pool = _pools.get(key)
+    if pool is not None:
+        return pool
+    lock = _pool_locks.get(id(loop))
+    if lock is None:
+        lock = _pool_locks[id(loop)] = asyncio.Lock()
+    async with lock:
+        # пока ждали блокировку, пул могла создать другая корутина
+        pool = _pools.get(key)
+        if pool is None:
+            cfg = {k: v for k, v in db_config.items() if k in ("host", "port", "user", "password", "database")}
+            cfg["db"] = cfg.pop("database", None)
+            pool = _pools[key] = await aiomysql.create_pool(
+                minsize=int(_settings["min_size"]), maxsize=int(_settings["max_size"]),
+                pool_recycle=int(_settings["max_lifetime"] or -1), autocommit=False,
+                charset="utf8mb4", cursorclass=aiomysql.DictCursor, **cfg)
+    return pool
+
+
+@asynccontextmanager
+async def cursor(db_config: dict):
+    """
+    async with cursor(db_cfg) as cur: ... — аналог DBContextManager:
+    COMMIT при успешном выходе, ROLLBACK при исключении; после сетевой
+    ошибки соединение закрывается, а не возвращается в пул.
+    """
+    pool = await get_pool(db_config)
+    try:
+        conn = await asyncio.wait_for(pool.acquire(), _settings["acquire_timeout"])
+    except asyncio.TimeoutError:
+        raise RuntimeError(f"Нет свободных соединений с БД (max_size={_settings['max_size']})")
+    try:
+        async with conn.cursor() as cur:
+            yield cur
+        await conn.commit()
+    except BaseException as e:
+        if isinstance(e, (pymysql.err.OperationalError, pymysql.err.InterfaceError)):
+            conn.close()
+        else:
+            await conn.rollback()
+        raise
+    finally:
+        pool.release(conn)
+
+
+async def select_list(db_config: dict, sql: str, params=None) -> list:
+    async with cursor(db_config) as cur:
+        await cur.execute(sql, params or None)
+        return list(await cur.fetchall())
+
+
+async def close_all():
+    pools = list(_pools.values())
+    _pools.clear()
+    _pool_locks.clear()
+    for pool in pools:
+        pool.close()
+        await pool.wait_closed()
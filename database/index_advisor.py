@@ -0,0 +1,261 @@
+"""
+Советчик по индексам: EXPLAIN FORMAT=JSON для каждого скрипта из sql/.
+
+    python -m database.index_advisor                 # отчёт по всем скриптам
+    python -m database.index_advisor --save          # записать снимки планов
+    python -m database.index_advisor --check         # сравнить со снимками (код 1 при изменениях)
+
+Запускается против локальной MySQL, залитой из db/schema.sql + db/seed.sql.
+Параметры скриптов берутся из db/explain_params.json, остальные подставляются
+по имени параметра (vac_id -> 1, date -> '2025-01-15', after_* -> NULL и т.д.).
+"""
+import argparse
+import json
+import os
+import re
+import sys
+
+import pymysql
+
+from database.sql_provider import SQLProvider
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SQL_DIR = os.path.join(BASE_DIR, 'sql')
+PARAMS_PATH = os.path.join(BASE_DIR, 'db', 'explain_params.json')
+SNAPSHOT_DIR = os.path.join(BASE_DIR, 'db', 'plans')
+DB_CONFIG_PATH = os.path.join(BASE_DIR, 'data', 'db_config.json')
+
+_PARAM_RE = re.compile(r"%\((\w+)\)s")
+_EXPLAINABLE = {"SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE"}
+# `db`.`alias`.`col` = … / `alias`.`col` > … в attached_condition
+_COND_RE = re.compile(
+    r"`(?:\w+`\.`)?(\w+)`\.`(\w+)`\s*(<=>|>=|<=|=|>|<|between\b|in\b)", re.IGNORECASE)
+
+# скрипты, которые не надо объяснять (например, устаревшие)
+SKIP_DIRS = {"notused"}
+
+
+def _guess_value(name: str):
+    """Представительное значение параметра по его имени."""
+    if name.startswith("after_"):
+        return None
+    if name == "limit":
+        return 51
+    if name.endswith("_ids"):
+        return [1, 2, 3]
+    if name in ("date", "start_date") or name.endswith("_date"):
+        return "2025-01-15" if name != "end_date" else "2025-12-31"
+    if name in ("year", "p_year"):
+        return 2025
+    if name in ("month", "p_month"):
+        return 1
+    if name.endswith("id"):
+        return 1
+    return "x"
+
+
+def script_params(name: str, sql: str, overrides: dict) -> dict:
+    params = {p: _guess_value(p) for p in _PARAM_RE.findall(sql)}
+    params.update(overrides.get(name) or {})
+    return params
+
+
+def _walk(node, out: list):
+    """Все узлы "table" плана (в том числе во вложенных join/подзапросах)."""
+    if isinstance(node, dict):
+        if "table_name" in node and "access_type" in node:
+            out.append(node)
+        for value in node.values():
+            _walk(value, out)
+    elif isinstance(node, list):
+        for value in node:
+            _walk(value, out)
+    return out
+
+
+def _flags(node) -> dict:
+    """filesort / временные таблицы на любом уровне плана."""
+    found = {"filesort": False, "temporary": False}
+
+    def visit(n):
+        if isinstance(n, dict):
+            if n.get("using_filesort"):
+                found["filesort"] = True
+            if n.get("using_temporary_table"):
+                found["temporary"] = True
+            for v in n.values():
+                visit(v)
+        elif isinstance(n, list):
+            for v in n:
+                visit(v)
+
+    visit(node)
+    return found
+
+
+def summarize(plan: dict) -> dict:
+    """Стабильная выжимка плана для снимков (без оценок стоимости)."""
+    tables = []
+    for t in _walk(plan, []):
+        tables.append({
+            "table": t["table_name"],
+            "access_type": t.get("access_type"),
+            "key": t.get("key"),
+            "used_key_parts": t.get("used_key_parts"),
+        })
+    return {"tables": tables, **_flags(plan)}
+
+
+def _suggest(table: dict, aliases: dict) -> str | None:
+    """Составной индекс по условию: сначала равенства, потом диапазон."""
+    cond = table.get("attached_condition") or ""
+    alias = table["table_name"]
+    eq, rng = [], []
+    for m in _COND_RE.finditer(cond):
+        tbl, col, op = m.group(1), m.group(2), m.group(3).lower()
+        if tbl != alias:
+            continue
+        target = eq if op in ("=", "<=>", "in") else rng
+        if col not in eq and col not in rng:
+            target.append(col)
+    cols = eq + rng[:1]
+    if not cols:
+        return None
+    used = table.get("used_key_parts") or []
+    if used[:len(cols)] == cols:
+        return None
+    real = aliases.get(alias, alias)
+    return f"CREATE INDEX ix_{real}_{'_'.join(cols)} ON {real} ({', '.join(cols)});"
+
+
+_ALIAS_RE = re.compile(
+    r"\b(?:FROM|JOIN|UPDATE|INTO)\s+`?(\w+)`?"
+    r"(?:\s+(?:AS\s+)?(?!(?:WHERE|JOIN|ON|LEFT|RIGHT|INNER|GROUP|ORDER|LIMIT|SET|VALUES)\b)`?(\w+)`?)?",
+    re.IGNORECASE)
+
+
+def _aliases(sql: str) -> dict:
+    """alias -> таблица (в плане MySQL таблицы названы алиасами)."""
+    out = {}
+    for table, alias in _ALIAS_RE.findall(sql):
+        if alias:
+            out[alias] = table.lower()
+        out[table] = table.lower()
+    return out
+
+
+def analyze(name: str, sql: str, plan: dict) -> dict:
+    """Замечания по плану: полные сканы, filesort, временные таблицы, советы по индексам."""
+    issues, suggestions = [], []
+    aliases = _aliases(sql)
+    for t in _walk(plan, []):
+        access = t.get("access_type")
+        rows = t.get("rows_examined_per_scan")
+        if access in ("ALL", "index"):
+            kind = "полный скан" if access == "ALL" else "полный проход по индексу"
+            issues.append(f"{t['table_name']}: {kind} (~{rows} строк)")
+            hint = _suggest(t, aliases)
+            if hint:
+                suggestions.append(hint)
+        elif access in ("ref", "range") and t.get("attached_condition"):
+            hint = _suggest(t, aliases)
+            if hint:
+                issues.append(f"{t['table_name']}: индекс {t.get('key')} покрывает условие частично")
+                suggestions.append(hint)
+    flags = _flags(plan)
+    if flags["filesort"]:
+        issues.append("filesort")
+    if flags["temporary"]:
+        issues.append("временная таблица")
+    return {"script": name, "issues": issues, "suggestions": sorted(set(suggestions))}
+
+
+def explain_all(conn, provider: SQLProvider, overrides: dict, sql_dir: str = SQL_DIR):
+    """(имя, sql, план | None, ошибка | None) для каждого объяснимого скрипта."""
+    skipped = {
+        f for d in SKIP_DIRS for _, _, files in os.walk(os.path.join(sql_dir, d)) for f in files
+    }
+    for name in sorted(provider.scripts):
+        if name in skipped:
+            continue
+        script = provider.compiled(name)
+        if script.problems:
+            yield name, script.text, None, "; ".join(script.problems)
+            continue
+        sql = script.text.rstrip(";")
+        if script.kind not in _EXPLAINABLE or ";" in sql:
+            continue
+        sql = re.sub(r"\s+FOR\s+UPDATE\s*$", "", sql, flags=re.IGNORECASE)
+        try:
+            with conn.cursor() as cur:
+                cur.execute("EXPLAIN FORMAT=JSON " + sql, script_params(name, sql, overrides))
+                plan = json.loads(cur.fetchone()[0])
+            yield name, sql, plan, None
+        except pymysql.MySQLError as e:
+            yield name, sql, None, str(e)
+
+
+def _snapshot_path(name: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, name[:-4] + ".json")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--db-config", default=DB_CONFIG_PATH, help="JSON с host/user/password/database")
+    ap.add_argument("--save", action="store_true", help="записать снимки планов в db/plans")
+    ap.add_argument("--check", action="store_true", help="сравнить планы со снимками")
+    args = ap.parse_args(argv)
+
+    with open(args.db_config, encoding="utf-8") as f:
+        db_cfg = json.load(f)
+    overrides = {}
+    if os.path.exists(PARAMS_PATH):
+        with open(PARAMS_PATH, encoding="utf-8") as f:
+            overrides = json.load(f)
+
+    provider = SQLProvider(SQL_DIR)
+    conn = pymysql.connect(**db_cfg)
+    changed, all_suggestions = [], set()
+    try:
+        for name, sql, plan, error in explain_all(conn, provider, overrides):
+            if error:
+                print(f"[{name}] EXPLAIN не выполнен: {error}")
+                continue
+            report = analyze(name, sql, plan)
+            summary = summarize(plan)
+            status = "; ".join(report["issues"]) or "ok"
+            print(f"[{name}] {status}")
+            for hint in report["suggestions"]:
+                print(f"    -> {hint}")
+            all_suggestions.update(report["suggestions"])
+
+            path = _snapshot_path(name)
+            if args.save:
+                os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(summary, f, ensure_ascii=False, indent=2, sort_keys=True)
+                    f.write("\n")
+            elif args.check:
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        saved = json.load(f)
+                except FileNotFoundError:
+                    saved = None
+                if saved != summary:
+                    changed.append(name)
+                    print(f"    !! план изменился: было {saved}, стало {summary}")
+    finally:
+        conn.close()
+
+    if all_suggestions:
+        print("\nПредлагаемые индексы:")
+        for hint in sorted(all_suggestions):
+            print("  " + hint)
+    if changed:
+        print(f"\nПланы изменились у {len(changed)} скриптов: {', '.join(changed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+import pymysql
+from flask import current_app, has_app_context
+
+# Границы гистограммы времени выполнения, сек.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_settings = {
+    "slow_query_ms": 500,
+    "buckets": DEFAULT_BUCKETS,
+}
+
+_lock = threading.Lock()
+_scripts = {}
+_current = threading.local()
+
+
+class _ScriptStats:
+    __slots__ = ("calls", "buckets", "sum", "rows", "acquire_sum", "acquire_count", "errors")
+
+    def __init__(self, n_buckets: int):
+        self.calls = 0
+        self.buckets = [0] * (n_buckets + 1)  # последний — +Inf
+        self.sum = 0.0
+        self.rows = 0
+        self.acquire_sum = 0.0
+        self.acquire_count = 0
+        self.errors = {}
+
+
+class QueryTrace:
+    """Данные об одном выполнении скрипта, заполняются по ходу запроса."""
+    __slots__ = ("sql_name", "params", "rows", "acquire", "error")
+
+    def __init__(self, sql_name, params):
+        self.sql_name = sql_name
+        self.params = params
+        self.rows = None
+        self.acquire = None
+        self.error = None
+
+
+def configure(settings: dict | None):
+    settings = settings or {}
+    if "slow_query_ms" in settings:
+        _settings["slow_query_ms"] = settings["slow_query_ms"]
+    if settings.get("buckets_ms"):
+        _settings["buckets"] = tuple(sorted(b / 1000.0 for b in settings["buckets_ms"]))
+        with _lock:
+            _scripts.clear()
+
+
+def note_acquire(seconds: float):
+    """Вызывается DBContextManager: сколько ждали соединение из пула."""
+    trace = getattr(_current, "trace", None)
+    if trace is not None:
+        trace.acquire = (trace.acquire or 0.0) + seconds
+
+
+def _error_code(e: BaseException) -> str:
+    if isinstance(e, pymysql.MySQLError):
+        errno = getattr(e, "errno", None) or (e.args[0] if e.args else None)
+        return str(errno)
+    code = getattr(e, "code", None)
+    return str(code) if code is not None else type(e).__name__
+
+
+@contextmanager
+def track(sql_name: str, params=None):
+    """
+    with track('new_emp.sql', params) as q: ...; q.rows = len(rows)
+    Время, строки, ожидание соединения и код ошибки пишутся в счётчики скрипта.
+    """
+    trace = QueryTrace(sql_name, params)
+    outer = getattr(_current, "trace", None)
+    _current.trace = trace
+    started = time.perf_counter()
+    try:
+        yield trace
+    except BaseException as e:
+        if not isinstance(e, GeneratorExit):
+            trace.error = _error_code(e)
+        raise
+    finally:
+        _current.trace = outer
+        _observe(trace, time.perf_counter() - started)
+
+
+@contextmanager
+def attached(trace: QueryTrace):
+    """
+    Сделать trace текущим на время одного шага (ожидание соединения пишется в него).
+    Для потоковых запросов: между шагами поток занят другим — рендером, чужими запросами.
+    """
+    outer = getattr(_current, "trace", None)
+    _current.trace = trace
+    try:
+        yield trace
+    finally:
+        _current.trace = outer
+
+
+def finish(trace: QueryTrace, elapsed: float, error: BaseException | None = None):
+    """Учесть trace, время которого вызывающий накопил сам по шагам (см. attached)."""
+    if error is not None and not isinstance(error, GeneratorExit):
+        trace.error = _error_code(error)
+    _observe(trace, elapsed)
+
+
+def observe(sql_name: str, params, elapsed: float, *, rows=None, error: BaseException | None = None):
+    """
+    Учесть выполнение, замеренное вызывающим (асинхронный слой: там несколько
+    запросов идут в одном потоке, и thread-local trace из track() не подходит).
+    """
+    trace = QueryTrace(sql_name, params)
+    trace.rows = rows
+    trace.error = _error_code(error) if error is not None else None
+    _observe(trace, elapsed)
+
+
+def _safe_params(params):
+    # пароли в лог не попадают
+    if isinstance(params, dict):
+        return {k: ("***" if "pass" in str(k).lower() else v) for k, v in params.items()}
+    return params
+
+
+def _observe(trace: QueryTrace, elapsed: float):
+    buckets = _settings["buckets"]
+    with _lock:
+        st = _scripts.get(trace.sql_name)
+        if st is None:
+            st = _scripts[trace.sql_name] = _ScriptStats(len(buckets))
+        st.calls += 1
+        st.buckets[bisect.bisect_left(buckets, elapsed)] += 1
+        st.sum += elapsed
+        if trace.rows:
+            st.rows += trace.rows
+        if trace.acquire is not None:
+            st.acquire_sum += trace.acquire
+            st.acquire_count += 1
+        if trace.error:
+            st.errors[trace.error] = st.errors.get(trace.error, 0) + 1
+
+    slow_ms = _settings["slow_query_ms"]
+    if slow_ms and elapsed * 1000 >= slow_ms and has_app_context():
+        current_app.logger.warning(
+            "SLOW SQL: %s %.1f ms rows=%s acquire=%.1f ms params=%r",
+            trace.sql_name, elapsed * 1000, trace.rows,
+            (trace.acquire or 0.0) * 1000, _safe_params(trace.params),
+        )
+
+
+def snapshot() -> dict:
+    """Копия счётчиков по скриптам (для отладки и тестов нагрузки)."""
+    with _lock:
+        return {
+            name: {
+                "calls": st.calls,
+                "sum_seconds": st.sum,
+                "rows": st.rows,
+                "acquire_sum_seconds": st.acquire_sum,
+                "errors": dict(st.errors),
+            }
+            for name, st in _scripts.items()
+        }
+
+
+def _esc(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus() -> str:
+    """Счётчики по SQL-скриптам в текстовом формате Prometheus."""
+    buckets = _settings["buckets"]
+    out = [
+        "# HELP sql_query_duration_seconds Время выполнения SQL-скрипта.",
+        "# TYPE sql_query_duration_seconds histogram",
+    ]
+    with _lock:
+        items = sorted(_scripts.items())
+        for name, st in items:
+            label = f'script="{_esc(name)}"'
+            cumulative = 0
+            for le, count in zip(buckets, st.buckets):
+                cumulative += count
+                out.append(f'sql_query_duration_seconds_bucket{{{label},le="{le}"}} {cumulative}')
+            out.append(f'sql_query_duration_seconds_bucket{{{label},le="+Inf"}} {st.calls}')
+            out.append(f"sql_query_duration_seconds_sum{{{label}}} {st.sum:.6f}")
+            out.append(f"sql_query_duration_seconds_count{{{label}}} {st.calls}")
+
+        out += ["# HELP sql_query_rows_total Строк возвращено/затронуто.",
+                "# TYPE sql_query_rows_total counter"]
+        for name, st in items:
+            out.append(f'sql_query_rows_total{{script="{_esc(name)}"}} {st.rows}')
+
+        out += ["# HELP sql_connection_acquire_seconds Ожидание соединения из пула.",
+                "# TYPE sql_connection_acquire_seconds summary"]
+        for name, st in items:
+            label = f'script="{_esc(name)}"'
+            out.append(f"sql_connection_acquire_seconds_sum{{{label}}} {st.acquire_sum:.6f}")
+            out.append(f"sql_connection_acquire_seconds_count{{{label}}} {st.acquire_count}")
+
+        out += ["# HELP sql_query_errors_total Ошибки по коду MySQL.",
+                "# TYPE sql_query_errors_total counter"]
+        for name, st in items:
+            for code, count in sorted(st.errors.items()):
+                out.append(f'sql_query_errors_total{{script="{_esc(name)}",code="{_esc(code)}"}} {count}')
+    return "\n".join(out) + "\n"
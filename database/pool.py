@@ -0,0 +1,288 @@
+import threading
+import time
+from collections import deque
+
+import pymysql
+
+
+class PoolTimeoutError(RuntimeError):
+    """Не удалось получить соединение из пула за acquire_timeout."""
+
+
+# Параметры пула по умолчанию (переопределяются из data/db_pool.json через configure)
+_DEFAULTS = {
+    "min_size": 0,          # сколько соединений держать «тёплыми»
+    "max_size": 10,         # верхняя граница открытых соединений на один db_config
+    "idle_timeout": 300,    # сек. простоя, после которых соединение закрывается
+    "max_lifetime": 3600,   # сек. жизни соединения с момента открытия
+    "acquire_timeout": 10,  # сек. ожидания свободного соединения
+    "ping_interval": 0,     # пинговать при выдаче, если простаивало дольше (0 — всегда)
+}
+
+_settings = dict(_DEFAULTS)
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class _PooledConn:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """
+    Ограниченный потокобезопасный пул pymysql-соединений для одного db_config.
+    Соединения выдаются через acquire() и возвращаются через release().
+    """
+
+    def __init__(self, db_config: dict, *, min_size=0, max_size=10, idle_timeout=300,
+                 max_lifetime=3600, acquire_timeout=10, ping_interval=0):
+        self.db_config = dict(db_config)
+        self.min_size = max(0, int(min_size))
+        self.max_size = max(1, int(max_size))
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.acquire_timeout = acquire_timeout
+        self.ping_interval = ping_interval
+
+        self._idle = deque()
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._warmed = False
+
+        # статистика
+        self._created = 0
+        self._closed = 0
+        self._acquired = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._ping_failures = 0
+
+    # --------- соединения ---------
+
+    def _connect(self):
+        cfg = self.db_config
+        conn = pymysql.connect(
+            host=cfg['host'],
+            user=cfg['user'],
+            password=cfg['password'],
+            database=cfg['database'],
+            port=int(cfg.get('port') or 3306),
+            cursorclass=pymysql.cursors.DictCursor,
+            autocommit=False
+        )
+        with self._cond:
+            self._created += 1
+        return _PooledConn(conn)
+
+    def _close(self, item: _PooledConn):
+        try:
+            item.conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._closed += 1
+
+    def _expired(self, item: _PooledConn, now: float) -> bool:
+        if self.max_lifetime and now - item.created_at > self.max_lifetime:
+            return True
+        if self.idle_timeout and now - item.last_used > self.idle_timeout:
+            return True
+        return False
+
+    def _alive(self, item: _PooledConn) -> bool:
+        if self.ping_interval and time.monotonic() - item.last_used < self.ping_interval:
+            return True
+        try:
+            item.conn.ping(reconnect=False)
+            return True
+        except Exception:
+            with self._cond:
+                self._ping_failures += 1
+            return False
+
+    def _warm_up(self):
+        """Открыть min_size соединений при первом обращении к пулу."""
+        self._warmed = True
+        for _ in range(self.min_size):
+            with self._cond:
+                if self._in_use + len(self._idle) >= self.max_size:
+                    return
+            try:
+                item = self._connect()
+            except pymysql.MySQLError as e:
+                print(f"[ConnectionPool] warm-up error: {e}")
+                return
+            with self._cond:
+                self._idle.append(item)
+                self._cond.notify()
+
+    # --------- выдача / возврат ---------
+
+    def acquire(self) -> _PooledConn:
+        if not self._warmed:
+            self._warm_up()
+
+        started = time.monotonic()
+        deadline = started + self.acquire_timeout if self.acquire_timeout else None
+        waited = False
+
+        while True:
+            item, create, stale = None, False, []
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    while self._idle:
+                        candidate = self._idle.pop()
+                        if self._expired(candidate, now):
+                            stale.append(candidate)
+                            continue
+                        item = candidate
+                        break
+                    if item is not None:
+                        self._in_use += 1
+                        break
+                    if self._in_use + len(self._idle) < self.max_size:
+                        self._in_use += 1
+                        create = True
+                        break
+                    remaining = None if deadline is None else deadline - now
+                    if remaining is not None and remaining <= 0:
+                        self._timeouts += 1
+                        for s in stale:
+                            self._close_locked(s)
+                        raise PoolTimeoutError(
+                            f"Нет свободных соединений с БД (max_size={self.max_size}, "
+                            f"ожидание {self.acquire_timeout} с)."
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+            for s in stale:
+                self._close(s)
+
+            if create:
+                try:
+                    item = self._connect()
+                except Exception:
+                    self._discard_slot()
+                    raise
+            elif not self._alive(item):
+                self._close(item)
+                self._discard_slot()
+                continue
+
+            elapsed = time.monotonic() - started
+            with self._cond:
+                self._acquired += 1
+                if waited:
+                    self._waits += 1
+                self._wait_total += elapsed
+                self._wait_max = max(self._wait_max, elapsed)
+            return item
+
+    def release(self, item: _PooledConn, *, discard: bool = False):
+        now = time.monotonic()
+        if discard or (self.max_lifetime and now - item.created_at > self.max_lifetime):
+            self._close(item)
+            self._discard_slot()
+            return
+
+        item.last_used = now
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append(item)
+            self._cond.notify()
+
+    def _discard_slot(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def _close_locked(self, item: _PooledConn):
+        # вызывается под self._cond — закрываем без повторного захвата
+        try:
+            item.conn.close()
+        except Exception:
+            pass
+        self._closed += 1
+
+    def close_idle(self):
+        """Закрыть все простаивающие соединения (например, при смене конфигурации)."""
+        with self._cond:
+            items = list(self._idle)
+            self._idle.clear()
+        for item in items:
+            self._close(item)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "host": self.db_config.get('host'),
+                "user": self.db_config.get('user'),
+                "database": self.db_config.get('database'),
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "max_size": self.max_size,
+                "created": self._created,
+                "closed": self._closed,
+                "acquired": self._acquired,
+                "waits": self._waits,
+                "wait_avg_ms": round(self._wait_total / self._acquired * 1000, 3) if self._acquired else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+                "timeouts": self._timeouts,
+                "ping_failures": self._ping_failures,
+            }
+
+
+def _pool_key(db_config: dict) -> tuple:
+    return (
+        db_config.get('host'),
+        int(db_config.get('port') or 3306),
+        db_config.get('user'),
+        db_config.get('password'),
+        db_config.get('database'),
+    )
+
+
+def configure(settings: dict | None):
+    """Задать параметры для пулов, которые будут созданы после вызова."""
+    _settings.clear()
+    _settings.update(_DEFAULTS)
+    for k, v in (settings or {}).items():
+        if k in _DEFAULTS:
+            _settings[k] = v
+
+
+def get_pool(db_config: dict) -> ConnectionPool:
+    """Пул для эффективного db_config (у каждой роли — свой пользователь БД и свой пул)."""
+    key = _pool_key(db_config)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(db_config, **_settings)
+    return pool
+
+
+def pools_stats() -> list:
+    """Статистика по всем пулам процесса."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [p.stats() for p in pools]
+
+
+def close_all():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for p in pools:
+        p.close_idle()
@@ -0,0 +1,56 @@
+import json
+
+from flask import g, has_app_context
+
+# Мемоизация в пределах одного запроса (flask.g): одинаковые чтения внутри
+# запроса идут в БД/Redis один раз. Вне контекста приложения — просто вызов.
+
+
+def _store() -> dict | None:
+    if not has_app_context():
+        return None
+    store = g.get('_request_memo')
+    if store is None:
+        store = g._request_memo = {}
+        g._request_memo_stats = {"hits": 0, "misses": 0, "sql_hits": 0}
+    return store
+
+
+def make_key(kind: str, name: str, params=None) -> str:
+    raw = json.dumps(params, sort_keys=True, default=str, separators=(",", ":"))
+    return f"{kind}:{name}:{raw}"
+
+
+def memoized(key: str, loader):
+    """Значение key из памяти запроса или loader() (результат запоминается, даже None)."""
+    store = _store()
+    if store is None:
+        return loader()
+    stats = g._request_memo_stats
+    if key in store:
+        stats["hits"] += 1
+        if key.startswith("sql"):  # run_sql/run_sql_one(memo=True)
+            stats["sql_hits"] += 1
+        return store[key]
+    stats["misses"] += 1
+    value = store[key] = loader()
+    return value
+
+
+def forget(prefix: str | None = None):
+    """Сбросить записи с префиксом ключа (все — без префикса). Вызывается после записи."""
+    store = _store()
+    if not store:
+        return
+    if prefix is None:
+        store.clear()
+        return
+    for key in [k for k in store if k.startswith(prefix)]:
+        del store[key]
+
+
+def stats() -> dict:
+    """{"hits", "misses", "sql_hits", "entries"} текущего запроса."""
+    if not has_app_context() or g.get('_request_memo') is None:
+        return {"hits": 0, "misses": 0, "sql_hits": 0, "entries": 0}
+    return dict(g._request_memo_stats, entries=len(g._request_memo))
@@ -1,9 +1,16 @@
-
-from flask import current_app
+import pymysql
+from flask import current_app, g
 from database.DBcm import DBContextManager
 
+def current_db_config() -> dict | None:
+    """
+    db_config текущего контекста: g.db_config (ставится в before_request
+    или фоновой задачей), иначе — общий из app.config.
+    """
+    return g.get('db_config') or current_app.config.get('db_config')
+
 def select_list(_sql: str, param_list=None) -> list:
-    db_cfg = current_app.config.get('db_config')
+    db_cfg = current_db_config()
     if not db_cfg:
         raise RuntimeError('db_config not set in app.config')
     with DBContextManager(db_cfg) as cursor:
@@ -14,4 +21,35 @@ def select_one(_sql: str, param_list=None):
     rows = select_list(_sql, param_list)
     return rows[0] if rows else None
 
+def select_chunks(_sql: str, param_list=None, chunk_size: int = 500):
+    """
+    Потоковое чтение через небуферизованный SSDictCursor: строки отдаются
+    пачками (списками) по chunk_size, весь результат в памяти не собирается.
+    Соединение занято, пока генератор не исчерпан или не закрыт.
+    """
+    db_cfg = current_db_config()
+    if not db_cfg:
+        raise RuntimeError('db_config not set in app.config')
+    db_cfg = dict(db_cfg)  # генератор может дочитываться уже вне запроса
+
+    def _chunks():
+        with DBContextManager(db_cfg, cursorclass=pymysql.cursors.SSDictCursor) as cursor:
+            cursor.execute(_sql, param_list or None)
+            while True:
+                chunk = cursor.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    return _chunks()
+
+
+def select_iter(_sql: str, param_list=None, chunk_size: int = 500):
+    """То же, что select_chunks, но по одной строке."""
+    chunks = select_chunks(_sql, param_list, chunk_size)
+
+    def _rows():
+        for chunk in chunks:
+            yield from chunk
 
+    return _rows()
@@ -1,25 +1,199 @@
+import logging
 import os
+import re
+import threading
+import time
+
+
+class SQLScriptError(RuntimeError):
+    """Скрипт нельзя выполнить: ошибка в самом файле или в переданных параметрах."""
+
+
+log = logging.getLogger(__name__)
+
+_PLACEHOLDER_RE = re.compile(r"%\((\w+)\)s")
+# :name вне строк — стиль SQLAlchemy/PDO, pymysql его не подставляет
+_COLON_PARAM_RE = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+_FIRST_WORD_RE = re.compile(r"\s*\(*\s*([A-Za-z]+)")
+
+
+class CompiledSQL:
+    """
+    Разобранный скрипт: текст без комментариев, тип оператора (SELECT, INSERT, ...),
+    имена обязательных параметров и найденные в файле ошибки.
+    """
+    __slots__ = ("name", "path", "mtime", "text", "kind", "params", "problems")
+
+    def __init__(self, name, path, mtime, text, kind, params, problems):
+        self.name = name
+        self.path = path
+        self.mtime = mtime
+        self.text = text
+        self.kind = kind
+        self.params = params
+        self.problems = problems
+
+    def check(self, params=None):
+        """Проверить параметры вызова до обращения к БД."""
+        if self.problems:
+            raise SQLScriptError(f"SQL-скрипт «{self.name}» с ошибками: " + "; ".join(self.problems))
+        if not self.params:
+            return
+        if not isinstance(params, dict):
+            raise SQLScriptError(f"SQL-скрипт «{self.name}» ждёт именованные параметры: "
+                                 + ", ".join(sorted(self.params)))
+        missing = self.params.difference(params)
+        if missing:
+            raise SQLScriptError(f"SQL-скрипт «{self.name}»: не заданы параметры "
+                                 + ", ".join(sorted(missing)))
+
+
+def _split(source: str):
+    """
+    (текст без комментариев, тот же текст с «забитыми» пробелами строковыми литералами).
+    Комментарии: «-- », «#», «/* */» (кроме исполняемых «/*! */»).
+    """
+    out, code = [], []
+    i, n = 0, len(source)
+    while i < n:
+        ch = source[i]
+        if ch in "'\"`":
+            j = i + 1
+            while j < n:
+                if source[j] == "\\":
+                    j += 2
+                    continue
+                if source[j] == ch:
+                    if j + 1 < n and source[j + 1] == ch:  # удвоенная кавычка
+                        j += 2
+                        continue
+                    break
+                j += 1
+            literal = source[i:j + 1]
+            out.append(literal)
+            code.append(ch + " " * max(0, len(literal) - 2) + (ch if len(literal) > 1 else ""))
+            i = j + 1
+            continue
+        if ch == "-" and source.startswith("--", i) and (i + 2 >= n or source[i + 2].isspace()) \
+                or ch == "#":
+            j = source.find("\n", i)
+            i = n if j < 0 else j
+            continue
+        if source.startswith("/*", i) and not source.startswith("/*!", i):
+            j = source.find("*/", i + 2)
+            i = n if j < 0 else j + 2
+            out.append(" ")
+            code.append(" ")
+            continue
+        out.append(ch)
+        code.append(ch)
+        i += 1
+    text = "\n".join(line.rstrip() for line in "".join(out).splitlines() if line.strip())
+    return text, "".join(code)
+
+
+def compile_sql(name: str, source: str, path: str | None = None, mtime: float | None = None) -> CompiledSQL:
+    text, code = _split(source)
+    params = frozenset(_PLACEHOLDER_RE.findall(text))
+
+    problems = []
+    if not text:
+        problems.append("пустой скрипт")
+    colon = sorted(set(_COLON_PARAM_RE.findall(code)))
+    if colon:
+        problems.append("плейсхолдеры " + ", ".join(f":{p}" for p in colon)
+                        + " — нужен стиль %(имя)s")
+    if params:
+        # pymysql подставляет параметры через «%» по всему тексту, включая строки
+        rest = _PLACEHOLDER_RE.sub("", text).replace("%%", "")
+        if "%s" in rest:
+            problems.append("позиционный плейсхолдер %s — нужен %(имя)s")
+        elif "%" in rest:
+            problems.append("одиночный «%» — в скрипте с параметрами пишется «%%»")
+
+    m = _FIRST_WORD_RE.match(text)
+    kind = m.group(1).upper() if m else ""
+    return CompiledSQL(name, path, mtime, text, kind, params, problems)
+
 
 class SQLProvider:
-    def __init__(self, root_path: str):
-        self.scripts = {}
+    """
+    Все *.sql из root_path (имена файлов уникальны по всему дереву), разобранные
+    один раз при загрузке. reload_seconds > 0 — не чаще чем раз в столько секунд
+    сверять mtime файлов и перечитывать изменённые, новые и удалённые.
+    """
 
-        for dirpath, dirnames, filenames in os.walk(root_path):
+    def __init__(self, root_path: str, reload_seconds: float = 0):
+        self.root_path = root_path
+        self.reload_seconds = reload_seconds
+        self.scripts: dict[str, CompiledSQL] = {}
+        self._lock = threading.Lock()
+        self._checked_at = time.monotonic()
+        self._scan()
+
+    def _files(self) -> dict:
+        found = {}
+        for dirpath, dirnames, filenames in os.walk(self.root_path):
             for filename in filenames:
                 if not filename.endswith('.sql'):
                     continue
-
-                full_path = os.path.join(dirpath, filename)
-
-                if filename in self.scripts:
+                if filename in found:
                     # На всякий случай — чтобы не было тихих конфликтов имён
                     raise RuntimeError(f"Дублирующийся SQL-файл: {filename}")
+                found[filename] = os.path.join(dirpath, filename)
+        return found
 
+    def _scan(self):
+        scripts = {}
+        try:
+            for filename, full_path in self._files().items():
+                mtime = os.path.getmtime(full_path)
+                old = self.scripts.get(filename)
+                if old is not None and old.path == full_path and old.mtime == mtime:
+                    scripts[filename] = old
+                    continue
                 with open(full_path, 'r', encoding='utf-8') as f:
-                    self.scripts[filename] = f.read()
+                    scripts[filename] = compile_sql(filename, f.read(), full_path, mtime)
+        except (OSError, UnicodeDecodeError, RuntimeError) as e:
+            # файл удалили, пишут посреди сверки или положили дубликат имени:
+            # остаёмся на прежнем наборе, следующая сверка — через reload_seconds.
+            # При первой загрузке — ошибка.
+            if not self.scripts:
+                raise
+            log.warning("SQLProvider: перечитать %s не удалось, остаются прежние скрипты: %s",
+                        self.root_path, e)
+            return
+        self.scripts = scripts
+
+    def reload_due(self) -> bool:
+        """Пора ли сверять файлы: reload_seconds > 0 и с прошлой сверки прошло столько секунд."""
+        return bool(self.reload_seconds) and time.monotonic() - self._checked_at >= self.reload_seconds
 
-    def get(self, filename: str) -> str:
+    def maybe_reload(self):
+        """Перечитать изменённые скрипты, если подошло время (читает диск — блокирует поток)."""
+        if not self.reload_due():
+            return
+        with self._lock:
+            if self.reload_due():
+                self._checked_at = time.monotonic()
+                self._scan()
+
+    def compiled(self, filename: str, *, reload: bool = True) -> CompiledSQL:
+        """reload=False — без сверки файлов (её делают отдельно, см. model_route_aio)."""
+        if reload:
+            self.maybe_reload()
         try:
             return self.scripts[filename]
         except KeyError:
-            raise RuntimeError(f"SQL-скрипт {filename!r} не найден в SQLProvider")
+            raise FileNotFoundError(f"SQL-скрипт {filename!r} не найден в SQLProvider")
+
+    def get(self, filename: str, params=None, *, check: bool = False, reload: bool = True) -> str:
+        """Текст скрипта без комментариев; check=True — сначала проверить params."""
+        script = self.compiled(filename, reload=reload)
+        if check:
+            script.check(params)
+        return script.text
+
+    def problems(self) -> dict:
+        """{имя: [ошибки]} для скриптов, которые нельзя выполнить."""
+        return {name: s.problems for name, s in sorted(self.scripts.items()) if s.problems}
@@ -0,0 +1,33 @@
+-- Составные индексы под скрипты из sql/ (см. python -m database.index_advisor).
+-- Одиночные ключи, которые становятся префиксом нового индекса, удаляются:
+-- внешние ключи продолжают работать через новый индекс.
+
+-- interview_event_by_vac_date(_lock).sql: WHERE vac_id = ? AND date_ = ?
+ALTER TABLE interview
+  ADD INDEX ix_interview_vac_date (vac_id, date_),
+  DROP INDEX vac_id;
+
+-- calls_exists.sql / calls_existing_for_event.sql: WHERE event_id = ? AND cand_id IN (...)
+ALTER TABLE calls
+  ADD INDEX ix_calls_event_cand (event_id, cand_id),
+  DROP INDEX event_id;
+
+-- open_vacancies.sql: диапазон по date_open за год
+-- last_open_vacancy.sql / vacancy_is_open.sql: date_close IS NULL по должности, MAX(date_open)
+ALTER TABLE vacancy
+  ADD INDEX ix_vacancy_date_open (date_open),
+  ADD INDEX ix_vacancy_job_close_open (job_id, date_close, date_open),
+  DROP INDEX job_id;
+
+-- new_emp.sql: enrollment BETWEEN ? AND ? с сортировкой (enrollment, emp_id)
+ALTER TABLE employee
+  ADD INDEX ix_employee_enrollment (enrollment, job_id);
+
+-- interview_candidates_by_vacancy.sql: по job_id, страницы по (full_name, cand_id)
+ALTER TABLE candidate
+  ADD INDEX ix_candidate_job_name (job_id, full_name),
+  DROP INDEX job_id;
+
+-- report_log_list.sql: история страницами по (created_at, log_id) DESC
+ALTER TABLE report_log
+  ADD INDEX ix_report_log_created (created_at, log_id);
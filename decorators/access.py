@@ -2,6 +2,12 @@ from functools import wraps
 from flask import current_app, session, request as rq, flash, redirect, url_for
 
 
+def section_allowed(role, section: str, access: dict) -> bool:
+    """Есть ли у роли доступ к разделу по конфигу access.json."""
+    allowed = set(access.get(role, []))
+    return role == 'admin' or '*' in allowed or section in allowed
+
+
 def group_required(section_name: str | None = None):
     def decorator(view):
         @wraps(view)
@@ -18,14 +24,12 @@ def group_required(section_name: str | None = None):
             access = (current_app.config.get('db_access')
                       or current_app.config.get('access')
                       or {})
-            allowed = set(access.get(role, []))
-
-            if role == 'admin' or '*' in allowed or required in allowed:
+            if section_allowed(role, required, access):
                 return view(*a, **k)
 
             current_app.logger.warning(
                 "ACCESS DENIED: role=%s required=%s bp=%s allowed=%s",
-                role, required, bp_name, sorted(allowed)
+                role, required, bp_name, sorted(access.get(role, []))
             )
             flash('Нет доступа к этому разделу', 'error')
             return redirect(url_for('menu'))
@@ -0,0 +1,39 @@
+from functools import wraps
+from quart import current_app, session, request as rq, flash, redirect, url_for
+
+from decorators.access import section_allowed
+
+# Асинхронные варианты login_required / group_required для Quart-представлений (asgi.py).
+
+
+def login_required(view):
+    @wraps(view)
+    async def wrapped(*a, **k):
+        if not session.get('user'):
+            return redirect(url_for('auth.login'))
+        return await view(*a, **k)
+    return wrapped
+
+
+def group_required(section_name: str | None = None):
+    def decorator(view):
+        @wraps(view)
+        async def wrapped(*a, **k):
+            if 'user' not in session and 'user_group' not in session:
+                await flash('Нужна авторизация', 'error')
+                return redirect(url_for('auth.login'))
+
+            role = session.get('user_group') or (session.get('user') or {}).get('role')
+            bp_name = rq.blueprint or (rq.endpoint.split('.', 1)[0] if rq.endpoint else '')
+            required = section_name or bp_name
+            access = current_app.config.get('db_access') or {}
+
+            if section_allowed(role, required, access):
+                return await view(*a, **k)
+
+            current_app.logger.warning("ACCESS DENIED: role=%s required=%s bp=%s",
+                                       role, required, bp_name)
+            await flash('Нет доступа к этому разделу', 'error')
+            return redirect(url_for('menu'))
+        return wrapped
+    return decorator
@@ -1,5 +1,8 @@
 # decorators/redis.py
 import inspect
+import math
+import random
+import time
 from functools import wraps
 from typing import Callable, Union
 
@@ -7,21 +10,69 @@ from flask import current_app
 from cache.redis_cache import RedisCache
 
 
+def _get_cache(cache_config) -> RedisCache:
+    app = current_app
+    cache: RedisCache = app.extensions.get("redis_cache")
+    if cache is None:
+        cfg = cache_config() if callable(cache_config) else cache_config
+        cache = app.extensions["redis_cache"] = RedisCache(cfg)
+    return cache
+
+
 def fetch_from_cache(
     cache_name: str,
     cache_config: Union[dict, Callable[[], dict]],
     ttl: int | None = None,
+    *,
+    single_flight: bool = True,
+    lock_ttl_ms: int = 10_000,
+    wait_timeout: float = 5.0,
+    early_refresh_beta: float = 0.0,
+    tags=None,
 ):
+    """
+    Кэширование результата функции в Redis по ключу cache_name.format(**args).
+
+    single_flight — при промахе пересчитывает только тот, кто взял блокировку
+    lock:<key> (SET NX PX), остальные ждут до wait_timeout секунд готового значения.
+    early_refresh_beta > 0 — вероятностное обновление до истечения TTL (XFetch):
+    чем ближе истечение и чем дольше считается функция, тем вероятнее, что
+    один из запросов пересчитает значение заранее, а остальные получат старое.
+    tags — шаблоны тегов ("vacancy:{vac_id}"); по ним ключ сбрасывается
+    после записи в БД (см. cache/invalidation.py).
+    """
     def decorator(func):
         sig = inspect.signature(func)
+        # скользящая оценка времени пересчёта (сек.) для раннего обновления
+        compute_time = {"avg": 0.0}
+
+        def _format_tags(arguments):
+            out = []
+            for t in tags:
+                try:
+                    out.append(t.format(**arguments))
+                except KeyError:
+                    out.append(t)
+            return out
+
+        def _compute(cache, key, call, arguments):
+            started = time.monotonic()
+            result = call()
+            elapsed = time.monotonic() - started
+            compute_time["avg"] = elapsed if not compute_time["avg"] else 0.8 * compute_time["avg"] + 0.2 * elapsed
+            cache.set_value(key, result, ttl)
+            if tags:
+                cache.tag_keys(key, _format_tags(arguments), ttl)
+            return result
+
+        def _should_refresh_early(ttl_left):
+            if early_refresh_beta <= 0 or ttl_left is None or not compute_time["avg"]:
+                return False
+            return -compute_time["avg"] * early_refresh_beta * math.log(random.random() or 1e-12) >= ttl_left
 
         @wraps(func)
         def wrapper(*args, **kwargs):
-            app = current_app
-            cache: RedisCache = app.extensions.get("redis_cache")
-            if cache is None:
-                cfg = cache_config() if callable(cache_config) else cache_config
-                cache = app.extensions["redis_cache"] = RedisCache(cfg)
+            cache = _get_cache(cache_config)
 
             bound = sig.bind_partial(*args, **kwargs)
             bound.apply_defaults()
@@ -30,12 +81,100 @@ def fetch_from_cache(
             except KeyError:
                 key = cache_name
 
-            cached = cache.get_value(key)
+            def func_call():
+                return func(*args, **kwargs)
+
+            if early_refresh_beta > 0:
+                cached, ttl_left = cache.get_with_ttl(key)
+            else:
+                cached, ttl_left = cache.get_value(key), None
+
+            if cached is not None:
+                if not _should_refresh_early(ttl_left):
+                    return cached
+                # ранний пересчёт делает только владелец блокировки, остальные берут старое
+                token = cache.acquire_lock(key, lock_ttl_ms)
+                if not token:
+                    return cached
+                try:
+                    return _compute(cache, key, func_call, bound.arguments)
+                finally:
+                    cache.release_lock(key, token)
+
+            if not single_flight or cache.conn is None:
+                return _compute(cache, key, func_call, bound.arguments)
+
+            token = cache.acquire_lock(key, lock_ttl_ms)
+            if token:
+                try:
+                    # пока брали блокировку, значение мог положить предыдущий владелец
+                    cached = cache.get_value(key)
+                    if cached is not None:
+                        return cached
+                    return _compute(cache, key, func_call, bound.arguments)
+                finally:
+                    cache.release_lock(key, token)
+
+            # значение уже пересчитывает другой воркер — ждём его
+            cached = cache.wait_value(key, wait_timeout)
             if cached is not None:
                 return cached
+            return _compute(cache, key, func_call, bound.arguments)
 
-            result = func(*args, **kwargs)
-            cache.set_value(key, result, ttl)
+        return wrapper
+
+    return decorator
+
+
+def fetch_many_from_cache(
+    cache_name: str,
+    cache_config: Union[dict, Callable[[], dict]],
+    key_field: str,
+    ttl: int | None = None,
+    *,
+    tags=None,
+):
+    """
+    Пакетный вариант fetch_from_cache для функции func(ids) -> list[dict].
+
+    Ключи строятся как cache_name.format(**{key_field: id}) — те же, что у
+    одиночного fetch_from_cache, поэтому кэш общий. Все ключи читаются одним
+    MGET, а func вызывается один раз только для промахов (IN (...)).
+    Возвращает dict {id: строка или None} в порядке запрошенных ids.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(ids, *args, **kwargs):
+            ids = list(dict.fromkeys(ids))
+            if not ids:
+                return {}
+            cache = _get_cache(cache_config)
+
+            keys = {i: cache_name.format(**{key_field: i}) for i in ids}
+            found = cache.get_many(keys.values())
+            result = {i: found.get(k) for i, k in keys.items()}
+
+            missing = [i for i, row in result.items() if row is None]
+            if missing:
+                rows = func(missing, *args, **kwargs) or []
+                fresh = {}
+                by_id = {str(r[key_field]): r for r in rows}
+                for i in missing:
+                    row = by_id.get(str(i))
+                    if row is not None:
+                        result[i] = row
+                        fresh[keys[i]] = row
+                cache.set_many(fresh, ttl)
+                if tags and fresh:
+                    # шаблоны тегов ("candidate:{cand_id}") — свои для каждого id
+                    by_tag = {}
+                    for i in missing:
+                        if keys[i] not in fresh:
+                            continue
+                        for t in tags:
+                            by_tag.setdefault(t.format(**{key_field: i}), []).append(keys[i])
+                    for tag, names in by_tag.items():
+                        cache.tag_keys(names, [tag], ttl)
             return result
 
         return wrapper
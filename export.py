@@ -0,0 +1,199 @@
+import csv
+import datetime as dt
+import io
+import zipfile
+from decimal import Decimal
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from flask import Response, stream_with_context
+
+from streaming import peek
+
+FORMATS = {
+    "csv":  "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+# --------- CSV ---------
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dt.date, dt.datetime)):
+        return value.isoformat(sep=" ") if isinstance(value, dt.datetime) else value.isoformat()
+    if isinstance(value, Decimal):
+        return format(value, "f")  # без экспоненты и потери точности
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    return value
+
+
+def csv_chunks(headers: list, rows, *, flush_rows: int = 500):
+    """
+    CSV по строкам итератора; в памяти не больше flush_rows строк.
+    Разделитель «;» и BOM — чтобы Excel с русской локалью открыл файл как есть.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=";", lineterminator="\r\n")
+    buf.write("\ufeff")
+    writer.writerow(headers)
+    for n, row in enumerate(rows, 1):
+        writer.writerow([_csv_value(row.get(h)) for h in headers])
+        if n % flush_rows == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+# --------- XLSX (минимальный SpreadsheetML, пишется потоком) ---------
+
+_EPOCH = dt.datetime(1899, 12, 30)
+
+# стили ячеек: 0 — обычный, 1 — дата, 2 — дата и время, 3 — заголовок
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '</styleSheet>'
+)
+
+_STATIC_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Data" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/styles.xml": _STYLES,
+}
+
+
+def _xlsx_cell(value, style: int = 0) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f"<c><v>{format(value, 'f') if isinstance(value, Decimal) else value}</v></c>"
+    if isinstance(value, dt.datetime):
+        serial = (value.replace(tzinfo=None) - _EPOCH).total_seconds() / 86400
+        return f'<c s="2"><v>{serial:.8f}</v></c>'
+    if isinstance(value, dt.date):
+        return f'<c s="1"><v>{(value - _EPOCH.date()).days}</v></c>'
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", "replace")
+    style_attr = f' s="{style}"' if style else ""
+    return f'<c t="inlineStr"{style_attr}><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+
+
+class _Sink(io.RawIOBase):
+    """Файлоподобный приёмник для ZipFile: накопленные байты забираются take()."""
+
+    def __init__(self):
+        self._parts = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._parts.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def take(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def xlsx_chunks(headers: list, rows, *, flush_rows: int = 500):
+    """
+    XLSX одним листом: строки листа сжимаются и отдаются по мере чтения,
+    файл целиком в памяти не собирается (zip пишется в несмещаемый поток).
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, body in _STATIC_PARTS.items():
+            zf.writestr(name, body)
+        yield sink.take()
+
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData><row>'
+                + "".join(_xlsx_cell(h, style=3) for h in headers).encode("utf-8")
+                + b"</row>"
+            )
+            for n, row in enumerate(rows, 1):
+                sheet.write(("<row>" + "".join(_xlsx_cell(row.get(h)) for h in headers)
+                             + "</row>").encode("utf-8"))
+                if n % flush_rows == 0:
+                    chunk = sink.take()
+                    if chunk:
+                        yield chunk
+            sheet.write(b"</sheetData></worksheet>")
+    yield sink.take()
+
+
+# --------- ответ ---------
+
+_WRITERS = {"csv": csv_chunks, "xlsx": xlsx_chunks}
+
+
+def export_response(rows, filename: str, fmt: str) -> Response:
+    """
+    Скачивание результата в CSV/XLSX прямо из итератора строк.
+    Первая строка читается сразу: ошибка SQL случится до начала ответа.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+    first, rows = peek(rows)
+    headers = list(first.keys()) if first else []
+    body = _WRITERS[fmt](headers, rows)
+
+    full_name = f"{filename}.{fmt}"
+    ascii_name = full_name.encode("ascii", "replace").decode().replace("?", "_")
+    disposition = f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(full_name)}"
+    return Response(stream_with_context(body), mimetype=FORMATS[fmt],
+                    headers={"Content-Disposition": disposition,
+                             "X-Content-Type-Options": "nosniff"})
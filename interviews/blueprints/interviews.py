@@ -30,7 +30,7 @@ def candidates():
     date = request.args['date']
     emp_id = request.args.get('emp_id', type=int)
 
-    ctx = appointment_candidates_context(vac_id, date, emp_id)
+    ctx = appointment_candidates_context(vac_id, date, emp_id, request.args.get('page'))
     if ctx["error"] == "vacancy_closed":
         flash('Вакансия закрыта или недоступна', 'danger')
         return redirect(url_for('interviews.menu'))
@@ -41,6 +41,8 @@ def candidates():
         date=ctx["date"],
         emp_id=ctx["emp_id"],
         candidates=ctx["candidates"],
+        page=ctx["page"],
+        next_page=ctx["next_page"],
         basket=ctx["basket"],
     )
 
@@ -0,0 +1,139 @@
+import time
+import uuid
+from typing import Any, Dict, List
+
+from flask import current_app, session
+
+from database import request_memo
+
+# корзина живёт сутки с последнего изменения
+BASKET_TTL = 24 * 3600
+
+_EMP_FIELD = "emp_id"
+_CAND_PREFIX = "cand:"
+
+
+def _cache():
+    return current_app.extensions.get('redis_cache')
+
+
+def _owner() -> str:
+    """Чья корзина: id пользователя, а без входа — короткий id в сессии."""
+    user = session.get('user') or {}
+    if user.get('id') is not None:
+        return f"u{user['id']}"
+    sid = session.get('basket_sid')
+    if not sid:
+        sid = session['basket_sid'] = uuid.uuid4().hex[:16]
+    return f"s{sid}"
+
+
+def basket_key(vac_id: int, date_str: str) -> str:
+    return f"basket:{_owner()}:{int(vac_id)}:{date_str}"
+
+
+def memo_key(kind: str, vac_id: int, date_str: str) -> str:
+    """Ключ мемоизации в пределах запроса; сбрасывается при любом изменении корзины."""
+    return request_memo.make_key(kind, basket_key(vac_id, date_str))
+
+
+def _changed(vac_id: int, date_str: str):
+    for kind in ("basket_read", "basket_view"):
+        request_memo.forget(memo_key(kind, vac_id, date_str))
+
+
+# --------- запасной вариант: Redis недоступен ---------
+# В сессии тогда лежат только id (не снимки), чтобы cookie оставалась маленькой.
+
+def _fallback(key: str, create: bool = False) -> Dict[str, Any] | None:
+    store = session.get('basket_fallback')
+    if not isinstance(store, dict):
+        if not create:
+            return None
+        store = session['basket_fallback'] = {}
+    if create and key not in store:
+        store[key] = {"emp_id": None, "ids": []}
+    if create:
+        session.modified = True
+    return store.get(key)
+
+
+def _drop_fallback(key: str):
+    store = session.get('basket_fallback')
+    if isinstance(store, dict) and key in store:
+        del store[key]
+        if not store:
+            session.pop('basket_fallback')
+        session.modified = True
+
+
+# --------- операции ---------
+
+def read(vac_id: int, date_str: str) -> Dict[str, Any]:
+    """{"emp_id": int | None, "ids": [cand_id, ...]} в порядке добавления."""
+    data = request_memo.memoized(memo_key("basket_read", vac_id, date_str),
+                                 lambda: _read(vac_id, date_str))
+    return {"emp_id": data["emp_id"], "ids": list(data["ids"])}
+
+
+def _read(vac_id: int, date_str: str) -> Dict[str, Any]:
+    if 'interview_baskets' in session:
+        session.pop('interview_baskets')  # прежний формат: снимки целиком в cookie
+    key = basket_key(vac_id, date_str)
+    cache = _cache()
+    fields = cache.hash_get_all(key) if cache is not None else None
+    if fields is None:
+        data = _fallback(key) or {"emp_id": None, "ids": []}
+        return {"emp_id": data.get("emp_id"), "ids": list(data.get("ids") or [])}
+
+    emp = fields.get(_EMP_FIELD)
+    cands = sorted(
+        ((float(v), int(k[len(_CAND_PREFIX):])) for k, v in fields.items()
+         if k.startswith(_CAND_PREFIX)),
+    )
+    return {"emp_id": int(emp) if emp else None, "ids": [cid for _, cid in cands]}
+
+
+def set_emp(vac_id: int, date_str: str, emp_id: int | None):
+    _changed(vac_id, date_str)
+    key = basket_key(vac_id, date_str)
+    cache = _cache()
+    if cache is not None and cache.hash_set(key, {_EMP_FIELD: emp_id or ""}, BASKET_TTL):
+        return
+    _fallback(key, create=True)["emp_id"] = emp_id
+
+
+def add(vac_id: int, date_str: str, cand_id: int):
+    """HSET cand:<id> — значение поля задаёт порядок (время добавления)."""
+    _changed(vac_id, date_str)
+    key = basket_key(vac_id, date_str)
+    cache = _cache()
+    if cache is not None and cache.hash_set(key, {f"{_CAND_PREFIX}{int(cand_id)}": time.time()},
+                                            BASKET_TTL):
+        return
+    ids = _fallback(key, create=True)["ids"]
+    if int(cand_id) not in ids:
+        ids.append(int(cand_id))
+
+
+def remove(vac_id: int, date_str: str, cand_ids: List[int]):
+    _changed(vac_id, date_str)
+    key = basket_key(vac_id, date_str)
+    cache = _cache()
+    fields = [f"{_CAND_PREFIX}{int(c)}" for c in cand_ids]
+    if cache is not None and cache.hash_delete(key, *fields, ttl=BASKET_TTL):
+        return
+    data = _fallback(key)
+    if data is not None:
+        drop = {int(c) for c in cand_ids}
+        data["ids"] = [c for c in data["ids"] if c not in drop]
+        session.modified = True
+
+
+def clear(vac_id: int, date_str: str):
+    _changed(vac_id, date_str)
+    key = basket_key(vac_id, date_str)
+    cache = _cache()
+    if cache is not None:
+        cache.delete(key)
+    _drop_fallback(key)
@@ -1,18 +1,33 @@
 
 from flask import current_app
-from decorators.redis import fetch_from_cache
-from model_route import run_sql, run_sql_one
+from decorators.redis import fetch_from_cache, fetch_many_from_cache
+from model_route import run_sql, run_sql_one, run_sql_page
 
 
 def _cache_cfg():
     return current_app.config['CACHE_CONFIG']
 
 
-@fetch_from_cache("cand_by_vac:{vac_id}", _cache_cfg)
-def get_candidates_by_vacancy(vac_id: int):
-    return run_sql('interview_candidates_by_vacancy.sql', {"vac_id": vac_id})
+CANDIDATES_PAGE_SIZE = 50
 
 
-@fetch_from_cache("cand_by_id:{cand_id}", _cache_cfg)
+@fetch_from_cache("cand_by_vac:{vac_id}:{page}", _cache_cfg, early_refresh_beta=1.0,
+                  tags=["candidate", "vacancy", "vacancy:{vac_id}"])
+def get_candidates_by_vacancy(vac_id: int, page: str | None = None):
+    """Страница кандидатов по вакансии: {"items": [...], "next_page": токен | None}."""
+    rows, next_page = run_sql_page('interview_candidates_by_vacancy.sql', {"vac_id": vac_id},
+                                   key=["full_name", "cand_id"],
+                                   limit=CANDIDATES_PAGE_SIZE, page=page)
+    return {"items": rows, "next_page": next_page}
+
+
+@fetch_from_cache("cand_by_id:{cand_id}", _cache_cfg, tags=["candidate", "candidate:{cand_id}"])
 def get_candidate_by_id(cand_id: int):
     return run_sql_one('interview_candidate_by_id.sql', {"cand_id": cand_id})
+
+
+@fetch_many_from_cache("cand_by_id:{cand_id}", _cache_cfg, "cand_id",
+                       tags=["candidate", "candidate:{cand_id}"])
+def get_candidates_by_ids(cand_ids):
+    """Несколько кандидатов сразу: кэш одним MGET, промахи — одним IN-запросом."""
+    return run_sql('interview_candidates_by_ids.sql', {"cand_ids": list(cand_ids)})
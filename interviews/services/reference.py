@@ -0,0 +1,135 @@
+import threading
+import time
+from typing import Any, Dict, List
+
+from flask import current_app
+
+from cache.invalidation import REFDATA_VERSION_KEY
+from database.select import current_db_config
+from model_route import run_parallel, run_sql_one
+
+# как часто сверять версию в Redis (один GET) и как часто — пробный запрос к БД
+VERSION_CHECK_SECONDS = 2
+PROBE_SECONDS = 60
+
+# _lock — только для коротких операций со словарями, без I/O: проверка и
+# перечитывание идут вне его (перечитывание само ждёт пул run_parallel)
+_lock = threading.Lock()
+_busy = set()  # ident'ы, снимок которых сейчас проверяет/перечитывает какой-то поток
+# снимок на каждую БД/DB-пользователя: роли видят данные своими правами
+_snapshots: Dict[tuple, "_Snapshot"] = {}
+
+
+class _Snapshot:
+    __slots__ = ("version", "probe", "vacancies", "open_ids", "employees",
+                 "checked_at", "probed_at")
+
+    def __init__(self, version, probe, vacancies, employees):
+        self.version = version
+        self.probe = probe
+        self.vacancies = vacancies
+        self.open_ids = frozenset(int(v["vac_id"]) for v in vacancies)
+        self.employees = employees
+        now = time.monotonic()
+        self.checked_at = now
+        self.probed_at = now
+
+
+def _db_ident() -> tuple:
+    db = current_db_config() or {}
+    return db.get("host"), db.get("port"), db.get("user"), db.get("database")
+
+
+def _version():
+    cache = current_app.extensions.get('redis_cache')
+    return cache.get_int(REFDATA_VERSION_KEY) if cache is not None else None
+
+
+def _probe() -> tuple:
+    row = run_sql_one('interview_refdata_probe.sql', {}) or {}
+    return tuple(int(row.get(k) or 0) for k in
+                 ("open_vacancies", "vacancies_crc", "employees", "employees_crc"))
+
+
+def _load(version) -> _Snapshot:
+    # все три чтения независимы — идут параллельно; гонка с записью между ними
+    # даст лишнюю перезагрузку по пробе, а не устаревший снимок
+    got = run_parallel({
+        "probe": _probe,
+        "vacancies": ('interview_vacancies_open.sql', {}),
+        "employees": ('interview_employees.sql', {}),
+    })
+    return _Snapshot(version, got["probe"], got["vacancies"], got["employees"])
+
+
+def _due(snap: _Snapshot) -> bool:
+    now = time.monotonic()
+    return (now - snap.checked_at >= VERSION_CHECK_SECONDS
+            or now - snap.probed_at >= PROBE_SECONDS)
+
+
+def _fresh(snap: _Snapshot) -> bool:
+    """Снимок ещё актуален? Заодно сдвигает отметки проверок."""
+    now = time.monotonic()
+    if now - snap.checked_at >= VERSION_CHECK_SECONDS:
+        version = _version()
+        snap.checked_at = now
+        if version is not None and version != snap.version:
+            return False
+    if now - snap.probed_at >= PROBE_SECONDS:
+        snap.probed_at = now
+        if _probe() != snap.probe:
+            return False
+    return True
+
+
+def _claim(ident) -> bool:
+    with _lock:
+        if ident in _busy:
+            return False
+        _busy.add(ident)
+        return True
+
+
+def snapshot() -> _Snapshot:
+    """
+    Снимок справочников текущей БД. Перечитывается, когда другой воркер
+    увеличил версию (запись в vacancy/employee через приложение) или когда
+    пробный запрос показал изменения, сделанные в обход приложения.
+    Проверяет и перечитывает один поток на ident; остальные тем временем
+    получают текущий снимок. Без снимка (первое обращение) читают все ждущие,
+    публикуется первый.
+    """
+    ident = _db_ident()
+    snap = _snapshots.get(ident)
+    if snap is not None and not _due(snap):
+        return snap
+    claimed = snap is not None and _claim(ident)
+    if snap is not None and not claimed:
+        return snap
+    try:
+        if snap is not None and _fresh(snap):
+            return snap
+        # версию — до чтения данных, иначе запись между ними потеряется
+        loaded = _load(_version())
+        with _lock:
+            current = _snapshots.get(ident)
+            if current is None or current is snap:
+                _snapshots[ident] = loaded
+            return _snapshots[ident]
+    finally:
+        if claimed:
+            with _lock:
+                _busy.discard(ident)
+
+
+def open_vacancies() -> List[Dict[str, Any]]:
+    return [dict(v) for v in snapshot().vacancies]
+
+
+def employees() -> List[Dict[str, Any]]:
+    return [dict(e) for e in snapshot().employees]
+
+
+def is_vacancy_open(vac_id: int) -> bool:
+    return int(vac_id) in snapshot().open_ids
@@ -1,113 +1,80 @@
 from typing import Dict, Any, List
-from flask import session
-from model_route import run_sql, run_sql_one, exec_sql
-from interviews.services.candidates import get_candidate_by_id
-
-
-def _basket_store() -> Dict[str, Any]:
-
-    store = session.get('interview_baskets')
-    if store is None or not isinstance(store, dict):
-        store = {}
-        session['interview_baskets'] = store
-    return store
-
-
-def _basket_key(vac_id: int, date_str: str) -> str:
-    return f"{int(vac_id)}|{date_str}"
+from model_route import run_parallel, run_sql_one, transaction
+from database import request_memo
+from interviews.services import baskets, reference
+from interviews.services.candidates import get_candidates_by_ids
 
 
 def load_basket(vac_id: int, date_str: str) -> Dict[str, Any]:
     """
-    Получить корзину для (vac_id, date) из сессии.
-    Если её ещё нет — создать пустую.
+    Корзина для (vac_id, date). В хранилище лежат только id кандидатов,
+    снимки для отображения собираются одним пакетным запросом.
+    Кандидаты, которых больше нет в БД, из корзины выпадают.
+    В пределах запроса собранная корзина запоминается (request_memo).
     """
-    store = _basket_store()
-    key = _basket_key(vac_id, date_str)
-
-    basket = store.get(key)
-    if not isinstance(basket, dict):
-        basket = {
+    basket = request_memo.memoized(baskets.memo_key("basket_view", vac_id, date_str),
+                                   lambda: _build_basket(vac_id, date_str))
+    return dict(basket, items=dict(basket["items"]))
+
+
+def _build_basket(vac_id: int, date_str: str) -> Dict[str, Any]:
+    data = baskets.read(vac_id, date_str)
+    found = get_candidates_by_ids(data["ids"]) if data["ids"] else {}
+
+    items = {}
+    for cand_id in data["ids"]:
+        cand = found.get(cand_id)
+        if not cand:
+            continue
+        items[str(cand_id)] = {
+            "cand_id": int(cand["cand_id"]),
+            "full_name": cand.get("full_name"),
+            "age": cand.get("age"),
+            "gender": cand.get("gender"),
+            "job_id": cand.get("job_id"),
             "vac_id": int(vac_id),
-            "date": date_str,
-            "emp_id": None,
-            "items": {}
+            "status": "planned",
         }
-        store[key] = basket
-        session.modified = True
-
-    basket.setdefault("vac_id", int(vac_id))
-    basket.setdefault("date", date_str)
-    basket.setdefault("emp_id", None)
-    basket.setdefault("items", {})
-
-    return basket
 
+    gone = [cid for cid in data["ids"] if str(cid) not in items]
+    if gone:
+        baskets.remove(vac_id, date_str, gone)
 
-def save_basket(vac_id: int, date_str: str, basket: Dict[str, Any]) -> None:
-    """Сохранить корзину в сессию."""
-    store = _basket_store()
-    key = _basket_key(vac_id, date_str)
-    store[key] = basket
-    session.modified = True
+    return {
+        "vac_id": int(vac_id),
+        "date": date_str,
+        "emp_id": data["emp_id"],
+        "items": items,
+    }
 
 
 def clear_basket(vac_id: int, date_str: str) -> None:
-    """Удалить корзину для (vac_id, date) из сессии."""
-    store = _basket_store()
-    key = _basket_key(vac_id, date_str)
-    if key in store:
-        del store[key]
-        session.modified = True
+    """Удалить корзину для (vac_id, date)."""
+    baskets.clear(vac_id, date_str)
 
 
-def set_emp(vac_id: int, date_str: str, emp_id: int | None) -> Dict[str, Any]:
+def set_emp(vac_id: int, date_str: str, emp_id: int | None) -> None:
     """Зафиксировать интервьюера для корзины."""
-    basket = load_basket(vac_id, date_str)
-    basket["emp_id"] = int(emp_id) if emp_id is not None else None
-    save_basket(vac_id, date_str, basket)
-    return basket
+    baskets.set_emp(vac_id, date_str, int(emp_id) if emp_id is not None else None)
 
 
 def add_candidate(vac_id: int, date_str: str, cand_id: int) -> Dict[str, Any]:
     """
     Возвращает обновлённую корзину.
     """
-    basket = load_basket(vac_id, date_str)
-    items = basket.setdefault("items", {})
-
-    cand = get_candidate_by_id(cand_id)
-    if not cand:
-        return basket
-
-    snapshot = {
-        "cand_id": int(cand["cand_id"]),
-        "full_name": cand.get("full_name"),
-        "age": cand.get("age"),
-        "gender": cand.get("gender"),
-        "job_id": cand.get("job_id"),
-        "vac_id": int(vac_id),
-        "status": "planned",
-    }
-
-    items[str(snapshot["cand_id"])] = snapshot
-    save_basket(vac_id, date_str, basket)
-    return basket
+    baskets.add(vac_id, date_str, int(cand_id))
+    return load_basket(vac_id, date_str)
 
 
 def remove_candidate(vac_id: int, date_str: str, cand_id: int) -> Dict[str, Any]:
     """Удалить кандидата из корзины по id. Возвращает обновлённую корзину."""
-    basket = load_basket(vac_id, date_str)
-    items = basket.setdefault("items", {})
-    items.pop(str(int(cand_id)), None)
-    save_basket(vac_id, date_str, basket)
-    return basket
-
+    baskets.remove(vac_id, date_str, [int(cand_id)])
+    return load_basket(vac_id, date_str)
 
 
 def vacancy_is_open(vac_id: int) -> bool:
-    """Проверить, открыта ли вакансия. SQL: vacancy_is_open.sql"""
-    return bool(run_sql_one('vacancy_is_open.sql', {"vac_id": vac_id}))
+    """Проверить, открыта ли вакансия (по снимку справочников, без запроса к БД)."""
+    return reference.is_vacancy_open(vac_id)
 
 
 def find_event_by_vac_date(vac_id: int, date: str):
@@ -115,27 +82,25 @@ def find_event_by_vac_date(vac_id: int, date: str):
     return run_sql_one('interview_event_by_vac_date.sql', {
         "vac_id": vac_id,
         "date": date
-    })
+    }, memo=True)
 
 
-def ensure_event(vac_id: int, date: str, emp_id: int):
-    """
-    Гарантировать наличие события interview для (vac_id, date).
-    - если события нет → INSERT в interview и повторный SELECT;
-    - если есть и emp_id не установлен → UPDATE interview.emp_id;
-    - иначе вернуть существующее событие.
-    """
-    evt = find_event_by_vac_date(vac_id, date)
+def _ensure_event_tx(tx, vac_id: int, date: str, emp_id: int):
+    """ensure_event внутри уже открытой транзакции (строка события блокируется FOR UPDATE)."""
+    evt = tx.run_sql_one('interview_event_by_vac_date_lock.sql', {
+        "vac_id": vac_id,
+        "date": date
+    })
     if not evt:
-        exec_sql('interview_event_insert.sql', {
+        event_id = tx.exec_insert('interview_event_insert.sql', {
             "vac_id": vac_id,
             "date": date,
             "emp_id": emp_id
         })
-        return find_event_by_vac_date(vac_id, date)
+        return {"event_id": event_id, "emp_id": emp_id, "date_": date}
 
     if not evt.get('emp_id') and emp_id:
-        exec_sql('interview_event_update_emp.sql', {
+        tx.exec_sql('interview_event_update_emp.sql', {
             "event_id": evt['event_id'],
             "emp_id": emp_id
         })
@@ -144,27 +109,51 @@ def ensure_event(vac_id: int, date: str, emp_id: int):
     return evt
 
 
+def ensure_event(vac_id: int, date: str, emp_id: int):
+    """
+    Гарантировать наличие события interview для (vac_id, date).
+    - если события нет → INSERT в interview (id берётся из lastrowid);
+    - если есть и emp_id не установлен → UPDATE interview.emp_id;
+    - иначе вернуть существующее событие.
+    """
+    with transaction() as tx:
+        return _ensure_event_tx(tx, vac_id, date, emp_id)
+
+
 def call_exists(event_id: int, cand_id: int) -> bool:
     """Проверить, есть ли уже приглашение для кандидата на это событие."""
     return bool(run_sql_one('calls_exists.sql', {
         "event_id": event_id,
         "cand_id": cand_id
-    }))
+    }, memo=True))
+
+
+def _create_calls_tx(tx, event_id: int, emp_id: int, cand_ids: List[int]) -> int:
+    """Одна выборка существующих приглашений + один многострочный INSERT."""
+    cand_ids = list(dict.fromkeys(int(cid) for cid in cand_ids))
+    if not cand_ids:
+        return 0
+
+    existing = tx.run_sql('calls_existing_for_event.sql', {
+        "event_id": event_id,
+        "cand_ids": cand_ids
+    })
+    existing_ids = {int(r['cand_id']) for r in existing}
+
+    rows = [{
+        "event_id": event_id,
+        "emp_id": emp_id,
+        "cand_id": cid,
+        "status": None
+    } for cid in cand_ids if cid not in existing_ids]
+
+    tx.exec_many('interview_call_insert.sql', rows)
+    return len(rows)
 
 
 def create_calls_for_event(event_id: int, emp_id: int, cand_ids: List[int]) -> int:
-    created = 0
-    for cid in cand_ids:
-        cid = int(cid)
-        if not call_exists(event_id, cid):
-            exec_sql('interview_call_insert.sql', {
-                "event_id": event_id,
-                "emp_id": emp_id,
-                "cand_id": cid,
-                "status": None
-            })
-            created += 1
-    return created
+    with transaction() as tx:
+        return _create_calls_tx(tx, event_id, emp_id, cand_ids)
 
 
 
@@ -172,8 +161,8 @@ def appointment_menu_context() -> Dict[str, Any]:
     """
     Данные для страницы выбора вакансии / даты / интервьюера.
     """
-    vacancies = run_sql('interview_vacancies_open.sql', {})
-    employees = run_sql('interview_employees.sql', {})
+    vacancies = reference.open_vacancies()
+    employees = reference.employees()
 
     return {
         "vacancies": vacancies,
@@ -181,22 +170,31 @@ def appointment_menu_context() -> Dict[str, Any]:
     }
 
 
-def appointment_candidates_context(vac_id: int, date: str, emp_id: int | None) -> Dict[str, Any]:
+def appointment_candidates_context(vac_id: int, date: str, emp_id: int | None,
+                                   page: str | None = None) -> Dict[str, Any]:
+    from interviews.services.candidates import get_candidates_by_vacancy
+
+    # проверка по снимку справочников в памяти — до всякого ввода-вывода
     if not vacancy_is_open(vac_id):
         return {"error": "vacancy_closed"}
 
     set_emp(vac_id, date, emp_id)
 
-    from interviews.services.candidates import get_candidates_by_vacancy
-    candidates = get_candidates_by_vacancy(vac_id)
-
-    basket = load_basket(vac_id, date)
+    # корзина в Redis, но её владельца (basket_sid) даёт session —
+    # поэтому она идёт первой, в текущем потоке
+    got = run_parallel({
+        "basket": lambda: load_basket(vac_id, date),
+        "candidates": lambda: get_candidates_by_vacancy(vac_id, page),
+    })
+    candidates, basket = got["candidates"], got["basket"]
 
     return {
         "vac_id": vac_id,
         "date": date,
         "emp_id": emp_id,
-        "candidates": candidates,
+        "candidates": candidates["items"],
+        "page": page,
+        "next_page": candidates["next_page"],
         "basket": basket,
         "error": None,
     }
@@ -223,9 +221,12 @@ def appointment_confirm(vac_id: int, date: str, emp_id: int) -> Dict[str, Any]:
     if not items:
         return {"created": 0, "error": "basket_empty"}
 
-    evt = ensure_event(vac_id, date, emp_id)
     cand_ids: List[int] = [int(cid) for cid in items.keys()]
-    created = create_calls_for_event(evt['event_id'], evt['emp_id'], cand_ids)
+
+    # событие и приглашения — одной транзакцией: либо всё, либо ничего
+    with transaction() as tx:
+        evt = _ensure_event_tx(tx, vac_id, date, emp_id)
+        created = _create_calls_tx(tx, evt['event_id'], evt['emp_id'], cand_ids)
 
     clear_basket(vac_id, date)
 
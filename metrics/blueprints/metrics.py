@@ -0,0 +1,84 @@
+from flask import Blueprint, Response, current_app
+from decorators.auth import login_required
+from decorators.access import group_required
+from database import metrics as sql_metrics
+from database.pool import pools_stats
+from report import result_cache as report_cache
+from queries import result_cache as query_cache
+
+bp = Blueprint('metrics', __name__)
+
+
+def _pool_lines() -> list:
+    out = []
+    gauges = (
+        ("db_pool_in_use", "in_use", "gauge", "Соединений выдано из пула."),
+        ("db_pool_idle", "idle", "gauge", "Свободных соединений в пуле."),
+        ("db_pool_created_total", "created", "counter", "Открыто соединений."),
+        ("db_pool_waits_total", "waits", "counter", "Выдач с ожиданием свободного соединения."),
+        ("db_pool_timeouts_total", "timeouts", "counter", "Таймаутов ожидания соединения."),
+    )
+    stats = pools_stats()
+    for metric, key, mtype, help_ in gauges:
+        out.append(f"# HELP {metric} {help_}")
+        out.append(f"# TYPE {metric} {mtype}")
+        for st in stats:
+            out.append(f'{metric}{{user="{st["user"]}",database="{st["database"]}"}} {st[key]}')
+    return out
+
+
+def _cache_lines() -> list:
+    cache = current_app.extensions.get('redis_cache')
+    if cache is None:
+        return []
+    st = cache.stats()
+    out = [
+        "# HELP cache_requests_total Обращения к кэшу по уровню и результату.",
+        "# TYPE cache_requests_total counter",
+        f'cache_requests_total{{level="redis",result="hit"}} {st["redis"]["hits"]}',
+        f'cache_requests_total{{level="redis",result="miss"}} {st["redis"]["misses"]}',
+    ]
+    if st.get("l1"):
+        out.append(f'cache_requests_total{{level="l1",result="hit"}} {st["l1"]["hits"]}')
+        out.append(f'cache_requests_total{{level="l1",result="miss"}} {st["l1"]["misses"]}')
+    breaker = st.get("breaker") or {}
+    out += [
+        "# HELP cache_breaker_open Предохранитель Redis разомкнут (1) или нет (0).",
+        "# TYPE cache_breaker_open gauge",
+        f'cache_breaker_open {0 if breaker.get("state") == "closed" else 1}',
+    ]
+    return out
+
+
+def _report_cache_lines() -> list:
+    st = report_cache.stats()
+    return [
+        "# HELP report_cache_requests_total Чтения готовых отчётов из кэша результатов.",
+        "# TYPE report_cache_requests_total counter",
+        f'report_cache_requests_total{{result="hit"}} {st["hits"]}',
+        f'report_cache_requests_total{{result="miss"}} {st["misses"]}',
+        "# HELP report_cache_stores_total Сохранено результатов отчётов в кэш.",
+        "# TYPE report_cache_stores_total counter",
+        f'report_cache_stores_total {st["stores"]}',
+    ]
+
+
+def _query_cache_lines() -> list:
+    st = query_cache.stats()
+    return [
+        "# HELP query_cache_requests_total Чтения результатов запросов из кэша.",
+        "# TYPE query_cache_requests_total counter",
+        f'query_cache_requests_total{{result="hit"}} {st["hits"]}',
+        f'query_cache_requests_total{{result="miss"}} {st["misses"]}',
+        f'query_cache_requests_total{{result="bypass"}} {st["bypass"]}',
+    ]
+
+
+@bp.route('/', methods=['GET'])
+@login_required
+@group_required('metrics')
+def metrics():
+    """Метрики в текстовом формате Prometheus (только для администратора)."""
+    body = sql_metrics.render_prometheus()
+    body += "\n".join(_pool_lines() + _cache_lines() + _report_cache_lines() + _query_cache_lines()) + "\n"
+    return Response(body, mimetype='text/plain; version=0.0.4')
@@ -1,9 +1,20 @@
+import base64
+import json
+import threading
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from contextlib import contextmanager
 
 import pymysql
-from flask import current_app
-from database.select import select_list, select_one
+from flask import current_app, g
+from database.select import select_list, select_one, select_chunks, current_db_config
 from database.DBcm import DBContextManager
+from database.sql_provider import SQLScriptError
+from database import metrics
+from database.metrics import track
+from database import request_memo
+from cache.invalidation import invalidate_after_write, tags_for, invalidate
 
 class ModelRouteError(RuntimeError):
     def __init__(self, message, *, code=None, cause=None):
@@ -12,14 +23,17 @@ class ModelRouteError(RuntimeError):
         self.cause = cause
 
 
-def _load_sql_text(sql_name: str) -> str:
+def _load_sql_text(sql_name: str, params=None) -> str:
+    """Текст скрипта; параметры сверяются с разобранным скриптом до обращения к БД."""
     provider = current_app.config.get('SQL_PROVIDER')
     if not provider:
         raise ModelRouteError("SQL-провайдер не инициализирован в приложении.")
     try:
-        return provider.get(sql_name)
+        return provider.get(sql_name, params, check=True)
     except FileNotFoundError:
         raise ModelRouteError(f"SQL-файл «{sql_name}» не найден.")
+    except SQLScriptError as e:
+        raise ModelRouteError(str(e), cause=e)
     except Exception as e:
         raise ModelRouteError(f"Не удалось загрузить SQL «{sql_name}».", cause=e)
 
@@ -41,10 +55,25 @@ def _friendly_mysql_error(e: pymysql.MySQLError) -> ModelRouteError:
     return ModelRouteError(f"{msg} (код {errno})", code=errno, cause=e)
 
 
-def run_sql(sql_name: str, params=None):
-    sql = _load_sql_text(sql_name)
+def run_sql(sql_name: str, params=None, *, memo=False):
+    """
+    memo=True — одинаковый (скрипт, параметры) в пределах запроса читается
+    из БД один раз; строки отдаются копиями.
+    """
+    if memo:
+        rows = request_memo.memoized(request_memo.make_key("sql", sql_name, params),
+                                     lambda: _run_sql(sql_name, params))
+        return [dict(r) for r in rows]
+    return _run_sql(sql_name, params)
+
+
+def _run_sql(sql_name: str, params=None):
+    sql = _load_sql_text(sql_name, params)
     try:
-        return select_list(sql, params or None)
+        with track(sql_name, params) as q:
+            rows = select_list(sql, params or None)
+            q.rows = len(rows)
+        return rows
     except pymysql.MySQLError as e:
         raise _friendly_mysql_error(e)
     except Exception as e:
@@ -54,12 +83,122 @@ def run_sql(sql_name: str, params=None):
         raise ModelRouteError("Неизвестная ошибка при выполнении запроса.", cause=e)
 
 
-def run_sql_one(sql_name: str, params=None, *, required=False, strict_one=False):
-    sql = _load_sql_text(sql_name)
+def _encode_page(row: dict, key) -> str:
+    """Токен страницы: значения ключа сортировки последней строки (date/Decimal — строкой)."""
+    raw = json.dumps([row[k] for k in key], default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_page(page: str | None, key) -> dict:
+    if not page:
+        return {f"after_{k}": None for k in key}
+    try:
+        values = json.loads(base64.urlsafe_b64decode(page + "=" * (-len(page) % 4)))
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or len(values) != len(key):
+        raise ModelRouteError("Некорректный токен страницы.")
+    return {f"after_{k}": v for k, v in zip(key, values)}
+
+
+# LIMIT «без ограничения» для постраничных скриптов (рекомендация документации MySQL)
+NO_LIMIT = 18446744073709551615
+
+
+def page_params(key, page: str | None = None, limit: int | None = None) -> dict:
+    """
+    Параметры keyset-условия для постраничного скрипта: after_<поле> и limit.
+    Без limit — весь результат начиная с токена (для выгрузок).
+    """
+    args = _decode_page(page, key)
+    args["limit"] = NO_LIMIT if limit is None else limit + 1  # +1 — есть ли следующая страница
+    return args
+
+
+def run_sql_page(sql_name: str, params=None, *, key, limit: int = 50, page: str | None = None):
+    """
+    Keyset-пагинация. Скрипт сортирует по полям key и содержит условие
+    «(%(after_<поле>)s IS NULL OR (поля) > (%(after_<поле>)s, ...))» (для DESC — «<»)
+    и LIMIT %(limit)s. Любая страница стоит как первая: без OFFSET, поиск по
+    индексу сразу с последнего ключа.
+    Возвращает (rows, next_page); next_page — токен следующей страницы или None.
+    """
+    args = dict(params or {})
+    args.update(page_params(key, page, limit))
+    rows = run_sql(sql_name, args)
+    if len(rows) > limit:
+        return rows[:limit], _encode_page(rows[limit - 1], key)
+    return rows, None
+
+
+def run_sql_iter(sql_name: str, params=None, *, chunk_size: int = 500):
+    """
+    SELECT с потоковой выдачей строк (SSDictCursor): для больших результатов,
+    которые нужно отрендерить/выгрузить, не собирая в список.
+    """
+    sql = _load_sql_text(sql_name, params)
+    chunks = select_chunks(sql, params or None, chunk_size)
+
+    def _timed():
+        # в метрики идёт только время выполнения и чтения пачек, не рендер между ними;
+        # trace текущий только на время чтения пачки
+        trace = metrics.QueryTrace(sql_name, params)
+        trace.rows = 0
+        elapsed, error = 0.0, None
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    with metrics.attached(trace):
+                        chunk = next(chunks, None)
+                finally:
+                    elapsed += time.perf_counter() - started
+                if chunk is None:
+                    break
+                trace.rows += len(chunk)
+                yield from chunk
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            chunks.close()
+            metrics.finish(trace, elapsed, error)
+
+    def _guarded():
+        try:
+            yield from _timed()
+        except pymysql.MySQLError as e:
+            raise _friendly_mysql_error(e)
+        except ModelRouteError:
+            raise
+        except Exception as e:
+            # например PoolTimeoutError: наружу — только ModelRouteError
+            if current_app.debug:
+                traceback.print_exc()
+                raise ModelRouteError(f"Неизвестная ошибка: {e}", cause=e)
+            raise ModelRouteError("Неизвестная ошибка при выполнении запроса.", cause=e)
+
+    return _guarded()
+
+
+def run_sql_one(sql_name: str, params=None, *, required=False, strict_one=False, memo=False):
+    if memo:
+        key = request_memo.make_key("sql_one" if not strict_one else "sql_strict", sql_name, params)
+        row = request_memo.memoized(key, lambda: _run_sql_one(sql_name, params, strict_one=strict_one))
+        if row is None and required:
+            raise ModelRouteError("Запись не найдена по заданным параметрам.")
+        return dict(row) if row is not None else None
+    return _run_sql_one(sql_name, params, required=required, strict_one=strict_one)
+
+
+def _run_sql_one(sql_name: str, params=None, *, required=False, strict_one=False):
+    sql = _load_sql_text(sql_name, params)
     try:
         if strict_one:
             # чтобы знать количество, заберём весь результат (для учебного проекта ок)
-            rows = select_list(sql, params or None)
+            with track(sql_name, params) as q:
+                rows = select_list(sql, params or None)
+                q.rows = len(rows)
             if not rows:
                 if required:
                     raise ModelRouteError("Запись не найдена по заданным параметрам.")
@@ -68,7 +207,9 @@ def run_sql_one(sql_name: str, params=None, *, required=False, strict_one=False)
                 raise ModelRouteError(f"Ожидалась 1 строка результата, получено: {len(rows)}. Уточните фильтры.")
             return rows[0]
         else:
-            row = select_one(sql, params or None)
+            with track(sql_name, params) as q:
+                row = select_one(sql, params or None)
+                q.rows = 0 if row is None else 1
             if row is None and required:
                 raise ModelRouteError("Запись не найдена по заданным параметрам.")
             return row
@@ -83,15 +224,91 @@ def run_sql_one(sql_name: str, params=None, *, required=False, strict_one=False)
         raise ModelRouteError("Неизвестная ошибка при выполнении запроса.", cause=e)
 
 
+# --------- параллельные независимые чтения ---------
+
+FANOUT_WORKERS = 8       # потоков на процесс (каждый со своим соединением из пула)
+FANOUT_TIMEOUT = 10.0    # сек. на всю группу запросов
+
+_fanout_executor = None
+_fanout_lock = threading.Lock()
+_fanout_local = threading.local()
+
+
+def _get_fanout_executor() -> ThreadPoolExecutor:
+    global _fanout_executor
+    if _fanout_executor is None:
+        with _fanout_lock:
+            if _fanout_executor is None:
+                _fanout_executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS,
+                                                      thread_name_prefix="sql-fanout")
+    return _fanout_executor
+
+
+def _as_call(spec):
+    if callable(spec):
+        return spec
+    sql_name, params = spec
+    return lambda: run_sql(sql_name, params)
+
+
+def run_parallel(calls: dict, *, timeout: float | None = FANOUT_TIMEOUT) -> dict:
+    """
+    Несколько независимых чтений одновременно:
+        run_parallel({"vac": ("a.sql", {...}), "emp": ("b.sql", {}), "x": func})
+    Значение — (скрипт, параметры) для run_sql или функция без аргументов.
+    Первый вызов выполняется в текущем потоке (ему доступны session/request),
+    остальные — в общем пуле потоков с контекстом приложения и тем же db_config.
+    Возвращает {имя: результат}; ошибка любого вызова пробрасывается,
+    не уложились в timeout — ModelRouteError(code="timeout").
+    Вложенный вызов из потока пула выполняется последовательно (без взаимной блокировки).
+    """
+    tasks = [(name, _as_call(spec)) for name, spec in calls.items()]
+    if len(tasks) < 2 or getattr(_fanout_local, "active", False):
+        return {name: fn() for name, fn in tasks}
+
+    app = current_app._get_current_object()
+    db_cfg = current_db_config()
+
+    def in_context(fn):
+        def run():
+            with app.app_context():
+                g.db_config = db_cfg
+                _fanout_local.active = True
+                try:
+                    return fn()
+                finally:
+                    _fanout_local.active = False
+        return run
+
+    started = time.monotonic()
+    executor = _get_fanout_executor()
+    (first_name, first), rest = tasks[0], tasks[1:]
+    futures = {name: executor.submit(in_context(fn)) for name, fn in rest}
+    try:
+        results = {first_name: first()}
+        for name, fut in futures.items():
+            left = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+            results[name] = fut.result(timeout=left)
+        return results
+    except FuturesTimeout:
+        raise ModelRouteError("Запросы к БД не уложились в отведённое время.", code="timeout")
+    finally:
+        for fut in futures.values():
+            fut.cancel()
+
+
 def call_proc(proc_name: str, args: list):
-    db_cfg = current_app.config['db_config']
+    db_cfg = current_db_config()
     try:
-        with DBContextManager(db_cfg) as cursor:
+        with track(proc_name, args) as q, DBContextManager(db_cfg) as cursor:
             cursor.callproc(proc_name, args)
             rows = cursor.fetchall()
             while cursor.nextset():
                 _ = cursor.fetchall()
-            return rows
+            q.rows = len(rows)
+        request_memo.forget("sql")
+        invalidate_after_write(proc_name, None)
+        return rows
     except pymysql.MySQLError as e:
         raise _friendly_mysql_error(e)
     except Exception as e:
@@ -101,12 +318,16 @@ def exec_sql(sql_name: str, params=None) -> int:
     """INSERT/UPDATE/DELETE — возвращает rowcount."""
     from database.DBcm import DBContextManager
     import pymysql
-    sql = _load_sql_text(sql_name)
-    db_cfg = current_app.config['db_config']
+    sql = _load_sql_text(sql_name, params)
+    db_cfg = current_db_config()
     try:
-        with DBContextManager(db_cfg) as cursor:
+        with track(sql_name, params) as q, DBContextManager(db_cfg) as cursor:
             cursor.execute(sql, params or None)
-            return cursor.rowcount
+            rowcount = q.rows = cursor.rowcount
+        # кэш сбрасываем только после COMMIT
+        request_memo.forget("sql")
+        invalidate_after_write(sql_name, sql, params)
+        return rowcount
     except pymysql.MySQLError as e:
         raise _friendly_mysql_error(e)
     except Exception as e:
@@ -119,12 +340,16 @@ def exec_insert(sql_name: str, params=None) -> int:
     """INSERT — возвращает lastrowid."""
     from database.DBcm import DBContextManager
     import pymysql
-    sql = _load_sql_text(sql_name)
-    db_cfg = current_app.config['db_config']
+    sql = _load_sql_text(sql_name, params)
+    db_cfg = current_db_config()
     try:
-        with DBContextManager(db_cfg) as cursor:
+        with track(sql_name, params) as q, DBContextManager(db_cfg) as cursor:
             cursor.execute(sql, params or None)
-            return cursor.lastrowid
+            q.rows = cursor.rowcount
+            lastrowid = cursor.lastrowid
+        request_memo.forget("sql")
+        invalidate_after_write(sql_name, sql, params)
+        return lastrowid
     except pymysql.MySQLError as e:
         raise _friendly_mysql_error(e)
     except Exception as e:
@@ -133,3 +358,82 @@ def exec_insert(sql_name: str, params=None) -> int:
             raise ModelRouteError(f"Неизвестная ошибка: {e}", cause=e)
         raise ModelRouteError("Неизвестная ошибка при выполнении запроса.", cause=e)
 
+
+
+class Transaction:
+    """
+    Скрипты SQLProvider, выполняемые на одном соединении в одной транзакции.
+    Получается через model_route.transaction().
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.tags = set()  # теги кэша, сбрасываемые после COMMIT
+
+    def _written(self, sql_name, sql, params):
+        self.tags.update(tags_for(sql_name, sql, params))
+
+    def run_sql(self, sql_name: str, params=None) -> list:
+        sql = _load_sql_text(sql_name, params)
+        with track(sql_name, params) as q:
+            self.cursor.execute(sql, params or None)
+            rows = self.cursor.fetchall()
+            q.rows = len(rows)
+        return rows
+
+    def run_sql_one(self, sql_name: str, params=None):
+        rows = self.run_sql(sql_name, params)
+        return rows[0] if rows else None
+
+    def exec_sql(self, sql_name: str, params=None) -> int:
+        sql = _load_sql_text(sql_name, params)
+        with track(sql_name, params) as q:
+            self.cursor.execute(sql, params or None)
+            q.rows = self.cursor.rowcount
+        self._written(sql_name, sql, params)
+        return self.cursor.rowcount
+
+    def exec_insert(self, sql_name: str, params=None) -> int:
+        sql = _load_sql_text(sql_name, params)
+        with track(sql_name, params) as q:
+            self.cursor.execute(sql, params or None)
+            q.rows = self.cursor.rowcount
+        self._written(sql_name, sql, params)
+        return self.cursor.lastrowid
+
+    def exec_many(self, sql_name: str, params_seq) -> int:
+        """Пакетный INSERT: pymysql склеивает его в один многострочный VALUES."""
+        params_seq = list(params_seq)
+        if not params_seq:
+            return 0
+        sql = _load_sql_text(sql_name, params_seq[0])
+        with track(sql_name, f"{len(params_seq)} rows") as q:
+            self.cursor.executemany(sql, params_seq)
+            q.rows = self.cursor.rowcount
+        for params in params_seq:
+            self._written(sql_name, sql, params)
+        return self.cursor.rowcount
+
+
+@contextmanager
+def transaction():
+    """
+    with transaction() as tx: ... — всё внутри блока идёт одним соединением;
+    COMMIT при успешном выходе, ROLLBACK при любом исключении.
+    """
+    db_cfg = current_db_config()
+    try:
+        with DBContextManager(db_cfg) as cursor:
+            tx = Transaction(cursor)
+            yield tx
+        request_memo.forget("sql")
+        invalidate(tx.tags)
+    except pymysql.MySQLError as e:
+        raise _friendly_mysql_error(e)
+    except ModelRouteError:
+        raise
+    except Exception as e:
+        if current_app.debug:
+            traceback.print_exc()
+            raise ModelRouteError(f"Неизвестная ошибка: {e}", cause=e)
+        raise ModelRouteError("Неизвестная ошибка при выполнении запроса.", cause=e)
@@ -0,0 +1,129 @@
+"""
+Асинхронный вариант model_route для ASGI-приложения (asgi.py): те же имена
+скриптов SQLProvider, те же ModelRouteError и сброс кэша после записи.
+"""
+import asyncio
+import time
+
+import pymysql
+from quart import current_app, g
+
+from cache.invalidation import REFDATA_TAGS, REFDATA_VERSION_KEY, tags_for
+from database import aio, metrics
+from database.sql_provider import SQLScriptError
+from model_route import ModelRouteError, _friendly_mysql_error, _encode_page, page_params
+
+
+async def _load_sql_text(sql_name: str, params=None) -> str:
+    """Текст скрипта; параметры сверяются с разобранным скриптом до обращения к БД."""
+    provider = current_app.config.get('SQL_PROVIDER')
+    if not provider:
+        raise ModelRouteError("SQL-провайдер не инициализирован в приложении.")
+    try:
+        if provider.reload_due():
+            # сверка mtime и чтение файлов — в потоке, не в event loop
+            await asyncio.to_thread(provider.maybe_reload)
+        return provider.get(sql_name, params, check=True, reload=False)
+    except FileNotFoundError:
+        raise ModelRouteError(f"SQL-файл «{sql_name}» не найден.")
+    except SQLScriptError as e:
+        raise ModelRouteError(str(e), cause=e)
+    except Exception as e:
+        raise ModelRouteError(f"Не удалось загрузить SQL «{sql_name}».", cause=e)
+
+
+def _db_config() -> dict:
+    cfg = g.get('db_config') or current_app.config.get('db_config')
+    if not cfg:
+        raise ModelRouteError("db_config не задан.")
+    return cfg
+
+
+def _wrap_error(e: Exception) -> ModelRouteError:
+    if isinstance(e, ModelRouteError):
+        return e
+    if isinstance(e, pymysql.MySQLError):
+        return _friendly_mysql_error(e)
+    return ModelRouteError("Неизвестная ошибка при выполнении запроса.", cause=e)
+
+
+async def _execute(name: str, params, action):
+    """action(cur) -> (число строк для метрик, результат) на соединении из пула."""
+    started = time.perf_counter()
+    n_rows = error = None
+    try:
+        async with aio.cursor(_db_config()) as cur:
+            n_rows, result = await action(cur)
+        return result
+    except Exception as e:
+        error = e
+        raise _wrap_error(e) from e
+    finally:
+        metrics.observe(name, params, time.perf_counter() - started, rows=n_rows, error=error)
+
+
+async def _invalidate(sql_name: str, sql: str | None, params=None):
+    tags = tags_for(sql_name, sql, params)
+    cache = current_app.extensions.get('redis_cache_aio')
+    if not tags or cache is None:
+        return
+    if tags & REFDATA_TAGS:
+        await cache.incr(REFDATA_VERSION_KEY)
+    await cache.invalidate_tags(tags)
+
+
+# --------- чтение ---------
+
+async def run_sql(sql_name: str, params=None) -> list:
+    sql = await _load_sql_text(sql_name, params)
+
+    async def action(cur):
+        await cur.execute(sql, params or None)
+        rows = list(await cur.fetchall())
+        return len(rows), rows
+    return await _execute(sql_name, params, action)
+
+
+async def run_sql_one(sql_name: str, params=None, *, required=False):
+    rows = await run_sql(sql_name, params)
+    if not rows:
+        if required:
+            raise ModelRouteError("Запись не найдена по заданным параметрам.")
+        return None
+    return rows[0]
+
+
+async def run_sql_page(sql_name: str, params=None, *, key, limit: int = 50, page: str | None = None):
+    """Как model_route.run_sql_page: (rows, next_page)."""
+    args = dict(params or {})
+    args.update(page_params(key, page, limit))
+    rows = await run_sql(sql_name, args)
+    if len(rows) > limit:
+        return rows[:limit], _encode_page(rows[limit - 1], key)
+    return rows, None
+
+
+# --------- запись ---------
+
+async def exec_sql(sql_name: str, params=None) -> int:
+    """INSERT/UPDATE/DELETE — возвращает rowcount; кэш сбрасывается после COMMIT."""
+    sql = await _load_sql_text(sql_name, params)
+
+    async def action(cur):
+        await cur.execute(sql, params or None)
+        return cur.rowcount, cur.rowcount
+    rowcount = await _execute(sql_name, params, action)
+    await _invalidate(sql_name, sql, params)
+    return rowcount
+
+
+async def call_proc(proc_name: str, args: list) -> list:
+    async def action(cur):
+        await cur.callproc(proc_name, args)
+        rows = list(await cur.fetchall())
+        while await cur.nextset():
+            await cur.fetchall()
+        return len(rows), rows
+    rows = await _execute(proc_name, args, action)
+    await _invalidate(proc_name, None)
+    return rows
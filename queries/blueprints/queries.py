@@ -1,8 +1,11 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for
+from flask import Blueprint, render_template, request, flash, redirect, url_for, session
 from functools import wraps
 from decorators.auth import login_required
 from decorators.access import group_required
-from model_route import run_sql, ModelRouteError
+from model_route import run_sql, run_sql_iter, run_sql_page, page_params, ModelRouteError
+from queries import result_cache
+from streaming import peek, stream_page
+from export import FORMATS, export_response
 
 bp = Blueprint('queries', __name__, template_folder='../templates')
 
@@ -12,6 +15,7 @@ QUERIES = {
     "new_employees": {
         "title": "Новые сотрудники за период",
         "sql": "new_emp.sql",
+        "page_key": ["enrollment", "emp_id"],  # keyset-пагинация по ORDER BY скрипта
         "fields": [
             {"name": "start_date", "label": "Начальная дата", "type": "date", "required": True},
             {"name": "end_date",   "label": "Конечная дата",  "type": "date", "required": True},
@@ -21,6 +25,10 @@ QUERIES = {
     "last_open_vacancy": {
         "title": "Дата последней открытой вакансии",
         "sql": "last_open_vacancy.sql",
+        # кэш результата, сек.; нет ключа — без кэша, строки идут потоком из курсора.
+        # Кэшируются только дешёвые частые запросы с результатом в одну-две строки.
+        "cache_ttl": 120,
+        "cache_tags": ["vacancy"],
         "fields": [
             {"name": "job_id",     "label": "Код должности", "type": "int",  "required": False},
             {"name": "office_id",  "label": "Номер офиса",   "type": "int",  "required": False},
@@ -37,6 +45,8 @@ QUERIES = {
     },
 }
 
+PAGE_SIZE = 200  # строк на страницу для запросов с page_key
+
 
 def _coerce(value: str, ftype: str):
     if value is None or value == "":
@@ -45,6 +55,50 @@ def _coerce(value: str, ftype: str):
         return int(value)
     return value  # date/text
 
+def _collect_params(meta, source):
+    """Параметры запроса из формы/строки запроса. Возвращает (params, метка неверного поля)"""
+    params = {}
+    for f in meta["fields"]:
+        raw = (source.get(f["name"]) or "").strip()
+        try:
+            params[f["name"]] = _coerce(raw, f["type"])
+        except ValueError:
+            return params, f["label"]
+    return params, None
+
+def _is_admin() -> bool:
+    role = session.get('user_group') or (session.get('user') or {}).get('role')
+    return (role or '').lower() == 'admin'
+
+def _fetch_rows(qid, meta, params, page, bypass_cache):
+    """
+    Строки запроса: (rows, next_page, из_кэша).
+    Без cache_ttl в метаданных — потоком из курсора; с ним — списком через кэш.
+    """
+    ttl = meta.get("cache_ttl")
+    key = result_cache.cache_key(qid, params, page) if ttl else None
+    if key and not bypass_cache:
+        cached = result_cache.get(key)
+        if cached is not None:
+            return cached["rows"], cached["next_page"], True
+    elif key:
+        result_cache.note_bypass()
+
+    next_page = None
+    if meta.get("page_key"):
+        rows, next_page = run_sql_page(meta["sql"], params, key=meta["page_key"],
+                                       limit=PAGE_SIZE, page=page)
+    elif key:
+        rows = run_sql(meta["sql"], params)
+    else:
+        # первая строка читается до начала ответа (peek): ошибки SQL уходят
+        # в errorhandler, остальные строки рендерятся потоком прямо из курсора
+        rows = run_sql_iter(meta["sql"], params)
+
+    if key:
+        result_cache.put(key, {"rows": rows, "next_page": next_page}, ttl, meta.get("cache_tags"))
+    return rows, next_page, False
+
 @bp.errorhandler(ModelRouteError)
 def handle_model_error(e: ModelRouteError):
     flash(str(e), "error")
@@ -73,7 +127,8 @@ def query_form_root(qid):
         queries=QUERIES,
         title=(meta["title"] if meta else "Параметризованный запрос"),
         fields=(meta["fields"] if meta else []),
-        params={}
+        params={},
+        cacheable=bool(meta and meta.get("cache_ttl")) and _is_admin()
     )
 
 
@@ -87,30 +142,54 @@ def query_run():
         flash("Выберите запрос", "error")
         return redirect(url_for('queries.query_form_root'))
 
-    params = {}
-    for f in meta["fields"]:
-        raw = (request.form.get(f["name"]) or "").strip()
-        try:
-            params[f["name"]] = _coerce(raw, f["type"])
-        except ValueError:
-            flash(f"Поле «{f['label']}» задано неверно", "error")
-            return render_template(
-                'query_form.html',
-                title=meta["title"], qid=qid,
-                queries=QUERIES,
-                fields=meta["fields"],
-                params=request.form
-            )
-
-    rows = run_sql(meta["sql"], params)
-    headers = list(rows[0].keys()) if rows else []
+    params, bad_field = _collect_params(meta, request.form)
+    if bad_field:
+        flash(f"Поле «{bad_field}» задано неверно", "error")
+        return render_template(
+            'query_form.html',
+            title=meta["title"], qid=qid,
+            queries=QUERIES,
+            fields=meta["fields"],
+            params=request.form,
+            cacheable=bool(meta.get("cache_ttl")) and _is_admin()
+        )
+
+    # обход кэша — только для администратора
+    bypass_cache = _is_admin() and request.form.get("no_cache") == "1"
+    rows, next_page, from_cache = _fetch_rows(qid, meta, params, request.form.get("page"),
+                                              bypass_cache)
+    first, rows = peek(rows)
+    headers = list(first.keys()) if first else []
 
     labels = {f["name"]: f["label"] for f in meta["fields"]}
     filters_display = [(labels[name], params.get(name)) for name in labels.keys()]
 
-    return render_template(
+    return stream_page(
         'query_result.html',
         title=meta["title"], qid=qid,
-        headers=headers, rows=rows,
-        filters_display=filters_display
+        headers=headers, rows=rows, has_rows=first is not None,
+        filters_display=filters_display,
+        export_args={k: v for k, v in params.items() if v is not None},
+        paged=bool(meta.get("page_key")), next_page=next_page,
+        from_cache=from_cache, no_cache=bypass_cache
     )
+
+
+@bp.route('/export/<qid>.<fmt>', methods=['GET'])
+@login_required
+@group_required()
+def query_export(qid, fmt):
+    """Выгрузка результата запроса в CSV/XLSX потоком из серверного курсора"""
+    meta = QUERIES.get(qid)
+    if not meta or fmt not in FORMATS:
+        flash("Неизвестный запрос или формат выгрузки", "error")
+        return redirect(url_for('queries.query_form_root'))
+
+    params, bad_field = _collect_params(meta, request.args)
+    if bad_field:
+        flash(f"Поле «{bad_field}» задано неверно", "error")
+        return redirect(url_for('queries.query_form_root', qid=qid))
+
+    if meta.get("page_key"):
+        params.update(page_params(meta["page_key"]))  # выгрузка — без ограничения страницей
+    return export_response(run_sql_iter(meta["sql"], params, chunk_size=2000), qid, fmt)
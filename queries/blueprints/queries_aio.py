@@ -0,0 +1,101 @@
+from quart import Blueprint, render_template, request, flash, redirect, url_for, session, g, current_app
+from decorators.aio import login_required, group_required
+from model_route import ModelRouteError
+import model_route_aio
+from queries import result_cache
+from queries.blueprints.queries import QUERIES, PAGE_SIZE, _collect_params
+
+# Асинхронные представления раздела «Запросы» для ASGI-приложения (asgi.py).
+# Метаданные и разбор формы — общие с queries.py; выгрузка остаётся в WSGI-части.
+
+bp = Blueprint('queries', __name__, template_folder='../templates')
+
+
+def _is_admin() -> bool:
+    role = session.get('user_group') or (session.get('user') or {}).get('role')
+    return (role or '').lower() == 'admin'
+
+
+async def _fetch_rows(qid, meta, params, page, bypass_cache):
+    """(rows, next_page, из_кэша) — как queries._fetch_rows, но строки всегда списком."""
+    cache = current_app.extensions.get('redis_cache_aio')
+    ttl = meta.get("cache_ttl")
+    key = result_cache.cache_key(qid, params, page, db=g.db_config) if ttl else None
+    if key and not bypass_cache:
+        cached = await result_cache.aget(cache, key)
+        if cached is not None:
+            return cached["rows"], cached["next_page"], True
+    elif key:
+        result_cache.note_bypass()
+
+    next_page = None
+    if meta.get("page_key"):
+        rows, next_page = await model_route_aio.run_sql_page(
+            meta["sql"], params, key=meta["page_key"], limit=PAGE_SIZE, page=page)
+    else:
+        rows = await model_route_aio.run_sql(meta["sql"], params)
+
+    if key:
+        await result_cache.aput(cache, key, {"rows": rows, "next_page": next_page}, ttl,
+                                meta.get("cache_tags"))
+    return rows, next_page, False
+
+
+async def _render_form(qid, params, status=200):
+    meta = QUERIES.get(qid) if qid else None
+    return await render_template(
+        'query_form.html',
+        qid=qid,
+        queries=QUERIES,
+        title=(meta["title"] if meta else "Параметризованный запрос"),
+        fields=(meta["fields"] if meta else []),
+        params=params,
+        cacheable=bool(meta and meta.get("cache_ttl")) and _is_admin()
+    ), status
+
+
+@bp.errorhandler(ModelRouteError)
+async def handle_model_error(e: ModelRouteError):
+    await flash(str(e), "error")
+    form = await request.form
+    return await _render_form(form.get('qid') or request.args.get('qid'), form, 400)
+
+
+@bp.route('/run', defaults={'qid': None}, methods=['GET'])
+@bp.route('/run/<qid>', methods=['GET'])
+@login_required
+@group_required()
+async def query_form_root(qid):
+    return await _render_form(qid or request.args.get('qid'), {})
+
+
+@bp.route('/run', methods=['POST'])
+@login_required
+@group_required()
+async def query_run():
+    form = await request.form
+    qid = form.get('qid')
+    meta = QUERIES.get(qid)
+    if not meta:
+        await flash("Выберите запрос", "error")
+        return redirect(url_for('queries.query_form_root'))
+
+    params, bad_field = _collect_params(meta, form)
+    if bad_field:
+        await flash(f"Поле «{bad_field}» задано неверно", "error")
+        return await _render_form(qid, form)
+
+    bypass_cache = _is_admin() and form.get("no_cache") == "1"
+    rows, next_page, from_cache = await _fetch_rows(qid, meta, params, form.get("page"),
+                                                    bypass_cache)
+    labels = {f["name"]: f["label"] for f in meta["fields"]}
+
+    return await render_template(
+        'query_result.html',
+        title=meta["title"], qid=qid,
+        headers=list(rows[0].keys()) if rows else [], rows=rows, has_rows=bool(rows),
+        filters_display=[(labels[name], params.get(name)) for name in labels],
+        export_args={k: v for k, v in params.items() if v is not None},
+        paged=bool(meta.get("page_key")), next_page=next_page,
+        from_cache=from_cache, no_cache=bypass_cache
+    )
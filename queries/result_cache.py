@@ -0,0 +1,79 @@
+import hashlib
+import json
+import threading
+
+from flask import current_app
+
+from database.select import current_db_config
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bypass": 0, "stores": 0}
+
+
+def cache_key(qid: str, params: dict, page: str | None = None, db: dict | None = None) -> str:
+    """
+    query:{qid}:{хэш}. В хэш входят приведённые параметры и тот, кто читает БД
+    (host/port/user/database): роли с разными DB-пользователями результат не делят.
+    db — явный db_config (асинхронный вариант), по умолчанию — текущий.
+    """
+    db = db if db is not None else (current_db_config() or {})
+    ident = {
+        "params": {k: params[k] for k in sorted(params)},
+        "db": [db.get("host"), db.get("port"), db.get("user"), db.get("database")],
+        "page": page,
+    }
+    raw = json.dumps(ident, ensure_ascii=False, default=str, separators=(",", ":"))
+    return f"query:{qid}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+
+def _count(name: str):
+    with _lock:
+        _stats[name] += 1
+
+
+def _cache():
+    return current_app.extensions.get('redis_cache')
+
+
+def get(key: str):
+    """Закэшированный результат или None."""
+    cache = _cache()
+    value = cache.get_value(key) if cache is not None else None
+    _count("hits" if value is not None else "misses")
+    return value
+
+
+def put(key: str, value, ttl: int, tags=None):
+    cache = _cache()
+    if cache is None:
+        return
+    cache.set_value(key, value, ttl)
+    if tags:
+        cache.tag_keys(key, tags, ttl)
+    _count("stores")
+
+
+async def aget(cache, key: str):
+    """get для AsyncRedisCache (asgi.py)."""
+    value = await cache.get_value(key) if cache is not None else None
+    _count("hits" if value is not None else "misses")
+    return value
+
+
+async def aput(cache, key: str, value, ttl: int, tags=None):
+    if cache is None:
+        return
+    await cache.set_value(key, value, ttl)
+    if tags:
+        await cache.tag_keys(key, tags, ttl)
+    _count("stores")
+
+
+def note_bypass():
+    _count("bypass")
+
+
+def stats() -> dict:
+    with _lock:
+        total = _stats["hits"] + _stats["misses"]
+        return dict(_stats, hit_rate=round(_stats["hits"] / total, 4) if total else 0.0)
@@ -1,7 +1,13 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app, jsonify
 from decorators.access import group_required
-from model_route import run_sql, run_sql_one, call_proc, ModelRouteError
+from model_route import run_sql, run_sql_one, run_sql_iter, run_sql_page, ModelRouteError
+from report import jobs as report_jobs
+from report import result_cache
+from report import bulk as report_bulk
+from streaming import peek, stream_page
+from export import FORMATS, export_response
 import json
+import click
 
 bp = Blueprint('reports', __name__, template_folder='../templates')
 
@@ -9,8 +15,9 @@ REPORTS = {
     "interviews_monthly": {
         "title":      "Собеседования по рекрутерам за месяц (по открытым вакансиям)",
         "build_proc": "p_interviews_monthly",
-        "exists_sql": "interviews_monthly_exists.sql",
         "select_sql": "interviews_monthly_select.sql",
+        "built_sql":  "interviews_monthly_built.sql",
+        "row_key":    "rep_id",
         "arg_order":  ["p_month", "p_year", "p_office_id"],
         "fields": [
             {"name": "p_month",     "label": "Месяц (1–12)", "type": "int", "required": True},
@@ -21,8 +28,9 @@ REPORTS = {
     "monthly_proc_recruiting": {
         "title":      "Месячный отчёт по найму",
         "build_proc": "p_recruiting_report",
-        "exists_sql": "recruiting_monthly_exists.sql",
         "select_sql": "recruiting_monthly_select.sql",
+        "built_sql":  "recruiting_monthly_built.sql",
+        "row_key":    "rep_id",
         "arg_order":  ["p_month", "p_year", "p_office_id"],
         "fields": [
             {"name": "p_month",     "label": "Месяц (1–12)", "type": "int", "required": True},
@@ -32,6 +40,10 @@ REPORTS = {
     },
 }
 
+# история: новые сверху, страницы по ключу (created_at, log_id)
+HISTORY_KEY = ["created_at", "log_id"]
+HISTORY_PAGE_SIZE = 50
+
 def _has_access(code: str) -> bool:
     """Проверка права в конфиге приложения"""
     role = session.get('user_group') or (session.get('user') or {}).get('role')
@@ -39,16 +51,6 @@ def _has_access(code: str) -> bool:
     allowed = set(access.get(role, []))
     return role == 'admin' or '*' in allowed or code in allowed
 
-def _call_proc_smart(proc_name, args_try_first):
-    try:
-        return call_proc(proc_name, args_try_first)
-    except ModelRouteError as e:
-        code = getattr(e, 'code', None)
-        if (code == 1318) or ('1318' in str(e)):
-            current_user = (session.get('user') or {}).get('login')
-            return call_proc(proc_name, args_try_first + [current_user])
-        raise
-
 def _collect_monthly_params(meta, form):
     """Сбор и валидация полей формы (месяц/год/офис). Возвращает (params, errors)"""
     params, errors = {}, []
@@ -75,25 +77,32 @@ def _collect_monthly_params(meta, form):
             params[name] = raw_value
     return params, errors
 
-def _exists_ready(meta, params):
-    """Проверка: есть ли готовые строки в агрегатной таблице за месяц/год/офис"""
-    try:
-        ex = run_sql_one(meta['exists_sql'], {
-            "p_month": params.get("p_month"),
-            "p_year": params.get("p_year"),
-            "p_office_id": params.get("p_office_id"),
-        }, required=True) or {}
-    except ModelRouteError as e:
-        raise e
-    return (ex.get('cnt') or ex.get('count') or 0) > 0
-
 def _select_ready(meta, params):
-    """Чтение готовых строк из агрегатной таблицы"""
-    return run_sql(meta['select_sql'], {
+    """Поток готовых строк из агрегатной таблицы (SSDictCursor); пусто — отчёт не построен"""
+    return run_sql_iter(meta['select_sql'], {
         "p_month": params.get("p_month"),
         "p_year": params.get("p_year"),
         "p_office_id": params.get("p_office_id"),
-    }) or []
+    })
+
+def _ready_rows(rid, meta, params):
+    """
+    Строки готового отчёта: список из кэша, иначе поток из агрегатной таблицы.
+    Кэш заполняет построение (report.jobs), а не рендер: поток не копится в памяти.
+    """
+    rows = result_cache.get_rows(rid, params)
+    if rows is None:
+        rows = _select_ready(meta, params)
+    return rows
+
+def _render_result(meta, rows, **extra):
+    """Потоковый рендер reports_result.html; rows — список или итератор строк"""
+    first, rows = peek(rows)
+    return stream_page(
+        'reports_result.html', meta=meta, rows=rows,
+        has_rows=first is not None, headers=list(first.keys()) if first else [],
+        **extra
+    )
 
 @bp.route('/run', defaults={'rid': None}, methods=['GET'])
 @bp.route('/run/<rid>', methods=['GET'])
@@ -144,25 +153,18 @@ def report_run():
         )
     if action == 'view':
         try:
-            ready = _exists_ready(meta, params)
+            first, rows = peek(_ready_rows(rid, meta, params))
         except ModelRouteError as e:
-            flash(f'Ошибка проверки наличия отчёта: {e}', 'error')
-            ready = False
+            flash(f'Ошибка чтения отчёта: {e}', 'error')
+            first = None
 
-        if not ready:
+        if first is None:
             flash('Такого отчёта за указанный месяц нет.', 'error')
             return render_template(
                 'reports_form.html',
                 reports=REPORTS, selected_id=rid, rid=rid, meta=meta, report_id=rid, params=params
             )
-
-        try:
-            rows = _select_ready(meta, params)
-        except ModelRouteError as e:
-            flash(f'Ошибка чтения отчёта: {e}', 'error')
-            rows = []
-
-        return render_template('reports_result.html', meta=meta, rows=rows, report_id=rid)
+        return _render_result(meta, rows, report_id=rid, params=params)
 
     # ==== Создать отчёт ====
     if not _has_access('reports_build'):
@@ -170,10 +172,10 @@ def report_run():
         return redirect(url_for('reports.report_form_root', rid=rid))
 
     try:
-        if _exists_ready(meta, params):
+        first, rows = peek(_ready_rows(rid, meta, params))
+        if first is not None:
             flash('Отчёт за этот месяц уже существует — показываю готовый.', 'success')
-            rows = _select_ready(meta, params)
-            return render_template('reports_result.html', meta=meta, rows=rows, report_id=rid)
+            return _render_result(meta, rows, report_id=rid, params=params)
     except ModelRouteError as e:
         flash(f'Ошибка проверки наличия отчёта: {e}', 'error')
         return render_template(
@@ -181,49 +183,172 @@ def report_run():
             reports=REPORTS, selected_id=rid, rid=rid, meta=meta, report_id=rid, params=params
         )
 
-    try:
-        args = [params.get("p_month"), params.get("p_year"), params.get("p_office_id")]
-        rows = _call_proc_smart(meta['build_proc'], args)
-    except ModelRouteError as e:
-        flash(f'Ошибка при создании отчёта: {e}', 'error')
+    # построение идёт в фоне: страница задачи опрашивает её состояние
+    current_user = (session.get('user') or {}).get('login')
+    job = report_jobs.submit(rid, meta, params, current_user)
+    return redirect(url_for('reports.report_job', job_id=job['id']))
+
+# ==== Фоновое построение отчёта ====
+@bp.route('/job/<job_id>', methods=['GET'])
+@group_required()
+def report_job(job_id: str):
+    job = report_jobs.get_job(job_id)
+    if not job or job.get('report_id') not in REPORTS:
+        flash('Задача построения отчёта не найдена', 'error')
+        return redirect(url_for('reports.report_form_root'))
+
+    rid = job['report_id']
+    meta = REPORTS[rid]
+    params = job.get('params') or {}
+
+    if job.get('kind') == 'bulk' and job['state'] not in report_jobs.ACTIVE:
+        summary = job.get('summary') or {}
+        if job['state'] == report_jobs.FAILED:
+            flash(f"Ошибка пакетного построения: {job.get('error')}", 'error')
+        else:
+            flash(f"Пакет построен: {summary.get('built')} новых, "
+                  f"{summary.get('skipped')} уже было, ошибок {len(summary.get('failed') or [])}.",
+                  'success')
+        return redirect(url_for('reports.report_history'))
+
+    if job['state'] == report_jobs.FAILED:
+        flash(f"Ошибка при создании отчёта: {job.get('error')}", 'error')
         return render_template(
             'reports_form.html',
             reports=REPORTS, selected_id=rid, rid=rid, meta=meta, report_id=rid, params=params
         )
 
+    if job['state'] == report_jobs.DONE:
+        flash('Отчёт создан.', 'success')
+        try:
+            return _render_result(meta, _ready_rows(rid, meta, params), report_id=rid, params=params)
+        except ModelRouteError as e:
+            flash(f'Ошибка чтения отчёта после создания: {e}', 'error')
+            return _render_result(meta, [], report_id=rid, params=params)
+
+    return render_template('reports_job.html', meta=meta, job=job, report_id=rid)
+
+@bp.route('/job/<job_id>/status', methods=['GET'])
+@group_required()
+def report_job_status(job_id: str):
+    """JSON-состояние задачи; ?wait=N — long-poll до N секунд (не больше 30)"""
+    wait = min(max(request.args.get('wait', 0, type=float), 0.0), 30.0)
+    job = report_jobs.wait(job_id, wait) if wait else report_jobs.get_job(job_id)
+    if not job:
+        return jsonify({"error": "not_found"}), 404
+    return jsonify({k: job.get(k) for k in (
+        "id", "report_id", "state", "duration", "row_count", "error",
+        "progress_done", "progress_total", "summary")})
+
+# ==== Пакетное построение (закрытие месяца) ====
+def _parse_offices(value) -> list:
+    """'1,2,3' | [1, 2] | '' -> список офисов; пусто — один прогон «все офисы» (None)"""
+    if value in (None, '', []):
+        return [None]
+    items = value.split(',') if isinstance(value, str) else value
+    return [int(x) for x in items if str(x).strip() != '']
+
+@bp.route('/bulk', methods=['POST'])
+@group_required()
+def report_bulk_submit():
+    """
+    JSON: {"report_id", "from": "ГГГГ-ММ", "to": "ГГГГ-ММ", "offices": [..], "concurrency"}.
+    Возвращает задачу; ход — в /job/<id>/status (progress_done / progress_total).
+    """
+    if not _has_access('reports_build'):
+        return jsonify({"error": "forbidden"}), 403
+    data = request.get_json(silent=True) or request.form
+    rid = data.get('report_id')
+    if rid not in REPORTS:
+        return jsonify({"error": "unknown_report"}), 400
     try:
-        rows = _select_ready(meta, params)
-    except ModelRouteError as e:
-        flash(f'Ошибка чтения отчёта после создания: {e}', 'error')
-        rows = rows or []
+        months = report_bulk.month_range(report_bulk.parse_month(data.get('from')),
+                                         report_bulk.parse_month(data.get('to') or data.get('from')))
+        offices = _parse_offices(data.get('offices'))
+        concurrency = int(data['concurrency']) if data.get('concurrency') else None
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": "bad_params", "message": str(e)}), 400
 
-    # логирование в историю
+    current_user = (session.get('user') or {}).get('login')
+    job = report_jobs.submit_bulk(rid, REPORTS[rid], months, offices, current_user, concurrency)
+    return jsonify({
+        "id": job["id"],
+        "state": job["state"],
+        "status_url": url_for('reports.report_job_status', job_id=job["id"]),
+    }), 202
+
+@bp.cli.command('bulk-build')
+@click.argument('rid')
+@click.option('--from', 'month_from', required=True, help='Первый месяц, ГГГГ-ММ')
+@click.option('--to', 'month_to', help='Последний месяц, ГГГГ-ММ (по умолчанию = --from)')
+@click.option('--offices', default='', help='Офисы через запятую; пусто — все офисы')
+@click.option('--concurrency', type=int, default=None, help='Одновременных процедур')
+@click.option('--user', 'user_login', default=None, help='Логин автора для report_log')
+def report_bulk_cli(rid, month_from, month_to, offices, concurrency, user_login):
+    """flask reports bulk-build interviews_monthly --from 2025-01 --to 2025-12 --offices 1,2"""
+    if rid not in REPORTS:
+        raise click.BadParameter(f"неизвестный отчёт, есть: {', '.join(REPORTS)}", param_hint='RID')
     try:
-        payload = json.dumps(params, ensure_ascii=False)
-        current_user = (session.get('user') or {}).get('login')
-        run_sql('report_log_insert.sql', {
-            "report_id": rid,
-            "params_json": payload,
-            "row_count": len(rows) if rows else 0,
-            "created_by": current_user,
-        })
+        months = report_bulk.month_range(report_bulk.parse_month(month_from),
+                                         report_bulk.parse_month(month_to or month_from))
+        office_list = _parse_offices(offices)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
 
-    except ModelRouteError as e:
-        flash(f'Не удалось записать отчёт в историю: {e}', 'error')
+    def progress(done, total, params, error):
+        office = params['p_office_id'] if params['p_office_id'] is not None else 'все'
+        status = f"ошибка: {error}" if error else "ok"
+        click.echo(f"[{done}/{total}] {params['p_year']}-{params['p_month']:02d} офис {office}: {status}")
+
+    summary = report_bulk.run_bulk(rid, REPORTS[rid], months, office_list, user_login,
+                                   concurrency=concurrency, progress=progress)
+    click.echo(f"Готово за {summary['duration']} с: построено {summary['built']}, "
+               f"пропущено {summary['skipped']}, ошибок {len(summary['failed'])}, "
+               f"строк {summary['row_count']}")
+    if summary['failed']:
+        raise SystemExit(1)
+
+# ==== Выгрузка готового отчёта ====
+@bp.route('/export/<rid>.<fmt>', methods=['GET'])
+@group_required()
+def report_export(rid: str, fmt: str):
+    """CSV/XLSX готового отчёта потоком из серверного курсора (?p_month=&p_year=&p_office_id=)"""
+    meta = REPORTS.get(rid)
+    if not meta or fmt not in FORMATS:
+        flash('Неизвестный отчёт или формат выгрузки', 'error')
+        return redirect(url_for('reports.report_form_root'))
+
+    params, errors = _collect_monthly_params(meta, request.args)
+    if errors:
+        for e in errors: flash(e, 'error')
+        return redirect(url_for('reports.report_form_root', rid=rid))
 
-    flash('Отчёт создан.', 'success')
-    return render_template('reports_result.html', meta=meta, rows=rows, report_id=rid)
+    filename = f"{rid}_{params['p_year']}-{params['p_month']:02d}"
+    if params.get('p_office_id') is not None:
+        filename += f"_office{params['p_office_id']}"
+    try:
+        return export_response(run_sql_iter(meta['select_sql'], {
+            "p_month": params.get("p_month"),
+            "p_year": params.get("p_year"),
+            "p_office_id": params.get("p_office_id"),
+        }, chunk_size=2000), filename, fmt)
+    except ModelRouteError as e:
+        flash(f'Ошибка выгрузки отчёта: {e}', 'error')
+        return redirect(url_for('reports.report_form_root', rid=rid))
 
 # ==== Просмотр из истории ====
 @bp.route('/history', methods=['GET'])
 @group_required()
 def report_history():
+    page = request.args.get('page')
     try:
-        rows = run_sql('report_log_list.sql', {})
+        rows, next_page = run_sql_page('report_log_list.sql', key=HISTORY_KEY,
+                                       limit=HISTORY_PAGE_SIZE, page=page)
     except ModelRouteError as e:
         flash(f'Ошибка при получении истории отчётов: {e}', 'error')
-        rows = []
-    return render_template('reports_history.html', logs=rows, rows=rows, reports=REPORTS)
+        rows, next_page = [], None
+    return render_template('reports_history.html', logs=rows, rows=rows, reports=REPORTS,
+                           page=page, next_page=next_page)
 
 @bp.route('/view/<int:log_id>', methods=['GET'])
 @group_required()
@@ -246,10 +371,14 @@ def report_view(log_id: int):
         flash('Тип отчёта больше не существует в системе', 'error')
         return redirect(url_for('reports.report_history'))
 
+    if params.get('bulk'):
+        flash(f"Пакетное построение {' — '.join(params.get('months') or [])}: "
+              f"построено {params.get('built')}, пропущено {params.get('skipped')}, "
+              f"строк {params.get('row_count')}, {params.get('duration')} с.", 'success')
+        return redirect(url_for('reports.report_history'))
+
     try:
-        rows = _select_ready(meta, params)
+        return _render_result(meta, _ready_rows(rid, meta, params), log_id=log_id, report_id=rid, params=params)
     except ModelRouteError as e:
         flash(f'Ошибка при чтении отчёта: {e}', 'error')
-        rows = []
-
-    return render_template('reports_result.html', meta=meta, rows=rows, log_id=log_id, report_id=rid)
+        return _render_result(meta, [], log_id=log_id, report_id=rid, params=params)
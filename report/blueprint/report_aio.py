@@ -0,0 +1,115 @@
+import asyncio
+
+from quart import Blueprint, render_template, request, redirect, url_for, flash, session, current_app, g
+from decorators.access import section_allowed
+from decorators.aio import group_required
+from model_route import ModelRouteError
+import model_route_aio
+from report import jobs as report_jobs
+from report import result_cache
+from report.blueprint.report import REPORTS, _collect_monthly_params
+
+# Асинхронные представления отчётов для ASGI-приложения (asgi.py): форма и
+# просмотр готовых строк. Построение по-прежнему идёт в пуле фоновых задач
+# report.jobs — он синхронный и запускается в контексте WSGI-приложения.
+
+bp = Blueprint('reports', __name__, template_folder='../templates')
+
+
+def _has_access(code: str) -> bool:
+    role = session.get('user_group') or (session.get('user') or {}).get('role')
+    return section_allowed(role, code, current_app.config.get('db_access') or {})
+
+
+async def _ready_rows(rid, meta, params):
+    """Строки готового отчёта: из кэша, иначе из агрегатной таблицы (и в кэш)"""
+    cache = current_app.extensions.get('redis_cache_aio')
+    rows = await result_cache.aget_rows(cache, rid, params)
+    if rows is None:
+        rows = await model_route_aio.run_sql(meta['select_sql'], {
+            "p_month": params.get("p_month"),
+            "p_year": params.get("p_year"),
+            "p_office_id": params.get("p_office_id"),
+        }) or []
+        await result_cache.aput_rows(cache, rid, params, rows)
+    return rows
+
+
+async def _render_form(rid, params):
+    meta = REPORTS.get(rid) if rid else None
+    return await render_template(
+        'reports_form.html',
+        reports=REPORTS, selected_id=rid, rid=rid, meta=meta, report_id=rid, params=params
+    )
+
+
+async def _render_result(meta, rows, **extra):
+    return await render_template(
+        'reports_result.html', meta=meta, rows=rows, has_rows=bool(rows),
+        headers=list(rows[0].keys()) if rows else [], **extra
+    )
+
+
+def _submit_build(rid, meta, params, user_login):
+    """Поставить построение в очередь report.jobs (в потоке, в контексте WSGI-приложения)."""
+    flask_app = current_app.extensions['wsgi_app']
+    db_cfg = dict(g.db_config)
+
+    def submit():
+        from flask import g as flask_g
+        with flask_app.app_context():
+            flask_g.db_config = db_cfg
+            return report_jobs.submit(rid, meta, params, user_login)
+
+    return asyncio.to_thread(submit)
+
+
+@bp.route('/run', defaults={'rid': None}, methods=['GET'])
+@bp.route('/run/<rid>', methods=['GET'])
+@group_required()
+async def report_form_root(rid):
+    if rid is not None and rid not in REPORTS:
+        await flash('Неизвестный отчёт', 'error')
+        return redirect(url_for('reports.report_form_root'))
+    return await _render_form(rid, {})
+
+
+@bp.route('/run', methods=['POST'])
+@group_required()
+async def report_run():
+    form = await request.form
+    rid = form.get('report_id')
+    action = form.get('action')
+    if not rid or rid not in REPORTS or action not in ('create', 'view'):
+        await flash('Некорректный запрос', 'error')
+        return redirect(url_for('reports.report_form_root'))
+
+    meta = REPORTS[rid]
+    params, errors = _collect_monthly_params(meta, form)
+    if errors:
+        for e in errors:
+            await flash(e, 'error')
+        return await _render_form(rid, params)
+
+    if action == 'create' and not _has_access('reports_build'):
+        await flash('Нет права на создание отчётов', 'error')
+        return redirect(url_for('reports.report_form_root', rid=rid))
+
+    try:
+        rows = await _ready_rows(rid, meta, params)
+    except ModelRouteError as e:
+        await flash(f'Ошибка чтения отчёта: {e}', 'error')
+        return await _render_form(rid, params)
+
+    if action == 'view':
+        if not rows:
+            await flash('Такого отчёта за указанный месяц нет.', 'error')
+            return await _render_form(rid, params)
+        return await _render_result(meta, rows, report_id=rid, params=params)
+
+    if rows:
+        await flash('Отчёт за этот месяц уже существует — показываю готовый.', 'success')
+        return await _render_result(meta, rows, report_id=rid, params=params)
+
+    job = await _submit_build(rid, meta, params, (session.get('user') or {}).get('login'))
+    return redirect(url_for('reports.report_job', job_id=job['id']))
@@ -0,0 +1,183 @@
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from flask import current_app, g
+from model_route import run_sql, ModelRouteError
+from report import result_cache
+from report import jobs as report_jobs
+from report.jobs import call_build_proc
+
+# Сколько процедур построения выполняется одновременно в одной пачке
+DEFAULT_CONCURRENCY = 4
+
+
+def parse_month(value: str) -> tuple:
+    """'2025-03' -> (2025, 3)"""
+    try:
+        year, month = (int(x) for x in str(value).strip().split('-', 1))
+    except ValueError:
+        raise ValueError(f"Месяц должен быть в формате ГГГГ-ММ: {value!r}")
+    if not 1 <= month <= 12:
+        raise ValueError(f"Месяц должен быть от 1 до 12: {value!r}")
+    return year, month
+
+
+def month_range(first: tuple, last: tuple) -> list:
+    """Все (год, месяц) от first до last включительно."""
+    start, end = first[0] * 12 + first[1] - 1, last[0] * 12 + last[1] - 1
+    if end < start:
+        raise ValueError("Конец диапазона месяцев раньше начала")
+    return [(n // 12, n % 12 + 1) for n in range(start, end + 1)]
+
+
+def _built(meta: dict, months: list) -> dict:
+    """
+    Одним запросом: что уже построено за эти годы.
+    Возвращает {(год, месяц, офис): строк} по строкам агрегатной таблицы.
+    """
+    rows = run_sql(meta['built_sql'], {
+        "p_year_from": min(y for y, _ in months),
+        "p_year_to": max(y for y, _ in months),
+    }) or []
+    built = {}
+    for r in rows:
+        key = (r['rep_year'], r['rep_month'], r['office_id'])
+        built[key] = built.get(key, 0) + int(r.get('cnt') or 0)
+    return built
+
+
+def _built_all_offices(rid: str) -> set:
+    """
+    {(год, месяц)}, за которые отчёт строился по всем офисам (p_office_id=None).
+    Берётся из report_log: строки таблицы по офисам остаются и после построения
+    по одному офису, поэтому по ним «все офисы» не определить.
+    """
+    done = set()
+    for r in run_sql('report_log_all_offices.sql', {"report_id": rid}) or []:
+        params = r.get('params_json') or {}
+        if isinstance(params, (str, bytes)):
+            try:
+                params = json.loads(params)
+            except ValueError:
+                continue
+        if not params.get('bulk'):
+            done.add((params.get('p_year'), params.get('p_month')))
+            continue
+        if None not in (params.get('offices') or []):
+            continue
+        failed = {(f.get('p_year'), f.get('p_month')) for f in params.get('failed') or []
+                  if f.get('p_office_id') is None}
+        try:
+            first, last = (parse_month(m) for m in params.get('months') or ())
+            months = month_range(first, last)
+        except ValueError:
+            continue
+        done.update(m for m in months if m not in failed)
+    return done
+
+
+def _row_count(built: dict, year: int, month: int, office) -> int:
+    """Строк отчёта по комбинации; офис None — все офисы месяца."""
+    if office is not None:
+        return built.get((year, month, office), 0)
+    return sum(cnt for (y, m, _), cnt in built.items() if (y, m) == (year, month))
+
+
+def plan(rid: str, meta: dict, months: list, offices: list) -> tuple:
+    """(params для недостающих комбинаций, число уже построенных)"""
+    built = _built(meta, months)
+    built_all = _built_all_offices(rid) if None in offices else set()
+    todo, skipped = [], 0
+    for year, month in months:
+        for office in offices:
+            done = (year, month) in built_all if office is None else built.get((year, month, office))
+            if done:
+                skipped += 1
+            else:
+                todo.append({"p_month": month, "p_year": year, "p_office_id": office})
+    return todo, skipped
+
+
+def _build_one(app, db_cfg: dict, rid: str, meta: dict, params: dict, user_login, job_id: str):
+    with app.app_context():
+        g.db_config = db_cfg
+        # ту же комбинацию может строить одиночная задача report.jobs — ждём её итог
+        other = report_jobs.claim_build(rid, params, job_id)
+        if other is not None:
+            if other.get("state") == report_jobs.FAILED:
+                raise ModelRouteError(other.get("error") or "Ошибка построения отчёта")
+            return
+        try:
+            args = [params.get(name) for name in meta['arg_order']]
+            call_build_proc(meta['build_proc'], args, user_login)
+            result_cache.forget(rid, params)
+        finally:
+            report_jobs.release_build(rid, params, job_id)
+
+
+def run_bulk(rid: str, meta: dict, months: list, offices: list, user_login=None,
+             concurrency: int | None = None, progress=None, job_id: str | None = None) -> dict:
+    """
+    Построить отчёт rid за все months × offices, пропуская уже построенные.
+    Процедуры вызываются параллельно (не больше concurrency одновременно),
+    в report_log пишется одна запись на всю пачку.
+    progress(done, total, params, error) вызывается после каждой комбинации.
+    job_id — задача report.jobs, за которой закрепляются ключи склейки комбинаций.
+    Требует контекст приложения с g.db_config.
+    """
+    started = time.monotonic()
+    offices = list(offices) or [None]
+    todo, skipped = plan(rid, meta, months, offices)
+    job_id = job_id or uuid.uuid4().hex
+
+    app = current_app._get_current_object()
+    db_cfg = dict(g.get('db_config') or app.config.get('db_config') or {})
+    workers = max(1, int(concurrency
+                         or (app.config.get('REPORT_JOBS') or {}).get('bulk_concurrency')
+                         or DEFAULT_CONCURRENCY))
+
+    failed = []
+    if todo:
+        with ThreadPoolExecutor(max_workers=min(workers, len(todo)),
+                                thread_name_prefix="report-bulk") as pool:
+            futures = {pool.submit(_build_one, app, db_cfg, rid, meta, p, user_login, job_id): p
+                       for p in todo}
+            for done, future in enumerate(as_completed(futures), 1):
+                params, error = futures[future], None
+                try:
+                    future.result()
+                except Exception as e:
+                    error = str(e)
+                    failed.append(dict(params, error=error))
+                if progress is not None:
+                    progress(done, len(todo), params, error)
+
+    # строки по построенным комбинациям — тем же запросом, что и проверка
+    built = _built(meta, months) if todo else {}
+    row_count = sum(_row_count(built, p['p_year'], p['p_month'], p['p_office_id'])
+                    for p in todo)
+
+    summary = {
+        "report_id": rid,
+        "months": [f"{y}-{m:02d}" for y, m in (months[0], months[-1])],
+        "offices": offices,
+        "total": len(months) * len(offices),
+        "skipped": skipped,
+        "built": len(todo) - len(failed),
+        "failed": failed,
+        "row_count": row_count,
+        "duration": round(time.monotonic() - started, 3),
+    }
+    if todo:
+        try:
+            run_sql('report_log_insert.sql', {
+                "report_id": rid,
+                "params_json": json.dumps(dict(summary, bulk=True), ensure_ascii=False),
+                "row_count": row_count,
+                "created_by": user_login,
+            })
+        except ModelRouteError as e:
+            current_app.logger.warning("report_log insert failed for bulk %s: %s", rid, e)
+    return summary
@@ -0,0 +1,333 @@
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, g
+from model_route import run_sql, call_proc, ModelRouteError
+from report import result_cache
+
+# Состояния задачи построения отчёта
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+ACTIVE = (QUEUED, RUNNING)
+
+_DEFAULTS = {
+    "workers": 2,          # одновременно строящихся отчётов на процесс
+    "ttl_seconds": 86400,  # сколько хранить состояние задачи
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+_local_jobs = {}             # запасное хранилище, если Redis недоступен
+_local_keys = {}
+_local_lock = threading.Lock()
+_done_events = {}            # job_id -> Event для long-poll внутри процесса
+
+
+def _settings() -> dict:
+    cfg = dict(_DEFAULTS)
+    cfg.update(current_app.config.get('REPORT_JOBS') or {})
+    return cfg
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=int(_settings()["workers"]),
+                                               thread_name_prefix="report-job")
+    return _executor
+
+
+def _cache():
+    return current_app.extensions.get('redis_cache')
+
+
+def job_key(rid: str, params: dict) -> str:
+    """Ключ склейки: одинаковые (отчёт, месяц, год, офис) строятся одной задачей."""
+    return "|".join(str(x) for x in (
+        rid, params.get("p_year"), params.get("p_month"), params.get("p_office_id")))
+
+
+# --------- хранилище состояния (Redis, иначе память процесса) ---------
+
+def _save(job: dict):
+    ttl = int(_settings()["ttl_seconds"])
+    now = time.time()
+    with _local_lock:
+        _local_jobs[job["id"]] = dict(job)
+        for jid in [j for j, v in _local_jobs.items()
+                    if v.get("finished_at") and now - v["finished_at"] > ttl]:
+            del _local_jobs[jid]
+    cache = _cache()
+    if cache is not None:
+        cache.set_value(f"report_job:{job['id']}", job, ttl)
+
+
+def get_job(job_id: str) -> dict | None:
+    cache = _cache()
+    # состояние задачи общее для воркеров — мимо L1, его сброс через pubsub запаздывает
+    job = cache.get_value(f"report_job:{job_id}", local=False) if cache is not None else None
+    if job is None:
+        with _local_lock:
+            job = dict(_local_jobs[job_id]) if job_id in _local_jobs else None
+    return job
+
+
+def _update(job_id: str, **fields) -> dict:
+    job = get_job(job_id) or {"id": job_id}
+    job.update(fields)
+    _save(job)
+    return job
+
+
+def _claim_key(key: str, job_id: str) -> str | None:
+    """
+    Закрепить ключ склейки за job_id. Возвращает id уже активной задачи
+    с тем же ключом (тогда новую не создаём) или None.
+    Ключ завершившейся задачи перехватывается compare-and-set: из двух
+    одновременных претендентов ключ достаётся одному.
+    """
+    ttl = int(_settings()["ttl_seconds"])
+    cache = _cache()
+    name = f"report_job_key:{key}"
+    for _ in range(5):
+        added = cache.add_value(name, job_id, ttl) if cache is not None else None
+        if added is None:
+            # без Redis склеиваем только внутри процесса
+            with _local_lock:
+                other = _local_keys.get(key)
+                if other and (_local_jobs.get(other) or {}).get("state") in ACTIVE:
+                    return other
+                _local_keys[key] = job_id
+            return None
+        if added:
+            return None
+        other = cache.get_value(name, local=False)
+        if other is None:
+            continue  # ключ только что сняли — снова SET NX
+        job = get_job(other)
+        if job and job.get("state") in ACTIVE:
+            return other
+        # прошлая задача уже завершилась — занимаем ключ, если он всё ещё её
+        if cache.swap_value(name, other, job_id, ttl):
+            return None
+    return None
+
+
+def _release_key(key: str, job_id: str):
+    cache = _cache()
+    if cache is not None:
+        cache.delete_if(f"report_job_key:{key}", job_id)
+    with _local_lock:
+        if _local_keys.get(key) == job_id:
+            del _local_keys[key]
+
+
+def claim_build(rid: str, params: dict, job_id: str, wait_seconds: float = 60) -> dict | None:
+    """
+    Для пакетного построения: занять ключ склейки комбинации (отчёт, месяц, офис)
+    за job_id, чтобы одиночная задача не строила её одновременно с пачкой.
+    Если комбинацию уже строит другая задача — дождаться её и вернуть её итог
+    (ключ тогда не занят, строить не нужно). None — ключ занят, можно строить;
+    после построения — release_build.
+    """
+    key = job_key(rid, params)
+    while True:
+        other = _claim_key(key, job_id)
+        if not other:
+            return None
+        job = wait(other, wait_seconds)
+        if job is None or job.get("state") not in ACTIVE:
+            return job
+
+
+def release_build(rid: str, params: dict, job_id: str):
+    _release_key(job_key(rid, params), job_id)
+
+
+# --------- постановка и выполнение ---------
+
+def submit(rid: str, meta: dict, params: dict, user_login: str | None) -> dict:
+    """
+    Поставить построение отчёта в очередь и сразу вернуть задачу.
+    Если такая же задача уже в очереди или строится — вернуть её.
+    """
+    key = job_key(rid, params)
+    job_id = uuid.uuid4().hex
+    existing = _claim_key(key, job_id)
+    if existing:
+        job = get_job(existing)
+        if job:
+            return job
+
+    job = {
+        "id": job_id,
+        "key": key,
+        "report_id": rid,
+        "params": params,
+        "created_by": user_login,
+        "state": QUEUED,
+        "submitted_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "duration": None,
+        "row_count": None,
+        "error": None,
+    }
+    _save(job)
+    with _local_lock:
+        _done_events[job_id] = threading.Event()
+
+    app = current_app._get_current_object()
+    db_cfg = dict(g.get('db_config') or app.config.get('db_config') or {})
+    _get_executor().submit(_run, app, job_id, meta, params, db_cfg, user_login)
+    return job
+
+
+def submit_bulk(rid: str, meta: dict, months: list, offices: list,
+                user_login: str | None, concurrency: int | None = None) -> dict:
+    """
+    Пакетное построение (см. report.bulk) фоновой задачей.
+    Ход выполнения — в полях progress_done / progress_total задачи.
+    """
+    key = "bulk|{}|{}-{:02d}|{}-{:02d}|{}".format(
+        rid, *months[0], *months[-1], ",".join(str(o) for o in offices))
+    job_id = uuid.uuid4().hex
+    existing = _claim_key(key, job_id)
+    if existing:
+        job = get_job(existing)
+        if job:
+            return job
+
+    job = {
+        "id": job_id,
+        "key": key,
+        "kind": "bulk",
+        "report_id": rid,
+        "params": {"months": [f"{y}-{m:02d}" for y, m in months], "offices": offices},
+        "created_by": user_login,
+        "state": QUEUED,
+        "submitted_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "duration": None,
+        "row_count": None,
+        "progress_done": 0,
+        "progress_total": None,
+        "summary": None,
+        "error": None,
+    }
+    _save(job)
+    with _local_lock:
+        _done_events[job_id] = threading.Event()
+
+    app = current_app._get_current_object()
+    db_cfg = dict(g.get('db_config') or app.config.get('db_config') or {})
+    _get_executor().submit(_run_bulk, app, job_id, meta, months, offices,
+                           db_cfg, user_login, concurrency)
+    return job
+
+
+def _run_bulk(app, job_id: str, meta: dict, months: list, offices: list,
+              db_cfg: dict, user_login: str | None, concurrency: int | None):
+    from report import bulk
+
+    def progress(done, total, params, error):
+        _update(job_id, progress_done=done, progress_total=total)
+
+    with app.app_context():
+        g.db_config = db_cfg
+        job = _update(job_id, state=RUNNING, started_at=time.time())
+        started = time.monotonic()
+        try:
+            summary = bulk.run_bulk(job["report_id"], meta, months, offices, user_login,
+                                    concurrency=concurrency, progress=progress, job_id=job_id)
+            _update(job_id, state=DONE, summary=summary, row_count=summary["row_count"],
+                    finished_at=time.time(), duration=round(time.monotonic() - started, 3))
+        except Exception as e:
+            app.logger.warning("bulk report job %s failed: %s", job_id, e)
+            _update(job_id, state=FAILED, error=str(e),
+                    finished_at=time.time(), duration=round(time.monotonic() - started, 3))
+        finally:
+            _release_key(job["key"], job_id)
+            with _local_lock:
+                event = _done_events.pop(job_id, None)
+            if event is not None:
+                event.set()
+
+
+def call_build_proc(proc_name: str, args: list, user_login: str | None):
+    """Вызов процедуры; при 1318 (неверное число аргументов) — с логином автора."""
+    try:
+        return call_proc(proc_name, args)
+    except ModelRouteError as e:
+        code = getattr(e, 'code', None)
+        if (code == 1318) or ('1318' in str(e)):
+            return call_proc(proc_name, args + [user_login])
+        raise
+
+
+def _run(app, job_id: str, meta: dict, params: dict, db_cfg: dict, user_login: str | None):
+    with app.app_context():
+        g.db_config = db_cfg
+        job = _update(job_id, state=RUNNING, started_at=time.time())
+        started = time.monotonic()
+        try:
+            args = [params.get("p_month"), params.get("p_year"), params.get("p_office_id")]
+            rows = call_build_proc(meta['build_proc'], args, user_login) or []
+            if not (rows and meta.get('row_key') in rows[0]):
+                # процедура не вернула строки отчёта — читаем агрегатную таблицу
+                rows = run_sql(meta['select_sql'], {
+                    "p_month": params.get("p_month"),
+                    "p_year": params.get("p_year"),
+                    "p_office_id": params.get("p_office_id"),
+                }) or []
+            # перестроенный отчёт сразу кладём в кэш (старые строки перезаписываются)
+            result_cache.forget(job["report_id"], params)
+            result_cache.put_rows(job["report_id"], params, rows)
+            row_count = len(rows)
+
+            # логирование в историю
+            try:
+                run_sql('report_log_insert.sql', {
+                    "report_id": job["report_id"],
+                    "params_json": json.dumps(params, ensure_ascii=False),
+                    "row_count": row_count,
+                    "created_by": user_login,
+                })
+            except ModelRouteError as e:
+                app.logger.warning("report_log insert failed for job %s: %s", job_id, e)
+
+            _update(job_id, state=DONE, row_count=row_count,
+                    finished_at=time.time(), duration=round(time.monotonic() - started, 3))
+        except Exception as e:
+            app.logger.warning("report job %s failed: %s", job_id, e)
+            _update(job_id, state=FAILED, error=str(e),
+                    finished_at=time.time(), duration=round(time.monotonic() - started, 3))
+        finally:
+            _release_key(job["key"], job_id)
+            with _local_lock:
+                event = _done_events.pop(job_id, None)
+            if event is not None:
+                event.set()
+
+
+def wait(job_id: str, timeout: float) -> dict | None:
+    """
+    Long-poll: дождаться завершения задачи не дольше timeout секунд.
+    Задачи своего процесса ждём по Event, чужие — опросом хранилища.
+    """
+    deadline = time.monotonic() + max(0.0, timeout)
+    with _local_lock:
+        event = _done_events.get(job_id)
+    if event is not None:
+        event.wait(timeout)
+        return get_job(job_id)
+    while True:
+        job = get_job(job_id)
+        if job is None or job.get("state") not in ACTIVE or time.monotonic() >= deadline:
+            return job
+        time.sleep(0.5)
@@ -0,0 +1,86 @@
+import threading
+
+from flask import current_app
+
+# Готовые строки отчёта за месяц не меняются, пока отчёт не перестроят,
+# поэтому держим их долго; перестроение перезаписывает ключ.
+RESULT_TTL = 30 * 24 * 3600
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0}
+
+
+def cache_key(rid: str, params: dict) -> str:
+    office = params.get("p_office_id")
+    return "report_rows:{}:{}:{}:{}".format(
+        rid, params.get("p_year"), params.get("p_month"),
+        "all" if office is None else office)
+
+
+def month_tag(rid: str, params: dict) -> str:
+    """Тег всех ключей отчёта за месяц — по каждому офису и «все офисы»."""
+    return "report_month:{}:{}:{}".format(rid, params.get("p_year"), params.get("p_month"))
+
+
+def _count(name: str):
+    with _lock:
+        _stats[name] += 1
+
+
+def get_rows(rid: str, params: dict):
+    """Строки готового отчёта из кэша или None."""
+    cache = current_app.extensions.get('redis_cache')
+    rows = cache.get_value(cache_key(rid, params)) if cache is not None else None
+    _count("hits" if rows is not None else "misses")
+    return rows
+
+
+def put_rows(rid: str, params: dict, rows: list):
+    """Сохранить строки отчёта (пустой результат — «не построен», не кэшируем)."""
+    cache = current_app.extensions.get('redis_cache')
+    if cache is None or not rows:
+        return
+    key = cache_key(rid, params)
+    cache.set_value(key, rows, RESULT_TTL)
+    cache.tag_keys(key, [month_tag(rid, params)], RESULT_TTL)
+    _count("stores")
+
+
+async def aget_rows(cache, rid: str, params: dict):
+    """get_rows для AsyncRedisCache (asgi.py)."""
+    rows = await cache.get_value(cache_key(rid, params)) if cache is not None else None
+    _count("hits" if rows is not None else "misses")
+    return rows
+
+
+async def aput_rows(cache, rid: str, params: dict, rows: list):
+    if cache is None or not rows:
+        return
+    key = cache_key(rid, params)
+    await cache.set_value(key, rows, RESULT_TTL)
+    await cache.tag_keys(key, [month_tag(rid, params)], RESULT_TTL)
+    _count("stores")
+
+
+def forget(rid: str, params: dict):
+    """
+    Сбросить строки отчёта и сводку «все офисы» за тот же месяц:
+    построение отчёта по одному офису меняет и её. Построение по всем офисам
+    (p_office_id=None) сбрасывает ключи всех офисов за месяц — по тегу месяца.
+    """
+    cache = current_app.extensions.get('redis_cache')
+    if cache is None:
+        return
+    if params.get("p_office_id") is None:
+        cache.invalidate_tags([month_tag(rid, params)])
+        # сам ключ «все офисы» — и без тега (если tag_keys не удался)
+        cache.delete(cache_key(rid, params))
+        return
+    keys = {cache_key(rid, params), cache_key(rid, dict(params, p_office_id=None))}
+    cache.delete_many(sorted(keys))
+
+
+def stats() -> dict:
+    with _lock:
+        total = _stats["hits"] + _stats["misses"]
+        return dict(_stats, hit_rate=round(_stats["hits"] / total, 4) if total else 0.0)
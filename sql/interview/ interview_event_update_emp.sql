@@ -1,2 +0,0 @@
-
-UPDATE interview SET emp_id = :emp_id WHERE event_id = :event_id;
\ No newline at end of file
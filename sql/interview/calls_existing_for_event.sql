@@ -0,0 +1,4 @@
+SELECT cand_id
+FROM calls
+WHERE event_id = %(event_id)s
+  AND cand_id IN %(cand_ids)s;
@@ -0,0 +1,7 @@
+SELECT c.cand_id,
+       c.full_name,
+       c.age,
+       c.gender,
+       c.job_id
+FROM candidate c
+WHERE c.cand_id IN %(cand_ids)s;
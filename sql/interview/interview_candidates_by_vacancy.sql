@@ -2,4 +2,7 @@ SELECT c.cand_id, c.full_name, c.age, c.gender, c.job_id
 FROM candidate c
 JOIN vacancy v ON v.job_id = c.job_id
 WHERE v.vac_id = %(vac_id)s
-ORDER BY c.full_name;
+  AND (%(after_cand_id)s IS NULL
+       OR (c.full_name, c.cand_id) > (%(after_full_name)s, %(after_cand_id)s))
+ORDER BY c.full_name, c.cand_id
+LIMIT %(limit)s;
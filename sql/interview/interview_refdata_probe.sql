@@ -0,0 +1,9 @@
+-- Дешёвая сверка справочников: если что-то поменялось в обход приложения,
+-- изменится хотя бы одно значение.
+SELECT
+    (SELECT COUNT(*) FROM vacancy WHERE date_close IS NULL)            AS open_vacancies,
+    (SELECT COALESCE(BIT_XOR(CRC32(CONCAT(vac_id, ':', job_id))), 0)
+       FROM vacancy WHERE date_close IS NULL)                          AS vacancies_crc,
+    (SELECT COUNT(*) FROM employee)                                    AS employees,
+    (SELECT COALESCE(BIT_XOR(CRC32(CONCAT(emp_id, ':', full_name))), 0)
+       FROM employee)                                                  AS employees_crc;
@@ -4,5 +4,7 @@ FROM Employee e
 JOIN Schedule_ s ON s.job_id = e.job_id
 WHERE e.enrollment BETWEEN %(start_date)s AND %(end_date)s
   AND (%(office_id)s IS NULL OR s.office_id = %(office_id)s)
-ORDER BY e.enrollment;
-
+  AND (%(after_emp_id)s IS NULL
+       OR (e.enrollment, e.emp_id) > (%(after_enrollment)s, %(after_emp_id)s))
+ORDER BY e.enrollment, e.emp_id
+LIMIT %(limit)s;
@@ -0,0 +1,4 @@
+SELECT rep_year, rep_month, office_id, COUNT(*) AS cnt
+FROM recruiting_report
+WHERE rep_year BETWEEN %(p_year_from)s AND %(p_year_to)s
+GROUP BY rep_year, rep_month, office_id;
@@ -0,0 +1,8 @@
+-- Построения отчёта по всем офисам (p_office_id = NULL) и пакетные построения:
+-- по строкам агрегатной таблицы их не отличить от построения по одному офису
+SELECT params_json
+FROM report_log
+WHERE report_id = %(report_id)s
+  AND (JSON_EXTRACT(params_json, '$.bulk') = TRUE
+       OR JSON_TYPE(JSON_EXTRACT(params_json, '$.p_office_id')) = 'NULL')
+ORDER BY log_id;
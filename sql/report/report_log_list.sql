@@ -1,5 +1,7 @@
 SELECT
-  log_id, report_id, title, created_by, created_at
+  log_id, report_id, created_by, created_at
 FROM report_log
+WHERE (%(after_log_id)s IS NULL
+       OR (created_at, log_id) < (%(after_created_at)s, %(after_log_id)s))
 ORDER BY created_at DESC, log_id DESC
-LIMIT 200;
+LIMIT %(limit)s;
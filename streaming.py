@@ -0,0 +1,30 @@
+from itertools import chain
+
+from flask import Response, current_app, get_flashed_messages, stream_with_context
+
+
+def peek(rows):
+    """
+    Забрать первую строку из итератора (чтобы узнать заголовки и выполнить
+    запрос до начала ответа). Возвращает (first_row | None, итератор всех строк).
+    """
+    it = iter(rows)
+    first = next(it, None)
+    if first is None:
+        return None, iter(())
+    return first, chain([first], it)
+
+
+def stream_page(template_name: str, *, buffer_size: int = 50, **context) -> Response:
+    """
+    Отрендерить шаблон потоком: HTML уходит клиенту по мере чтения строк.
+    buffer_size — сколько фрагментов Jinja склеивать в один chunk ответа.
+    """
+    app = current_app._get_current_object()
+    # flash забираем до начала ответа: cookie сессии уходит с заголовками,
+    # и сообщения, прочитанные при генерации тела, вернулись бы на следующей странице
+    context.setdefault('flashed_messages', get_flashed_messages(with_categories=True))
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(buffer_size)
+    return Response(stream_with_context(stream), mimetype='text/html')
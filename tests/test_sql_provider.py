@@ -0,0 +1,59 @@
+import os
+import time
+
+import pytest
+
+from database.sql_provider import SQLProvider
+
+
+def _write(path, text, encoding="utf-8"):
+    with open(path, "w", encoding=encoding) as f:
+        f.write(text)
+
+
+def _reload(provider):
+    time.sleep(provider.reload_seconds * 2)
+    provider.maybe_reload()
+
+
+def test_duplicate_name_on_reload_keeps_previous_scripts(tmp_path):
+    _write(tmp_path / "a.sql", "SELECT 1")
+    provider = SQLProvider(str(tmp_path), reload_seconds=0.01)
+
+    (tmp_path / "sub").mkdir()
+    _write(tmp_path / "sub" / "a.sql", "SELECT 2")
+    _reload(provider)
+
+    assert provider.get("a.sql") == "SELECT 1"
+
+
+def test_undecodable_file_on_reload_keeps_previous_scripts(tmp_path):
+    _write(tmp_path / "a.sql", "SELECT 1")
+    provider = SQLProvider(str(tmp_path), reload_seconds=0.01)
+
+    with open(tmp_path / "b.sql", "wb") as f:
+        f.write(b"SELECT '\xff\xfe'")
+    _reload(provider)
+
+    assert provider.get("a.sql") == "SELECT 1"
+    with pytest.raises(FileNotFoundError):
+        provider.get("b.sql")
+
+
+def test_duplicate_name_on_first_load_fails(tmp_path):
+    _write(tmp_path / "a.sql", "SELECT 1")
+    (tmp_path / "sub").mkdir()
+    _write(tmp_path / "sub" / "a.sql", "SELECT 2")
+    with pytest.raises(RuntimeError):
+        SQLProvider(str(tmp_path))
+
+
+def test_reload_picks_up_changes(tmp_path):
+    _write(tmp_path / "a.sql", "SELECT 1")
+    provider = SQLProvider(str(tmp_path), reload_seconds=0.01)
+
+    _write(tmp_path / "a.sql", "SELECT 3")
+    os.utime(tmp_path / "a.sql", (time.time() + 5, time.time() + 5))
+    _reload(provider)
+
+    assert provider.get("a.sql") == "SELECT 3"